@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+from .db import (
+    LazyCollection,
+    comment_archive_collection,
+    comment_collection,
+    get_database,
+    post_archive_collection,
+    post_collection,
+    post_like_archive_collection,
+    post_like_collection,
+    run_in_transaction,
+)
+from .feeds import invalidate_feeds
+from .invalidation import POST_TAXONOMY, publish
+from ..logs.logger import config, logger
+
+
+ARCHIVE_CONFIG = config.get("archive", {})
+MAX_AGE_DAYS = ARCHIVE_CONFIG.get("max_age_days", 365)
+BATCH_SIZE = ARCHIVE_CONFIG.get("batch_size", 200)
+
+COPY_CHUNK_SIZE = 1000
+
+
+def archive_cutoff(max_age_days: int = MAX_AGE_DAYS) -> datetime:
+    return datetime.now() - timedelta(days=max_age_days)
+
+
+async def _move(source: LazyCollection, target: LazyCollection, query: Dict[str, Any], session) -> int:
+    """
+    Copia os documentos de `source` que casam com `query` para `target`
+    (upsert por `_id`, então repetir é seguro) e depois os remove da origem.
+    A cópia é feita em blocos para manter a memória limitada.
+    """
+    moved = 0
+    chunk = []
+    async for document in source.find(query, session=session):
+        chunk.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+        if len(chunk) >= COPY_CHUNK_SIZE:
+            await target.bulk_write(chunk, ordered=False, session=session)
+            moved += len(chunk)
+            chunk = []
+    if chunk:
+        await target.bulk_write(chunk, ordered=False, session=session)
+        moved += len(chunk)
+    await source.delete_many(query, session=session)
+    return moved
+
+
+async def archive_batch(cutoff: datetime, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Move para a camada fria os `batch_size` posts mais antigos publicados
+    antes de `cutoff`, junto com os seus comentários e likes. Retorna
+    quantos posts foram movidos (0 quando não há mais nada a arquivar).
+
+    Em um replica set cada lote é uma transação. Em um servidor standalone
+    a ordem das operações (comentários, likes e por último o post) garante
+    que um lote interrompido seja concluído na próxima execução.
+    """
+    candidates = (
+        await post_collection.find({"publication_date": {"$lt": cutoff}}, {"_id": 1})
+        .sort("publication_date", 1)
+        .limit(batch_size)
+        .to_list(length=batch_size)
+    )
+    if not candidates:
+        return 0
+    post_oids = [post["_id"] for post in candidates]
+    post_ids = [str(oid) for oid in post_oids]
+
+    async def move(session):
+        await _move(comment_collection, comment_archive_collection, {"post_id": {"$in": post_ids}}, session)
+        await _move(post_like_collection, post_like_archive_collection, {"post_id": {"$in": post_ids}}, session)
+        return await _move(post_collection, post_archive_collection, {"_id": {"$in": post_oids}}, session)
+
+    moved = await run_in_transaction(move)
+    await publish("posts", post_ids)
+    await publish(POST_TAXONOMY)
+    await publish("comments")
+    await invalidate_feeds()
+    logger.info(f"{moved} posts arquivados (publicados antes de {cutoff:%Y-%m-%d}).")
+    return moved
+
+
+async def find_post(oid: ObjectId) -> Optional[Dict[str, Any]]:
+    """
+    Busca um post na camada quente e, se não estiver lá, no arquivo. Posts
+    arquivados voltam marcados com `archived: True`.
+    """
+    post = await post_collection.find_one({"_id": oid})
+    if post is None:
+        post = await post_archive_collection.find_one({"_id": oid})
+        if post is not None:
+            post["archived"] = True
+    return post
+
+
+async def count_posts(query: Dict[str, Any], include_archived: bool = False) -> int:
+    total = await post_collection.count_documents(query)
+    if include_archived:
+        total += await post_archive_collection.count_documents(query)
+    return total
+
+
+async def find_posts(
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, int]] = None,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    include_archived: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Executa uma busca de posts, opcionalmente incluindo o arquivo.
+
+    Sem `include_archived` é um `find` comum na coleção quente. Com ele, as
+    duas coleções são unidas com `$unionWith`; cada lado é ordenado e
+    limitado a `skip + limit` antes da união, então o custo continua
+    proporcional à página e não ao tamanho do arquivo.
+    """
+    if not include_archived:
+        return await _hot_cursor(query, projection, sort, skip, limit).to_list(length=limit)
+    pipeline = _union_pipeline(query, projection, sort, skip, limit)
+    return await post_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+
+
+async def explain_posts(
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, int]] = None,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    include_archived: bool = False,
+) -> Dict[str, Any]:
+    """
+    Retorna o `explain` (queryPlanner) da mesma consulta que `find_posts` executaria.
+    """
+    if not include_archived:
+        return await _hot_cursor(query, projection, sort, skip, limit).explain()
+    return await get_database().command({
+        "explain": {
+            "aggregate": post_collection.name,
+            "pipeline": _union_pipeline(query, projection, sort, skip, limit),
+            "cursor": {},
+        },
+        "verbosity": "queryPlanner",
+    })
+
+
+def _hot_cursor(query, projection, sort, skip, limit):
+    cursor = post_collection.find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+def _union_pipeline(query, projection, sort, skip, limit) -> List[Dict[str, Any]]:
+    branch: List[Dict[str, Any]] = [{"$match": query}]
+    if sort:
+        branch.append({"$sort": dict(sort)})
+    if limit:
+        branch.append({"$limit": skip + limit})
+    pipeline = branch + [
+        {"$unionWith": {"coll": post_archive_collection.name, "pipeline": branch + [{"$set": {"archived": True}}]}}
+    ]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit:
+        pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": {**projection, "archived": 1}})
+    return pipeline
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .db import author_collection, post_archive_collection, post_collection
+from ..logs.logger import logger
+
+
+def author_stats_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Agrega as estatísticas de autor a partir dos posts (camada quente e
+    arquivo), no formato dos documentos da coleção `authors`.
+    """
+    branch = [{"$match": match}]
+    return [
+        *branch,
+        {"$unionWith": {"coll": post_archive_collection.name, "pipeline": branch}},
+        {"$sort": {"publication_date": 1}},
+        {
+            "$group": {
+                "_id": "$author.name",
+                "bio": {"$last": "$author.bio"},
+                "post_count": {"$sum": 1},
+                "total_likes": {"$sum": {"$ifNull": ["$likes", 0]}},
+                "latest_publication_date": {"$max": "$publication_date"},
+            }
+        },
+        {"$set": {"updated_at": "$$NOW"}},
+    ]
+
+
+async def record_new_post(post: Dict[str, Any]) -> None:
+    """
+    Soma um post recém-criado às estatísticas do seu autor (upsert), sem
+    reagrupar os posts do autor.
+    """
+    author = post.get("author") or {}
+    if not author.get("name"):
+        return
+    try:
+        await author_collection.update_one(
+            {"_id": author["name"]},
+            {
+                "$inc": {"post_count": 1, "total_likes": post.get("likes", 0)},
+                "$max": {"latest_publication_date": post["publication_date"]},
+                "$set": {"bio": author.get("bio"), "updated_at": datetime.now()},
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        logger.exception(f"Erro ao atualizar estatísticas do autor {author['name']}: {e}")
+
+
+async def record_likes(author_name: str, delta: int) -> None:
+    if not author_name:
+        return
+    try:
+        await author_collection.update_one({"_id": author_name}, {"$inc": {"total_likes": delta}})
+    except Exception as e:
+        logger.exception(f"Erro ao atualizar likes do autor {author_name}: {e}")
+
+
+async def refresh_author(author_name: str) -> None:
+    """
+    Recalcula as estatísticas de um autor a partir dos seus posts. Usado
+    quando uma escrita não pode ser aplicada como incremento (edição ou
+    remoção de post); a leitura usa o índice de `author.name`.
+    """
+    if not author_name:
+        return
+    try:
+        stats = await post_collection.aggregate(author_stats_pipeline({"author.name": author_name})).to_list(length=1)
+        if stats:
+            await author_collection.replace_one({"_id": author_name}, stats[0], upsert=True)
+        else:
+            await author_collection.delete_one({"_id": author_name})
+    except Exception as e:
+        logger.exception(f"Erro ao recalcular estatísticas do autor {author_name}: {e}")
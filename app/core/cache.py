@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+
+_MISSING = object()
+
+_registry: Dict[str, "LocalCache"] = {}
+
+
+class LocalCache:
+    """
+    Cache em memória, local ao processo (LRU com TTL opcional).
+
+    Cada cache declara em `depends_on` as coleções do MongoDB das quais seus
+    valores derivam. Quando uma dessas coleções muda, o barramento de
+    invalidação (`app.core.invalidation`) limpa o cache em todos os workers.
+
+    Com `key_scoped=True` as chaves do cache são IDs de documentos da coleção
+    de origem, e uma invalidação que informa IDs remove apenas essas chaves.
+    Caso contrário qualquer invalidação limpa o cache inteiro.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        depends_on: Iterable[str],
+        ttl: Optional[float] = 300,
+        maxsize: int = 1024,
+        key_scoped: bool = False,
+    ):
+        if name in _registry:
+            raise ValueError(f"Já existe um cache registrado com o nome '{name}'")
+        self.name = name
+        self.depends_on = frozenset(depends_on)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.key_scoped = key_scoped
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None) -> None:
+        self.invalidations += 1
+        if keys is None or not self.key_scoped:
+            self._data.clear()
+            return
+        for key in keys:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "depends_on": sorted(self.depends_on),
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def registered_caches() -> List[LocalCache]:
+    return list(_registry.values())
+
+
+def watched_collections() -> frozenset:
+    """
+    Todas as coleções das quais algum cache registrado depende.
+    """
+    return frozenset().union(*(cache.depends_on for cache in _registry.values()))
+
+
+def invalidate_local(collection: str, keys: Optional[Iterable[Hashable]] = None) -> None:
+    """
+    Invalida, apenas neste processo, os caches que dependem de `collection`.
+    """
+    keys = list(keys) if keys is not None else None
+    for cache in _registry.values():
+        if collection in cache.depends_on:
+            cache.invalidate(keys)
@@ -0,0 +1,372 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, ReadPreference, UpdateOne
+
+from .db import LazyCollection, consistency_run_collection, post_collection, post_like_collection, post_tag_collection
+from .invalidation import POST_TAXONOMY, publish
+from .monitoring import command_monitor
+from ..logs.logger import logger
+
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_PAUSE_SECONDS = 0.05
+# Acima desta latência média no MongoDB a verificação desacelera.
+BUSY_LATENCY_MS = 100
+MAX_SAMPLE = 100
+# `create_post_tag_association` grava em `post_tags` antes de `posts.tags_id`:
+# associações mais novas que isto podem estar no meio dessa escrita e não
+# são tratadas como sobrando.
+RECENT_ASSOCIATION_SECONDS = 60
+
+
+class ConsistencyCheck(ABC):
+    """
+    Compara um dado redundante dos posts com a sua fonte.
+
+    Cada verificação percorre `posts` em blocos ordenados por `_id`; para
+    cada bloco um pipeline de agregação traz, via `$lookup`, o valor real
+    da coleção de origem, e `compare` devolve as divergências encontradas.
+    `repair_operations` traduz as divergências em operações de `bulk_write`,
+    condicionadas ao valor observado para não sobrescrever escritas mais
+    novas que a leitura.
+    """
+
+    name: str = ""
+    description: str = ""
+    collections_changed: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def lookup_stages(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def compare(self, post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def confirm(self, discrepancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Revalida no primário as divergências lidas do secundário antes do
+        reparo. Por padrão as mantém como estão.
+        """
+        return discrepancies
+
+    @abstractmethod
+    def repair_operations(self, discrepancies: List[Dict[str, Any]]) -> List[Tuple[LazyCollection, list]]:
+        ...
+
+
+class LikesCheck(ConsistencyCheck):
+    name = "likes"
+    description = "posts.likes x quantidade de documentos em post_likes"
+    collections_changed = ("posts",)
+
+    def lookup_stages(self):
+        return [
+            {
+                "$lookup": {
+                    "from": "post_likes",
+                    "let": {"pid": {"$toString": "$_id"}},
+                    "pipeline": [{"$match": {"$expr": {"$eq": ["$post_id", "$$pid"]}}}, {"$count": "n"}],
+                    "as": "actual",
+                }
+            },
+            {"$project": {"likes": 1, "actual": {"$ifNull": [{"$first": "$actual.n"}, 0]}}},
+        ]
+
+    def compare(self, post):
+        if post.get("likes", 0) != post["actual"]:
+            return {"post_id": str(post["_id"]), "stored": post.get("likes", 0), "actual": post["actual"]}
+        return None
+
+    async def confirm(self, discrepancies):
+        # A leitura do bloco vem de um secundário: contador e likes são lidos
+        # de novo no primário, e só o que ainda diverge é reparado.
+        oids = [ObjectId(d["post_id"]) for d in discrepancies]
+        stored = {
+            str(post["_id"]): post.get("likes", 0)
+            async for post in post_collection.find({"_id": {"$in": oids}}, {"likes": 1})
+        }
+        actual = {
+            row["_id"]: row["n"]
+            async for row in post_like_collection.aggregate([
+                {"$match": {"post_id": {"$in": list(stored)}}},
+                {"$group": {"_id": "$post_id", "n": {"$sum": 1}}},
+            ])
+        }
+        confirmed = []
+        for post_id, likes in stored.items():
+            if likes != actual.get(post_id, 0):
+                confirmed.append({"post_id": post_id, "stored": likes, "actual": actual.get(post_id, 0)})
+        return confirmed
+
+    def repair_operations(self, discrepancies):
+        # `$inc` da diferença, e só se o contador ainda é o observado: um like
+        # que chegue entre a leitura e o reparo faz o update não casar, em vez
+        # de ser apagado por um `$set` com o valor antigo.
+        ops = [
+            UpdateOne(
+                {"_id": ObjectId(d["post_id"]), "likes": d["stored"]},
+                {"$inc": {"likes": d["actual"] - d["stored"]}},
+            )
+            for d in discrepancies
+        ]
+        return [(post_collection, ops)]
+
+
+class PostTagsCheck(ConsistencyCheck):
+    """
+    `posts.tags_id` é a fonte da verdade (é o que `create_post` grava e o
+    que as consultas usam); `post_tags` é reconstruída a partir dele.
+    """
+
+    name = "post_tags"
+    description = "posts.tags_id x associações em post_tags"
+    collections_changed = ("post_tags",)
+
+    def lookup_stages(self):
+        return [
+            {
+                "$lookup": {
+                    "from": "post_tags",
+                    "let": {"pid": {"$toString": "$_id"}},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$post_id", "$$pid"]}}},
+                        {"$project": {"_id": 1, "tag_id": 1}},
+                    ],
+                    "as": "associations",
+                }
+            },
+            {"$project": {"tags_id": 1, "associations": 1}},
+        ]
+
+    def compare(self, post):
+        expected = set(post.get("tags_id") or [])
+        seen = set()
+        duplicated = set()
+        for association in post["associations"]:
+            tag_id = association.get("tag_id")
+            if tag_id in seen:
+                duplicated.add(tag_id)
+            seen.add(tag_id)
+        missing = sorted(expected - seen)
+        extra = sorted(seen - expected, key=str)
+        duplicated = sorted(duplicated & expected)
+        if missing or extra or duplicated:
+            return {"post_id": str(post["_id"]), "missing": missing, "extra": extra, "duplicated": duplicated}
+        return None
+
+    async def confirm(self, discrepancies):
+        # Como em LikesCheck: `tags_id` e as associações são lidos de novo no
+        # primário. O reparo remove apenas as associações observadas aqui (as
+        # cópias de uma associação, mantendo a mais antiga, e as que sobram,
+        # exceto as recém-criadas) e recria só as que ainda faltam.
+        oids = [ObjectId(d["post_id"]) for d in discrepancies]
+        expected = {
+            str(post["_id"]): set(post.get("tags_id") or [])
+            async for post in post_collection.find({"_id": {"$in": oids}}, {"tags_id": 1})
+        }
+        associations: Dict[str, List[Dict[str, Any]]] = {}
+        async for association in post_tag_collection.find({"post_id": {"$in": list(expected)}}, {"post_id": 1, "tag_id": 1}).sort("_id", 1):
+            associations.setdefault(association["post_id"], []).append(association)
+        recent = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=RECENT_ASSOCIATION_SECONDS))
+        confirmed = []
+        for post_id, tags in expected.items():
+            seen = set()
+            remove = []
+            for association in associations.get(post_id, []):
+                tag_id = association.get("tag_id")
+                if tag_id in seen or (tag_id not in tags and association["_id"] < recent):
+                    remove.append(association["_id"])
+                seen.add(tag_id)
+            missing = sorted(tags - seen)
+            if missing or remove:
+                confirmed.append({"post_id": post_id, "missing": missing, "remove": remove})
+        return confirmed
+
+    def repair_operations(self, discrepancies):
+        ops = []
+        for d in discrepancies:
+            post_id = d["post_id"]
+            if d["remove"]:
+                ops.append(DeleteMany({"_id": {"$in": d["remove"]}}))
+            for tag_id in d["missing"]:
+                ops.append(UpdateOne(
+                    {"post_id": post_id, "tag_id": tag_id},
+                    {"$setOnInsert": {"post_id": post_id, "tag_id": tag_id}},
+                    upsert=True,
+                ))
+        return [(post_tag_collection, ops)]
+
+
+class CategoryCheck(ConsistencyCheck):
+    name = "categories"
+    description = "posts.category_id apontando para categorias inexistentes"
+    collections_changed = ("posts", POST_TAXONOMY)
+
+    def lookup_stages(self):
+        return [
+            {
+                "$lookup": {
+                    "from": "categories",
+                    "let": {
+                        "cid": {"$convert": {"input": "$category_id", "to": "objectId", "onError": None, "onNull": None}}
+                    },
+                    "pipeline": [{"$match": {"$expr": {"$eq": ["$_id", "$$cid"]}}}, {"$project": {"_id": 1}}],
+                    "as": "category",
+                }
+            },
+            {"$project": {"category_id": 1, "found": {"$gt": [{"$size": "$category"}, 0]}}},
+        ]
+
+    def compare(self, post):
+        if post.get("category_id") and not post["found"]:
+            return {"post_id": str(post["_id"]), "category_id": post["category_id"]}
+        return None
+
+    def repair_operations(self, discrepancies):
+        # Mesmo tratamento de `delete_category`: o post fica sem categoria.
+        # O filtro pela categoria observada preserva posts reatribuídos depois da leitura.
+        ops = [
+            UpdateOne({"_id": ObjectId(d["post_id"]), "category_id": d["category_id"]}, {"$set": {"category_id": None}})
+            for d in discrepancies
+        ]
+        return [(post_collection, ops)]
+
+
+CHECKS: Dict[str, ConsistencyCheck] = {check.name: check for check in (LikesCheck(), PostTagsCheck(), CategoryCheck())}
+
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _throttle(pause: float) -> None:
+    latency = command_monitor.snapshot()["ewma_ms"]
+    if latency > BUSY_LATENCY_MS:
+        pause = min(pause * (latency / BUSY_LATENCY_MS) ** 2, 5.0)
+    await asyncio.sleep(pause)
+
+
+async def run_check(
+    name: str,
+    repair: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE_SECONDS,
+    restart: bool = False,
+    max_chunks: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Executa (ou retoma) uma verificação de consistência.
+
+    O progresso é salvo em `consistency_runs` a cada bloco, então uma
+    execução interrompida continua do último `_id` processado. As leituras
+    preferem secundários; as correções são aplicadas com um `bulk_write`
+    por bloco, com pausas que crescem se a latência do banco subir.
+    """
+    check = CHECKS[name]
+    state = await consistency_run_collection.find_one({"_id": name})
+    if restart or not state or state.get("status") == "completed":
+        state = {
+            "_id": name,
+            "description": check.description,
+            "status": "running",
+            "repair": repair,
+            "last_id": None,
+            "scanned": 0,
+            "discrepancies": 0,
+            "repaired": 0,
+            "sample": [],
+            "started_at": datetime.now(),
+        }
+    state.pop("error", None)
+    state.update(status="running", repair=repair, updated_at=datetime.now())
+    await consistency_run_collection.replace_one({"_id": name}, state, upsert=True)
+
+    reader = post_collection.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+    chunks = 0
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            match = {"_id": {"$gt": state["last_id"]}} if state["last_id"] else {}
+            pipeline = [{"$match": match}, {"$sort": {"_id": 1}}, {"$limit": chunk_size}, *check.lookup_stages()]
+            posts = await reader.aggregate(pipeline).to_list(length=chunk_size)
+            if not posts:
+                state["status"] = "completed"
+                break
+
+            found = [d for d in (check.compare(post) for post in posts) if d]
+            state["scanned"] += len(posts)
+            state["discrepancies"] += len(found)
+            state["sample"] = (state["sample"] + found)[:MAX_SAMPLE]
+
+            if repair and found:
+                confirmed = await check.confirm(found)
+                for collection, operations in check.repair_operations(confirmed):
+                    if operations:
+                        await collection.bulk_write(operations, ordered=True)
+                state["repaired"] += len(confirmed)
+                for collection_name in check.collections_changed:
+                    await publish(collection_name)
+
+            state["last_id"] = posts[-1]["_id"]
+            state["updated_at"] = datetime.now()
+            await consistency_run_collection.replace_one({"_id": name}, state)
+            chunks += 1
+            await _throttle(pause)
+        else:
+            state["status"] = "paused"
+    except asyncio.CancelledError:
+        state["status"] = "interrupted"
+        raise
+    except Exception as e:
+        logger.exception(f"Erro na verificação de consistência '{name}': {e}")
+        state["status"] = "failed"
+        state["error"] = str(e)
+    finally:
+        state["updated_at"] = datetime.now()
+        await consistency_run_collection.replace_one({"_id": name}, state, upsert=True)
+
+    logger.info(
+        f"Verificação '{name}' {state['status']}: {state['scanned']} posts, "
+        f"{state['discrepancies']} divergências, {state['repaired']} corrigidas."
+    )
+    return state
+
+
+async def remove_duplicate_likes(collection: LazyCollection, batch_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Remove likes repetidos de um mesmo usuário no mesmo post, mantendo o
+    mais antigo, para que o índice único `(post_id, user_id)` possa ser
+    criado. Retorna quantos documentos foram removidos.
+    """
+    pipeline = [
+        {"$group": {"_id": {"post_id": "$post_id", "user_id": "$user_id"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    removed = 0
+    operations = []
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        operations += [DeleteOne({"_id": oid}) for oid in sorted(group["ids"])[1:]]
+        if len(operations) >= batch_size:
+            removed += (await collection.bulk_write(operations, ordered=False)).deleted_count
+            operations = []
+    if operations:
+        removed += (await collection.bulk_write(operations, ordered=False)).deleted_count
+    return removed
+
+
+def start_check(name: str, **options) -> bool:
+    """
+    Inicia `run_check` em segundo plano neste worker. Retorna False se a
+    mesma verificação já está em execução aqui.
+    """
+    running = _tasks.get(name)
+    if running and not running.done():
+        return False
+    _tasks[name] = asyncio.create_task(run_check(name, **options))
+    return True
+
+
+async def list_runs() -> List[Dict[str, Any]]:
+    return await consistency_run_collection.find().to_list(length=len(CHECKS))
@@ -1,20 +1,112 @@
 
-
 import motor.motor_asyncio
 from dotenv import load_dotenv
 import os
 
+from .monitoring import command_monitor, pool_monitor, slow_command_monitor
+
 load_dotenv()
-client = motor.motor_asyncio.AsyncIOMotorClient(os.getenv("MONGO_URL"))
 
+MONGO_URL = os.getenv("MONGO_URL")
+DATABASE_NAME = "blog"
+
+_client = None
+_client_pid = None
+_replica_set = None
+
+
+def get_client() -> motor.motor_asyncio.AsyncIOMotorClient:
+    """
+    Retorna o cliente Motor do processo atual, criando-o no primeiro uso.
+
+    O pymongo não é fork-safe: um cliente criado antes de um fork não pode
+    ser usado pelo processo filho. Por isso o cliente é criado sob demanda
+    (normalmente no lifespan de cada worker) e recriado se o PID mudar.
+    """
+    global _client, _client_pid, _replica_set
+    if _client is None or _client_pid != os.getpid():
+        _client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL, event_listeners=[pool_monitor, command_monitor, slow_command_monitor])
+        _client_pid = os.getpid()
+        _replica_set = None
+    return _client
+
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+def close_client() -> None:
+    """
+    Fecha o cliente do processo atual. Um cliente herdado por fork é apenas
+    descartado, pois seus sockets pertencem ao processo pai.
+    """
+    global _client, _client_pid, _replica_set
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
+    _replica_set = None
+
+
+async def is_replica_set() -> bool:
+    """
+    Indica se o MongoDB é um replica set (ou cluster shardado), o que
+    habilita transações e change streams. O resultado é memorizado por cliente.
+    """
+    global _replica_set
+    if _replica_set is None:
+        hello = await get_client().admin.command("hello")
+        _replica_set = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    return _replica_set
+
+
+async def run_in_transaction(callback):
+    """
+    Executa `callback(session)` dentro de uma transação quando o servidor
+    suporta; em um servidor standalone executa `callback(None)`.
+
+    Em uma transação o callback pode ser repetido em erros transitórios,
+    então ele não deve ter efeitos fora do banco. Exceções levantadas pelo
+    callback abortam a transação e são propagadas.
+    """
+    if await is_replica_set():
+        async with await get_client().start_session() as session:
+            return await session.with_transaction(callback)
+    return await callback(None)
+
+
+class LazyCollection:
+    """
+    Referência a uma coleção que é resolvida no cliente do processo atual a
+    cada acesso. Permite que os routers continuem importando as coleções no
+    nível do módulo sem abrir conexões durante o import.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_database()[self.name], attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
 
-database = client["blog"]
 
+post_collection = LazyCollection("posts")
+category_collection = LazyCollection("categories")
+tag_collection = LazyCollection("tags")
+comment_collection = LazyCollection("comments")
+post_tag_collection = LazyCollection("post_tags")
+user_collection = LazyCollection("users")
+post_like_collection = LazyCollection("post_likes")
+engagement_stats_collection = LazyCollection("engagement_stats")
+invalidation_log_collection = LazyCollection("invalidation_log")
+consistency_run_collection = LazyCollection("consistency_runs")
+author_collection = LazyCollection("authors")
+sketch_collection = LazyCollection("sketches")
+trending_collection = LazyCollection("trending")
 
-post_collection = database["posts"]
-category_collection = database["categories"]
-tag_collection = database["tags"]
-comment_collection = database["comments"]
-post_tag_collection = database["post_tags"] 
-user_collection = database["users"]
-post_like_collection = database["post_likes"]
\ No newline at end of file
+# Camada fria: posts antigos (e seus comentários e likes) movidos pelo job de arquivamento.
+post_archive_collection = LazyCollection("posts_archive")
+comment_archive_collection = LazyCollection("comments_archive")
+post_like_archive_collection = LazyCollection("post_likes_archive")
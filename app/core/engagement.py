@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from .db import engagement_stats_collection
+from ..logs.logger import logger
+
+
+GRANULARITIES = ("hour", "day")
+METRICS = ("likes", "comments")
+
+BUCKET_SIZES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Limite de buckets lidos por consulta, para que o endpoint nunca vire um scan.
+MAX_BUCKETS = {
+    "hour": 24 * 31,
+    "day": 366 * 3,
+}
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """
+    Trunca um instante para o início do bucket da granularidade informada.
+    """
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Granularidade inválida: {granularity}")
+
+
+async def record_engagement(post_id: str, metric: str, delta: int, moment: datetime) -> None:
+    """
+    Aplica um `$inc` (com upsert) nos buckets horário e diário do post.
+
+    O evento é contabilizado no bucket do seu próprio timestamp, então um
+    dislike ou a remoção de um comentário decrementa o bucket onde o like ou
+    o comentário original foi registrado. Falhas são apenas logadas: a
+    estatística não deve derrubar a operação principal.
+    """
+    other = "comments" if metric == "likes" else "likes"
+    operations = [
+        UpdateOne(
+            {"post_id": post_id, "granularity": granularity, "bucket_start": bucket_start(moment, granularity)},
+            {"$inc": {metric: delta}, "$setOnInsert": {other: 0}},
+            upsert=True,
+        )
+        for granularity in GRANULARITIES
+    ]
+    try:
+        await engagement_stats_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.exception(f"Erro ao registrar engajamento ({metric} {delta:+d}) do post {post_id}: {e}")
+
+
+async def read_engagement(post_id: str, granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Lê os buckets de um post no intervalo [start, end], em ordem cronológica.
+    Apenas buckets com atividade existem no banco.
+    """
+    cursor = engagement_stats_collection.find(
+        {
+            "post_id": post_id,
+            "granularity": granularity,
+            "bucket_start": {"$gte": bucket_start(start, granularity), "$lte": end},
+        },
+        {"_id": 0, "bucket_start": 1, "likes": 1, "comments": 1},
+    ).sort("bucket_start", 1)
+    return await cursor.to_list(length=MAX_BUCKETS[granularity])
@@ -0,0 +1,16 @@
+from ..logs.logger import config
+
+
+EXCERPT_LENGTH = config.get("posts", {}).get("excerpt_length", 200)
+
+
+def make_excerpt(content: str, length: int = EXCERPT_LENGTH) -> str:
+    """
+    Resumo do conteúdo de um post para as listagens: espaços normalizados e
+    corte na última palavra inteira antes de `length` caracteres.
+    """
+    text = " ".join((content or "").split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0] or text[:length]
+    return cut.rstrip(" ,.;:") + "…"
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List
+
+
+def _walk(plan: Dict[str, Any], stages: List[Dict[str, Any]]) -> None:
+    if not plan:
+        return
+    stages.append({key: plan[key] for key in ("stage", "indexName", "keyPattern", "filter") if key in plan})
+    for child in plan.get("inputStages", []):
+        _walk(child, stages)
+    _walk(plan.get("inputStage"), stages)
+
+
+def winning_plans(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Extrai os planos vencedores de um `explain`, seja de um `find`
+    (queryPlanner) ou de uma agregação (um plano por estágio `$cursor` e
+    por sub-pipeline de `$unionWith`).
+    """
+    plans = []
+    if "queryPlanner" in explain:
+        plans.append(explain["queryPlanner"]["winningPlan"])
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor")
+        if cursor:
+            plans.append(cursor["queryPlanner"]["winningPlan"])
+        union = stage.get("$unionWith")
+        if union and isinstance(union.get("pipeline"), (list, dict)):
+            inner = union["pipeline"]
+            plans.extend(winning_plans(inner if isinstance(inner, dict) else {"stages": inner}))
+    # No motor de execução SBE (MongoDB 6+) o plano clássico fica em `queryPlan`.
+    return [plan.get("queryPlan", plan) for plan in plans]
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resumo de um `explain` para diagnóstico: estágios do plano vencedor,
+    índices usados e se há COLLSCAN ou ordenação em memória.
+    """
+    stages: List[Dict[str, Any]] = []
+    for plan in winning_plans(explain):
+        _walk(plan, stages)
+    names = [stage["stage"] for stage in stages if "stage" in stage]
+    return {
+        "collscan": "COLLSCAN" in names,
+        "in_memory_sort": "SORT" in names,
+        "indexes": sorted({stage["indexName"] for stage in stages if "indexName" in stage}),
+        "stages": stages,
+    }
+
+
+def execution_stats(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Totais de um `explain` com verbosidade `executionStats`: documentos e
+    chaves de índice examinados, documentos retornados e tempo no servidor.
+    """
+    stats = []
+    if "executionStats" in explain:
+        stats.append(explain["executionStats"])
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor")
+        if cursor and "executionStats" in cursor:
+            stats.append(cursor["executionStats"])
+    if not stats:
+        return {}
+    return {
+        "docs_examined": sum(s.get("totalDocsExamined", 0) for s in stats),
+        "keys_examined": sum(s.get("totalKeysExamined", 0) for s in stats),
+        "returned": sum(s.get("nReturned", 0) for s in stats),
+        "execution_ms": max(s.get("executionTimeMillis", 0) for s in stats),
+    }
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import time
+from email.utils import format_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from bson import ObjectId
+
+from .cache import LocalCache
+from .db import category_collection, post_archive_collection, post_collection
+from .invalidation import publish_event, register_event_handler
+from ..logs.logger import config, logger
+
+
+FEEDS_CONFIG = config.get("feeds", {})
+FEED_SIZE = FEEDS_CONFIG.get("size", 20)
+# O protocolo de sitemaps aceita no máximo 50.000 URLs por arquivo.
+SITEMAP_CHUNK_SIZE = min(FEEDS_CONFIG.get("sitemap_chunk_size", 10000), 50000)
+CACHE_TTL_SECONDS = FEEDS_CONFIG.get("cache_ttl_seconds", 3600)
+MAX_AGE_SECONDS = FEEDS_CONFIG.get("max_age_seconds", 300)
+# Sem `base_url`, os links usam o host de cada requisição.
+BASE_URL = FEEDS_CONFIG.get("base_url")
+# Os arquivos ficam no cache com este marcador no lugar da URL base, que é
+# preenchida a cada resposta por `with_base_url`: o cabeçalho Host de uma
+# requisição nunca chega ao que é servido às outras.
+BASE_MARKER = "\x00base\x00"
+
+CHANNEL = "feeds"
+MAIN_FEED = "main"
+SITEMAP_INDEX = "sitemap"
+# Quantas URLs do sitemap são acumuladas antes de cada escrita no stream.
+STREAM_FLUSH_EVERY = 500
+
+SITEMAP_SOURCES = {"posts": post_collection, "archive": post_archive_collection}
+
+
+class FeedCache(LocalCache):
+    """
+    Arquivos já renderizados, indexados por `main`, `sitemap` ou pelo ID da
+    categoria. Além de limpar as chaves, cada invalidação registra quando
+    elas mudaram, o que vira o `Last-Modified` das respostas.
+    """
+
+    def __init__(self):
+        super().__init__("feeds", depends_on=("categories",), ttl=CACHE_TTL_SECONDS, key_scoped=True)
+        self.version = 0
+        self.cleared_at = time.time()
+        self.changed_at: Dict[str, float] = {}
+
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None) -> None:
+        keys = list(keys) if keys is not None else None
+        super().invalidate(keys)
+        self.version += 1
+        now = time.time()
+        if keys is None:
+            self.cleared_at = now
+            self.changed_at.clear()
+        else:
+            for key in keys:
+                self.changed_at[str(key)] = now
+
+    def last_modified(self, key: str) -> float:
+        return max(self.changed_at.get(key, 0.0), self.cleared_at)
+
+
+feed_cache = FeedCache()
+_rendering: Dict[str, asyncio.Task] = {}
+
+
+def _on_remote_event(payload: Dict[str, Any]) -> None:
+    feed_cache.invalidate(payload.get("keys"))
+
+
+register_event_handler(CHANNEL, _on_remote_event)
+
+
+async def invalidate_feeds(category_ids: Optional[Iterable[Optional[str]]] = None) -> None:
+    """
+    Descarta, em todos os workers, os arquivos afetados pela escrita de um
+    post: o feed geral, o sitemap e os feeds das categorias informadas (a
+    antiga e a nova, numa troca de categoria). Sem `category_ids`, descarta
+    todos. Os arquivos são regenerados na próxima requisição.
+    """
+    keys = None
+    if category_ids is not None:
+        keys = [MAIN_FEED, SITEMAP_INDEX, *sorted({str(category_id) for category_id in category_ids if category_id})]
+    feed_cache.invalidate(keys)
+    await publish_event(CHANNEL, {"keys": keys})
+
+
+def with_base_url(body: bytes, base_url: str) -> bytes:
+    """
+    Arquivo do cache com os links apontando para `base_url`.
+    """
+    return body.replace(BASE_MARKER.encode(), escape(base_url, {'"': "&quot;"}).encode())
+
+
+def _date(value) -> str:
+    return format_datetime(value.astimezone())
+
+
+def _rss(title: str, link: str, self_link: str, description: str, posts: List[Dict[str, Any]]) -> bytes:
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        "<channel>"
+        f"<title>{escape(title)}</title>"
+        f"<link>{escape(link)}</link>"
+        f"<description>{escape(description)}</description>"
+        f'<atom:link href={quoteattr(self_link)} rel="self" type="application/rss+xml"/>'
+    ]
+    for post in posts:
+        url = escape(f"{BASE_MARKER}/posts/{post['_id']}")
+        published = f"<pubDate>{_date(post['publication_date'])}</pubDate>" if post.get("publication_date") else ""
+        parts.append(
+            "<item>"
+            f"<title>{escape(post.get('title') or '')}</title>"
+            f"<link>{url}</link>"
+            f'<guid isPermaLink="true">{url}</guid>'
+            f"{published}"
+            f"<dc:creator>{escape((post.get('author') or {}).get('name') or '')}</dc:creator>"
+            f"<description>{escape(post.get('excerpt') or '')}</description>"
+            "</item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode()
+
+
+async def _latest_posts(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    projection = {"title": 1, "excerpt": 1, "author.name": 1, "publication_date": 1}
+    return await post_collection.find(query, projection).sort("publication_date", -1).limit(FEED_SIZE).to_list(length=FEED_SIZE)
+
+
+async def _cached(key: str, render: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+    """
+    Arquivo da chave, renderizando-o uma única vez mesmo com requisições
+    simultâneas. Um arquivo invalidado durante a renderização é servido a
+    quem esperava por ele, mas não entra no cache.
+    """
+    entry = feed_cache.get(key)
+    if entry is not None:
+        return entry
+    task = _rendering.get(key)
+    if task is None:
+        task = _rendering[key] = asyncio.ensure_future(_render(key, render))
+        task.add_done_callback(lambda _: _rendering.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _render(key: str, render: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+    version = feed_cache.version
+    started = time.perf_counter()
+    entry = await render()
+    if entry is None:
+        return None
+    entry["etag"] = f'"{hashlib.sha1(entry["body"]).hexdigest()}"'
+    entry["last_modified"] = feed_cache.last_modified(key)
+    if feed_cache.version == version:
+        feed_cache.set(key, entry)
+    logger.debug(f"Feed '{key}' renderizado em {(time.perf_counter() - started) * 1000:.1f} ms ({len(entry['body'])} bytes)")
+    return entry
+
+
+async def main_feed() -> Dict[str, Any]:
+    async def render():
+        posts = await _latest_posts({})
+        body = _rss("Blog", f"{BASE_MARKER}/posts/", f"{BASE_MARKER}/feed.xml", "Posts mais recentes do blog.", posts)
+        return {"body": body}
+
+    return await _cached(MAIN_FEED, render)
+
+
+async def category_feed(category_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Feed dos posts mais recentes da categoria, ou None se ela não existe.
+    """
+    async def render():
+        category = await category_collection.find_one({"_id": ObjectId(category_id)})
+        if category is None:
+            return None
+        posts = await _latest_posts({"category_id": category_id})
+        body = _rss(
+            f"Blog - {category['name']}",
+            f"{BASE_MARKER}/categories/{category_id}/posts",
+            f"{BASE_MARKER}/categories/{category_id}/feed.xml",
+            category.get("description") or f"Posts mais recentes da categoria {category['name']}.",
+            posts,
+        )
+        return {"body": body}
+
+    return await _cached(category_id, render)
+
+
+async def _chunk_starts(collection) -> List[ObjectId]:
+    """
+    `_id` inicial de cada parte da coleção. Cada busca parte do início da
+    anterior e anda `SITEMAP_CHUNK_SIZE` chaves no índice de `_id`, então a
+    coleção é percorrida uma vez só, sem ler os documentos.
+    """
+    starts: List[ObjectId] = []
+    query: Dict[str, Any] = {}
+    skip = 0
+    while True:
+        found = await collection.find(query, {"_id": 1}).sort("_id", 1).skip(skip).limit(1).to_list(length=1)
+        if not found:
+            return starts
+        starts.append(found[0]["_id"])
+        query, skip = {"_id": {"$gte": found[0]["_id"]}}, SITEMAP_CHUNK_SIZE
+
+
+async def sitemap_index() -> Dict[str, Any]:
+    """
+    Índice do sitemap. Cada parte cobre até `SITEMAP_CHUNK_SIZE` posts de
+    uma coleção (quente ou arquivo), numa faixa de `_id`; as faixas ficam no
+    cache junto com o XML, para que `/sitemaps/{n}.xml` leia a sua parte
+    direto pelo índice, sem `skip`.
+    """
+    async def render():
+        chunks: List[Tuple[str, ObjectId, Optional[ObjectId]]] = []
+        for source, collection in SITEMAP_SOURCES.items():
+            starts = await _chunk_starts(collection)
+            chunks += [(source, start, end) for start, end in zip(starts, starts[1:] + [None])]
+        entries = "".join(
+            f"<sitemap><loc>{escape(f'{BASE_MARKER}/sitemaps/{number}.xml')}</loc></sitemap>"
+            for number in range(len(chunks))
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+        ).encode()
+        return {"body": body, "chunks": chunks}
+
+    return await _cached(SITEMAP_INDEX, render)
+
+
+async def stream_sitemap_chunk(source: str, start: ObjectId, end: Optional[ObjectId], base_url: str):
+    """
+    Gera uma parte do sitemap direto do cursor, em blocos, sem montar o
+    arquivo inteiro em memória. A faixa `[start, end)` de `_id` é lida pelo
+    índice padrão, então o custo não cresce com o número da parte.
+    """
+    yield b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    query = {"_id": {"$gte": start}} if end is None else {"_id": {"$gte": start, "$lt": end}}
+    cursor = (
+        SITEMAP_SOURCES[source].find(query, {"publication_date": 1})
+        .sort("_id", 1)
+        .limit(SITEMAP_CHUNK_SIZE)
+        .batch_size(STREAM_FLUSH_EVERY)
+    )
+    buffer = []
+    async for post in cursor:
+        lastmod = f"<lastmod>{post['publication_date'].date().isoformat()}</lastmod>" if post.get("publication_date") else ""
+        url = escape(f"{base_url}/posts/{post['_id']}")
+        buffer.append(f"<url><loc>{url}</loc>{lastmod}</url>")
+        if len(buffer) >= STREAM_FLUSH_EVERY:
+            yield "".join(buffer).encode()
+            buffer = []
+    buffer.append("</urlset>")
+    yield "".join(buffer).encode()
@@ -0,0 +1,165 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from .db import (
+    LazyCollection,
+    author_collection,
+    comment_archive_collection,
+    comment_collection,
+    engagement_stats_collection,
+    post_archive_collection,
+    post_collection,
+    post_like_archive_collection,
+    post_like_collection,
+    post_tag_collection,
+    sketch_collection,
+    trending_collection,
+)
+from ..logs.logger import logger
+
+
+# (coleção, chaves, opções) de cada índice garantido na inicialização.
+INDEXES: List[Tuple[LazyCollection, list, Dict[str, Any]]] = [
+    # Atende a paginação por keyset dos comentários de um post e, pelo
+    # prefixo, qualquer filtro por post_id.
+    (comment_collection, [("post_id", ASCENDING), ("creation_date", ASCENDING), ("_id", ASCENDING)], {}),
+    # Filtros de `list_posts` seguindo a regra ESR (igualdade, ordenação,
+    # intervalo): cada filtro de igualdade (`category_id`, `tags_id`,
+    # `author.name`) tem um índice para cada uma das duas ordenações
+    # permitidas (`publication_date`, que também atende o intervalo de
+    # datas, e `likes`, o padrão). Combinações de vários filtros usam o
+    # índice do filtro mais seletivo e aplicam o restante no FETCH. Os
+    # prefixos substituem os antigos índices simples de `category_id` e
+    # `tags_id`.
+    (post_collection, [("category_id", ASCENDING), ("publication_date", DESCENDING)], {}),
+    (post_collection, [("category_id", ASCENDING), ("likes", DESCENDING)], {}),
+    (post_collection, [("tags_id", ASCENDING), ("publication_date", DESCENDING)], {}),
+    (post_collection, [("tags_id", ASCENDING), ("likes", DESCENDING)], {}),
+    # Também atende a paginação por keyset de `GET /authors/{name}/posts`.
+    (post_collection, [("author.name", ASCENDING), ("publication_date", DESCENDING), ("_id", DESCENDING)], {}),
+    (post_collection, [("author.name", ASCENDING), ("likes", DESCENDING)], {}),
+    (post_collection, [("likes", DESCENDING), ("publication_date", DESCENDING)], {}),
+    (post_collection, [("publication_date", DESCENDING)], {}),
+    (
+        engagement_stats_collection,
+        [("post_id", ASCENDING), ("granularity", ASCENDING), ("bucket_start", ASCENDING)],
+        {"unique": True},
+    ),
+    # Reconstrução a frio do trending: buckets horários recentes de todos os posts.
+    (engagement_stats_collection, [("granularity", ASCENDING), ("bucket_start", ASCENDING)], {}),
+    (post_like_collection, [("post_id", ASCENDING), ("user_id", ASCENDING)], {"unique": True}),
+    # Upserts do lote em `/post-tags/bulk`, o `$lookup` da verificação de
+    # consistência e a cascata de `delete_post`. Não é único porque
+    # `POST /post-tags/` ainda aceita associações repetidas.
+    (post_tag_collection, [("post_id", ASCENDING), ("tag_id", ASCENDING)], {}),
+    # Atividade do usuário (`/users/{id}/comments` e `/activity`) e a
+    # remoção em cascata dos comentários em `delete_user`.
+    (comment_collection, [("user_id", ASCENDING), ("creation_date", DESCENDING), ("_id", DESCENDING)], {}),
+    (post_like_collection, [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    # Ordenações do diretório de autores.
+    (author_collection, [("post_count", DESCENDING)], {}),
+    (author_collection, [("total_likes", DESCENDING)], {}),
+    (author_collection, [("latest_publication_date", DESCENDING)], {}),
+    # Camada fria: apenas o necessário para `include_archived` e para o
+    # fallback de `get_post`, que já usa o índice de `_id`.
+    (post_archive_collection, [("category_id", ASCENDING)], {}),
+    (post_archive_collection, [("tags_id", ASCENDING)], {}),
+    (post_archive_collection, [("publication_date", DESCENDING)], {}),
+    (post_archive_collection, [("author.name", ASCENDING)], {}),
+    (comment_archive_collection, [("post_id", ASCENDING), ("creation_date", ASCENDING), ("_id", ASCENDING)], {}),
+    (post_like_archive_collection, [("post_id", ASCENDING), ("user_id", ASCENDING)], {"unique": True}),
+    # Sketches de analytics: leitura por janela de dias e expiração via TTL.
+    (sketch_collection, [("day", ASCENDING)], {}),
+    (sketch_collection, [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    # Checkpoints de trending de workers que não existem mais.
+    (trending_collection, [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+]
+
+# Código do MongoDB para chave duplicada, também usado quando um índice
+# único não pode ser criado porque a coleção já tem duplicatas.
+DUPLICATE_KEY = 11000
+
+_status = "pending"
+_failures: List[Dict[str, Any]] = []
+_task: Optional[asyncio.Task] = None
+
+
+def index_status() -> str:
+    """
+    Estado da criação de índices neste worker: pending, building, ready ou failed.
+    """
+    return _status
+
+
+def index_failures() -> List[Dict[str, Any]]:
+    """
+    Índices que não puderam ser criados na última tentativa, com o erro.
+    """
+    return list(_failures)
+
+
+async def ensure_indexes() -> None:
+    """
+    Garante que os índices essenciais existam no MongoDB.
+
+    Os `create_index` são disparados em paralelo; como são idempotentes, o
+    custo em uma base já indexada é de uma ida ao servidor por índice.
+    """
+    global _status
+    _status = "building"
+    results = await asyncio.gather(
+        *(collection.create_index(keys, **options) for collection, keys, options in INDEXES),
+        return_exceptions=True,
+    )
+    failures = [
+        (collection.name, keys, result)
+        for (collection, keys, _), result in zip(INDEXES, results)
+        if isinstance(result, BaseException)
+    ]
+    _failures.clear()
+    for name, keys, error in failures:
+        duplicates = isinstance(error, DuplicateKeyError) or (
+            isinstance(error, OperationFailure) and error.code == DUPLICATE_KEY
+        )
+        if duplicates:
+            logger.error(
+                f"Índice único {keys} em {name} não foi criado: a coleção já tem documentos duplicados. "
+                "Remova-os com `python -m app.jobs.dedupe_likes`."
+            )
+        else:
+            logger.error(f"Erro ao criar índice {keys} em {name}: {error}")
+        _failures.append({
+            "collection": name,
+            "keys": [list(key) for key in keys],
+            "duplicates": duplicates,
+            "error": str(error),
+        })
+    _status = "failed" if failures else "ready"
+    if not failures:
+        logger.info(f"{len(INDEXES)} índices garantidos.")
+
+
+def start_index_creation() -> None:
+    """
+    Agenda a criação de índices em segundo plano, fora do caminho crítico
+    da inicialização: o worker começa a atender antes de ela terminar.
+    """
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(ensure_indexes())
+
+
+async def stop_index_creation() -> None:
+    global _task
+    if _task is None:
+        return
+    if not _task.done():
+        _task.cancel()
+    try:
+        await _task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _task = None
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import socket
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+
+from .cache import invalidate_local, watched_collections
+from .db import get_database, invalidation_log_collection, is_replica_set
+from ..logs.logger import logger
+
+
+INVALIDATION_LOG_SIZE_BYTES = 16 * 1024 * 1024
+POLL_INTERVAL_SECONDS = 0.5
+RETRY_INTERVAL_SECONDS = 5
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# "standalone" em processos sem consumidor (ex.: jobs), que sempre gravam no
+# invalidation_log; "disabled" quando nenhum cache foi registrado; e
+# "change_stream" ou "polling" depois que o consumidor inicia.
+_mode = "standalone"
+_consumer_task: Optional[asyncio.Task] = None
+# Publicado, em vez de "posts", pelas escritas que mudam a categoria, as
+# tags, o autor ou a data de um post, ou o conjunto de posts. Likes e
+# comentários também escrevem em `posts`, mas não o publicam.
+POST_TAXONOMY = "post_taxonomy"
+# Nomes de `publish` que não são coleções: sem change stream próprio, eles
+# sempre passam pelo invalidation_log.
+TOPICS = frozenset({POST_TAXONOMY})
+# Canal -> função que recebe os eventos publicados por outros workers.
+_event_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+
+
+def mode() -> str:
+    return _mode
+
+
+async def publish(collection: str, keys: Optional[Iterable[Hashable]] = None) -> None:
+    """
+    Publica a alteração de uma coleção para todos os workers.
+
+    Os caches deste processo são invalidados imediatamente. Os demais
+    processos são avisados pela change stream da própria coleção (quando o
+    MongoDB é um replica set) ou pelo `invalidation_log`, uma coleção capped
+    acompanhada por um cursor tailable. Em um worker da API, coleções das
+    quais nenhum cache depende não geram escrita alguma.
+    """
+    keys = [str(key) for key in keys] if keys is not None else None
+    if _mode == "disabled":
+        return
+    if _mode != "standalone" and collection not in watched_collections():
+        return
+    invalidate_local(collection, keys)
+    if _mode == "change_stream" and collection not in TOPICS:
+        return
+    try:
+        await invalidation_log_collection.insert_one({
+            "collection": collection,
+            "keys": keys,
+            "origin": WORKER_ID,
+            "created_at": datetime.now(),
+        })
+    except Exception as e:
+        logger.exception(f"Erro ao publicar invalidação da coleção {collection}: {e}")
+
+
+def register_event_handler(channel: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Registra quem trata, neste worker, os eventos de `channel` publicados
+    pelos demais com `publish_event`. Deve ser chamado antes do lifespan.
+    """
+    _event_handlers[channel] = handler
+
+
+async def publish_event(channel: str, payload: Dict[str, Any]) -> None:
+    """
+    Entrega `payload` aos handlers de `channel` dos outros workers pelo
+    `invalidation_log` (lido tanto no modo change stream quanto no polling).
+    O próprio worker deve tratar o evento localmente antes de publicá-lo.
+    """
+    if _mode == "disabled":
+        return
+    try:
+        await invalidation_log_collection.insert_one({
+            "collection": channel,
+            "keys": None,
+            "event": payload,
+            "origin": WORKER_ID,
+            "created_at": datetime.now(),
+        })
+    except Exception as e:
+        logger.exception(f"Erro ao publicar evento no canal {channel}: {e}")
+
+
+def _apply_log_entry(entry: dict) -> None:
+    if entry.get("origin") == WORKER_ID:
+        return
+    if "event" in entry:
+        handler = _event_handlers.get(entry["collection"])
+        if handler is not None:
+            # Um handler com defeito não pode derrubar o consumidor do log.
+            try:
+                handler(entry["event"])
+            except Exception as e:
+                logger.exception(f"Erro ao tratar evento do canal {entry['collection']}: {e}")
+        return
+    invalidate_local(entry["collection"], entry.get("keys"))
+
+
+async def ensure_invalidation_log() -> None:
+    try:
+        await get_database().create_collection(
+            invalidation_log_collection.name, capped=True, size=INVALIDATION_LOG_SIZE_BYTES
+        )
+    except CollectionInvalid:
+        pass
+
+
+async def _consume_change_stream() -> None:
+    collections = sorted(watched_collections() | {invalidation_log_collection.name})
+    pipeline = [{"$match": {"ns.coll": {"$in": collections}}}]
+    resume_token = None
+    while True:
+        try:
+            async with get_database().watch(pipeline, resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    collection = change["ns"]["coll"]
+                    if collection == invalidation_log_collection.name:
+                        if change.get("fullDocument"):
+                            _apply_log_entry(change["fullDocument"])
+                        continue
+                    document_key = change.get("documentKey", {}).get("_id")
+                    keys = [str(document_key)] if document_key is not None else None
+                    invalidate_local(collection, keys)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if resume_token is None:
+                raise
+            # Token inválido ou histórico perdido: recomeça do zero sem
+            # confiar em nada que esteja em cache.
+            logger.warning(f"Change stream de invalidação não pôde ser retomada ({e}). Reiniciando...")
+            resume_token = None
+            for collection in watched_collections():
+                invalidate_local(collection)
+            await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+        except PyMongoError as e:
+            logger.warning(f"Change stream de invalidação interrompida ({e}). Reconectando...")
+            await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+
+
+async def _consume_invalidation_log() -> None:
+    latest = await invalidation_log_collection.find({}, {"_id": 1}).sort("$natural", -1).limit(1).to_list(length=1)
+    last_id = latest[0]["_id"] if latest else None
+    while True:
+        try:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = invalidation_log_collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                async for entry in cursor:
+                    last_id = entry["_id"]
+                    _apply_log_entry(entry)
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.warning(f"Erro ao acompanhar o invalidation_log ({e}). Tentando novamente...")
+            await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+            continue
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def _consume() -> None:
+    global _mode
+    try:
+        await _run_consumer()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.exception(f"Consumidor de invalidação encerrado com erro: {e}")
+
+
+async def _run_consumer() -> None:
+    global _mode
+    await ensure_invalidation_log()
+    try:
+        use_change_stream = await is_replica_set()
+    except PyMongoError as e:
+        logger.warning(f"Não foi possível detectar a topologia do MongoDB ({e}). Usando polling.")
+        use_change_stream = False
+
+    if use_change_stream:
+        _mode = "change_stream"
+        logger.info("Invalidação de cache via change streams.")
+        try:
+            await _consume_change_stream()
+        except OperationFailure as e:
+            logger.warning(f"Change streams indisponíveis ({e}). Usando polling do invalidation_log.")
+
+    _mode = "polling"
+    logger.info("Invalidação de cache via polling do invalidation_log.")
+    await _consume_invalidation_log()
+
+
+async def start_invalidation_consumer() -> None:
+    """
+    Inicia, neste worker, o consumidor de eventos de invalidação.
+    """
+    global _consumer_task, _mode
+    if _consumer_task is not None:
+        return
+    if not watched_collections() and not _event_handlers:
+        _mode = "disabled"
+        return
+    _consumer_task = asyncio.create_task(_consume())
+
+
+async def stop_invalidation_consumer() -> None:
+    global _consumer_task, _mode
+    if _consumer_task is None:
+        return
+    _consumer_task.cancel()
+    try:
+        await _consumer_task
+    except asyncio.CancelledError:
+        pass
+    _consumer_task = None
+    _mode = "standalone"
@@ -0,0 +1,265 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+from .db import comment_collection
+from .invalidation import publish_event, register_event_handler
+from ..logs.logger import config, logger
+
+
+LIVE_CONFIG = config.get("live", {})
+HEARTBEAT_SECONDS = LIVE_CONFIG.get("heartbeat_seconds", 15)
+MAX_CONNECTIONS = LIVE_CONFIG.get("max_connections", 5000)
+MAX_QUEUED_EVENTS = LIVE_CONFIG.get("max_queued_events", 100)
+MAX_QUEUED_BYTES = LIVE_CONFIG.get("max_queued_bytes", 64 * 1024)
+MAX_LIFETIME_SECONDS = LIVE_CONFIG.get("max_lifetime_seconds", 300)
+# Sugestão ao EventSource de quanto esperar (ms) antes de reconectar.
+RETRY_MS = 3000
+
+CHANNEL = "live"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _frame(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n".encode()
+
+
+class Subscription:
+    """
+    Fila de um cliente conectado, limitada em eventos e em bytes.
+
+    Os frames são compartilhados entre todas as conexões do post, então a
+    fila guarda apenas referências. Um cliente lento que estoura o limite
+    perde os eventos pendentes e recebe, no lugar deles, um `snapshot` com
+    os contadores atuais: como os valores são absolutos, nada se perde.
+    """
+
+    def __init__(self, topic: "Topic"):
+        self.topic = topic
+        self.pending: Deque[bytes] = deque()
+        self.pending_bytes = 0
+        self.resync = True
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+        self.wakeup.set()
+
+    def push(self, frame: bytes) -> None:
+        if self.resync:
+            return
+        if len(self.pending) >= MAX_QUEUED_EVENTS or self.pending_bytes + len(frame) > MAX_QUEUED_BYTES:
+            self.dropped += len(self.pending) + 1
+            self.pending.clear()
+            self.pending_bytes = 0
+            self.resync = True
+        else:
+            self.pending.append(frame)
+            self.pending_bytes += len(frame)
+        self.wakeup.set()
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """
+        Próximo frame a enviar, ou None se nada chegou em `timeout` segundos.
+        """
+        if not self.resync and not self.pending:
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.resync:
+            self.resync = False
+            self.pending.clear()
+            self.pending_bytes = 0
+            return _frame("snapshot", self.topic.snapshot)
+        frame = self.pending.popleft()
+        self.pending_bytes -= len(frame)
+        return frame
+
+
+class Topic:
+    """
+    Estado de um post com espectadores neste worker. Enquanto o snapshot
+    é lido do banco, os contadores que chegam pelos eventos ficam em
+    `buffered` e são aplicados sobre ele quando a leitura termina.
+    """
+
+    def __init__(self, post_id: str, loading: "asyncio.Future[Optional[Dict[str, Any]]]"):
+        self.post_id = post_id
+        self.loading = loading
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.buffered: Dict[str, Any] = {}
+        self.waiting = 0
+        self.subscribers: Set[Subscription] = set()
+
+
+class LiveHub:
+    """
+    Distribui os eventos de cada post para as conexões SSE deste worker.
+
+    O estado de um post (likes e quantidade de comentários) é lido do banco
+    uma única vez, quando ele ganha o primeiro assinante, e depois mantido
+    pelos próprios eventos; novas conexões partem desse snapshot em memória.
+    Os eventos trazem os contadores absolutos, então um evento perdido é
+    corrigido pelo seguinte. Cada evento é serializado uma vez e
+    compartilhado por todas as filas.
+    """
+
+    def __init__(self):
+        self.topics: Dict[str, Topic] = {}
+        self.connections = 0
+        self.events = 0
+
+    def has_capacity(self) -> bool:
+        return self.connections < MAX_CONNECTIONS
+
+    async def subscribe(self, post_id: str, loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Subscription]:
+        """
+        Inscreve uma conexão no post. Retorna None se o post não existe.
+        Carregamentos simultâneos do mesmo post são feitos uma vez só. O
+        tópico é registrado antes da leitura, para que os eventos publicados
+        enquanto ela acontece não se percam.
+        """
+        topic = self.topics.get(post_id)
+        if topic is None:
+            topic = self.topics[post_id] = Topic(post_id, asyncio.ensure_future(loader()))
+        if topic.snapshot is None:
+            topic.waiting += 1
+            try:
+                snapshot = await asyncio.shield(topic.loading)
+            except BaseException:
+                topic.waiting -= 1
+                failed = topic.loading.done() and (topic.loading.cancelled() or topic.loading.exception() is not None)
+                if failed or not (topic.waiting or topic.subscribers):
+                    self._discard(topic)
+                raise
+            topic.waiting -= 1
+            if snapshot is None:
+                self._discard(topic)
+                return None
+            if topic.snapshot is None:
+                topic.snapshot = {**snapshot, **topic.buffered}
+        subscription = Subscription(topic)
+        topic.subscribers.add(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        topic = subscription.topic
+        if subscription in topic.subscribers:
+            topic.subscribers.discard(subscription)
+            self.connections -= 1
+        if not topic.subscribers and not topic.waiting:
+            self._discard(topic)
+
+    def _discard(self, topic: Topic) -> None:
+        if self.topics.get(topic.post_id) is topic:
+            del self.topics[topic.post_id]
+
+    def dispatch(self, post_id: str, event: str, data: Dict[str, Any]) -> None:
+        """
+        Aplica o evento ao snapshot do post e o entrega aos assinantes
+        locais. Posts sem assinantes neste worker são ignorados.
+        """
+        topic = self.topics.get(post_id)
+        if topic is None:
+            return
+        self.events += 1
+        counters = {field: data[field] for field in ("likes", "comments") if field in data}
+        if topic.snapshot is None:
+            topic.buffered.update(counters)
+            return
+        topic.snapshot.update(counters)
+        frame = _frame(event, dict(data, post_id=post_id))
+        for subscription in topic.subscribers:
+            subscription.push(frame)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "topics": len(self.topics),
+            "events": self.events,
+            "lagging": sum(1 for topic in self.topics.values() for sub in topic.subscribers if sub.resync),
+            "dropped_events": sum(sub.dropped for topic in self.topics.values() for sub in topic.subscribers),
+        }
+
+
+hub = LiveHub()
+
+
+def _on_remote_event(payload: Dict[str, Any]) -> None:
+    hub.dispatch(payload["post_id"], payload["event"], payload["data"])
+
+
+register_event_handler(CHANNEL, _on_remote_event)
+
+
+async def publish_live(post_id: str, event: str, data: Dict[str, Any]) -> None:
+    """
+    Entrega um evento (`likes` ou `comments`) às conexões deste worker e,
+    pelo `invalidation_log`, às dos demais. Falhas são apenas logadas.
+    """
+    try:
+        hub.dispatch(post_id, event, dict(data))
+        await publish_event(CHANNEL, {"post_id": post_id, "event": event, "data": data})
+    except Exception as e:
+        logger.exception(f"Erro ao publicar evento ao vivo do post {post_id}: {e}")
+
+
+async def publish_comments(post_id: str, data: Dict[str, Any]) -> None:
+    """
+    Publica o evento `comments` do post com a quantidade atual de
+    comentários, lida do banco (índice de `comments.post_id`). Assim como
+    em `likes`, o valor é absoluto e não depende dos eventos anteriores.
+    """
+    try:
+        count = await comment_collection.count_documents({"post_id": post_id})
+    except Exception as e:
+        logger.exception(f"Erro ao contar os comentários do post {post_id}: {e}")
+        return
+    await publish_live(post_id, "comments", dict(data, comments=count))
+
+
+async def stream(subscription: Subscription):
+    """
+    Gera o stream SSE de uma conexão: o snapshot inicial, os eventos e um
+    comentário de heartbeat quando não há nada a enviar. A conexão é
+    encerrada após `MAX_LIFETIME_SECONDS` para que o cliente reconecte,
+    possivelmente em outro worker.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + MAX_LIFETIME_SECONDS
+    yield f"retry: {RETRY_MS}\n\n".encode()
+    while loop.time() < deadline:
+        frame = await subscription.next(min(HEARTBEAT_SECONDS, max(deadline - loop.time(), 0)))
+        yield frame if frame is not None else b": heartbeat\n\n"
+
+
+class LiveResponse(StreamingResponse):
+    """
+    Resposta SSE de uma assinatura. A inscrição é desfeita quando a
+    resposta termina, de qualquer forma: o `finally` de um gerador que o
+    Starlette nunca começou a iterar (cliente que caiu antes do primeiro
+    envio) não roda, e a vaga e o tópico ficariam presos para sempre.
+    """
+
+    def __init__(self, subscription: Subscription, headers: Optional[Dict[str, str]] = None):
+        super().__init__(stream(subscription), media_type="text/event-stream", headers=headers)
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            hub.unsubscribe(self.subscription)
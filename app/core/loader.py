@@ -0,0 +1,151 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from .db import category_collection, tag_collection, user_collection
+
+
+# Coleções que podem ser expandidas -> (coleção, projeção).
+SOURCES = {
+    "categories": (category_collection, None),
+    "tags": (tag_collection, None),
+    "users": (user_collection, {"password": 0}),
+}
+# Expansão -> campo de referência do post que ela lê.
+POST_REFERENCES = {"category": "category_id", "tags": "tags_id"}
+
+
+class DataLoader:
+    """
+    Carrega documentos de uma coleção por `_id`, em lote.
+
+    Os `load` feitos no mesmo passo do event loop são reunidos em um único
+    `find({"_id": {"$in": [...]}})`, disparado no passo seguinte. IDs
+    repetidos viram uma única busca e cada ID é buscado no máximo uma vez
+    por loader; como o loader vive só durante uma requisição, o cache não
+    precisa de invalidação.
+    """
+
+    def __init__(self, collection, projection: Optional[Dict[str, int]] = None):
+        self.collection = collection
+        self.projection = projection
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+
+    def prime(self, document: Dict[str, Any]) -> None:
+        """
+        Adiciona ao cache um documento já lido pela rota (ex.: a categoria
+        validada antes da listagem), evitando buscá-lo de novo.
+        """
+        key = str(document["_id"])
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(dict(document, _id=key))
+            self._cache[key] = future
+
+    def load(self, id_value: Any) -> "asyncio.Future[Optional[Dict[str, Any]]]":
+        """
+        Documento com o `_id` informado, ou None se não existe ou o ID é inválido.
+        """
+        key = str(id_value)
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._pending:
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+            self._pending.append(key)
+        return future
+
+    async def load_many(self, ids: Iterable[Any]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(id_value) for id_value in ids)))
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        oids = []
+        for key in keys:
+            try:
+                oids.append(ObjectId(key))
+            except (InvalidId, TypeError):
+                pass
+        try:
+            documents = []
+            if oids:
+                documents = await self.collection.find({"_id": {"$in": oids}}, self.projection).to_list(length=None)
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {str(document["_id"]): dict(document, _id=str(document["_id"])) for document in documents}
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class RequestLoaders:
+    """
+    Um `DataLoader` por coleção, criado sob demanda. Use uma instância por
+    requisição (dependência `request_loaders`).
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, DataLoader] = {}
+
+    def __getitem__(self, name: str) -> DataLoader:
+        loader = self._loaders.get(name)
+        if loader is None:
+            collection, projection = SOURCES[name]
+            loader = self._loaders[name] = DataLoader(collection, projection)
+        return loader
+
+
+def request_loaders() -> RequestLoaders:
+    return RequestLoaders()
+
+
+def with_references(projection: Optional[Dict[str, int]], expand: Set[str]) -> Optional[Dict[str, int]]:
+    """
+    Garante que a projeção de posts leia os campos de referência das expansões pedidas.
+    """
+    if projection is None or not expand:
+        return projection
+    return {**projection, **{POST_REFERENCES[name]: 1 for name in expand}}
+
+
+async def expand_posts(posts: List[Dict[str, Any]], expand: Set[str], loaders: RequestLoaders) -> None:
+    """
+    Preenche `category` e/ou `tags` nos posts da página. As duas expansões
+    correm juntas, então a página inteira custa uma consulta por coleção.
+    """
+    async def categories():
+        documents = await loaders["categories"].load_many(post.get("category_id") for post in posts)
+        for post, category in zip(posts, documents):
+            post["category"] = category
+
+    async def tags():
+        loader = loaders["tags"]
+        futures = [[loader.load(tag_id) for tag_id in post.get("tags_id") or []] for post in posts]
+        for post, pending in zip(posts, futures):
+            post["tags"] = [tag for tag in await asyncio.gather(*pending) if tag is not None]
+
+    jobs = []
+    if "category" in expand:
+        jobs.append(categories())
+    if "tags" in expand:
+        jobs.append(tags())
+    await asyncio.gather(*jobs)
+
+
+async def expand_comments(comments: List[Dict[str, Any]], expand: Set[str], loaders: RequestLoaders) -> None:
+    """
+    Preenche `user` (sem a senha) nos comentários da página.
+    """
+    if "user" in expand:
+        users = await loaders["users"].load_many(comment.get("user_id") for comment in comments)
+        for comment, user in zip(comments, users):
+            comment["user"] = user
@@ -0,0 +1,173 @@
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import monitoring
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Acompanha o pool de conexões do cliente do MongoDB por servidor.
+
+    Os eventos chegam das threads do pymongo, por isso os contadores são
+    protegidos por um lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict[str, int]] = {}
+
+    def _update(self, address, **deltas) -> None:
+        key = f"{address[0]}:{address[1]}"
+        with self._lock:
+            pool = self._pools.setdefault(key, {"open": 0, "checked_out": 0, "cleared": 0, "checkout_failures": 0})
+            for field, delta in deltas.items():
+                pool[field] += delta
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+
+pool_monitor = PoolMonitor()
+
+
+def pool_status(client) -> Dict[str, Any]:
+    return {
+        "max_pool_size": client.options.pool_options.max_pool_size,
+        "min_pool_size": client.options.pool_options.min_pool_size,
+        "servers": pool_monitor.snapshot(),
+    }
+
+
+class CommandLatencyMonitor(monitoring.CommandListener):
+    """
+    Mantém uma média móvel exponencial (EWMA) da duração dos comandos
+    enviados ao MongoDB, usada pelo controle de admissão para decidir
+    quando rejeitar carga.
+
+    `getMore` e comandos de handshake ficam de fora: cursores tailable e
+    change streams bloqueiam no servidor de propósito e distorceriam a média.
+    """
+
+    IGNORED_COMMANDS = frozenset({"getMore", "hello", "isMaster", "ismaster", "ping", "killCursors", "endSessions"})
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.ewma_ms = 0.0
+        self.samples = 0
+        self.last_sample_at = 0.0
+
+    def _record(self, event) -> None:
+        if event.command_name in self.IGNORED_COMMANDS:
+            return
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            if self.samples == 0:
+                self.ewma_ms = duration_ms
+            else:
+                self.ewma_ms += self.alpha * (duration_ms - self.ewma_ms)
+            self.samples += 1
+            self.last_sample_at = time.monotonic()
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ewma_ms": round(self.ewma_ms, 3),
+                "samples": self.samples,
+                "seconds_since_last_sample": round(time.monotonic() - self.last_sample_at, 3) if self.samples else None,
+            }
+
+
+command_monitor = CommandLatencyMonitor()
+
+
+# Escopo ASGI da requisição em andamento. O Motor copia o contexto para a
+# thread que executa cada operação, então os listeners do pymongo conseguem
+# atribuir um comando à rota que o originou.
+current_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("current_request", default=None)
+
+
+class SlowCommandMonitor(monitoring.CommandListener):
+    """
+    Entrega a `handler` os comandos de leitura e escrita que levaram mais de
+    `threshold_ms`, com a requisição que os originou.
+
+    O comando é guardado (por referência) apenas enquanto está em execução;
+    nada é copiado para os comandos rápidos. `handler` é chamado na thread
+    do pymongo e deve apenas repassar o trabalho ao event loop.
+    """
+
+    CAPTURED_COMMANDS = frozenset({"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"})
+    IGNORED_DATABASES = frozenset({"admin", "config", "local"})
+
+    def __init__(self, threshold_ms: float = 100.0):
+        self.threshold_ms = threshold_ms
+        self.handler: Optional[Callable[..., None]] = None
+        self._inflight: Dict[Any, Any] = {}
+
+    def started(self, event):
+        if (
+            self.handler is None
+            or event.command_name not in self.CAPTURED_COMMANDS
+            or event.database_name in self.IGNORED_DATABASES
+        ):
+            return
+        self._inflight[(event.request_id, event.connection_id)] = (event.command, event.database_name, current_request.get())
+
+    def succeeded(self, event):
+        entry = self._inflight.pop((event.request_id, event.connection_id), None)
+        duration_ms = event.duration_micros / 1000
+        if entry is not None and duration_ms >= self.threshold_ms and self.handler is not None:
+            command, database, scope = entry
+            self.handler(event.command_name, command, database, scope, duration_ms)
+
+    def failed(self, event):
+        self._inflight.pop((event.request_id, event.connection_id), None)
+
+
+slow_command_monitor = SlowCommandMonitor()
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from ..logs.logger import config, logger
+
+
+PROFILING_CONFIG = config.get("profiling", {})
+SAMPLE_RATE = PROFILING_CONFIG.get("sample_rate", 0.0)
+HEADER_TRIGGER = PROFILING_CONFIG.get("header_trigger", True)
+INTERVAL_MS = PROFILING_CONFIG.get("interval_ms", 5)
+MAX_CONCURRENT = PROFILING_CONFIG.get("max_concurrent", 4)
+MAX_DURATION_SECONDS = PROFILING_CONFIG.get("max_duration_seconds", 30)
+RING_SIZE = PROFILING_CONFIG.get("ring_size", 50)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# O próprio profiler não é perfilado.
+EXCLUDED_PREFIXES = ("/admin/profiles",)
+# Pseudo-frame das amostras em que a task estava suspensa em um `await`.
+AWAIT_FRAME = "(await)"
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _await_chain(coro) -> List[Any]:
+    """
+    Frames de uma corrotina suspensa, seguindo os `await` aninhados (de
+    corrotinas, geradores e geradores assíncronos) até o objeto aguardado.
+    """
+    frames = []
+    awaitable = coro
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+            or getattr(awaitable, "ag_await", None)
+        )
+    return frames
+
+
+class Profile:
+    """
+    Amostras de uma requisição: cada pilha (da raiz para a folha) com o
+    número de vezes em que foi observada.
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str, task: asyncio.Task, thread_id: int):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = datetime.now()
+        self.duration_ms: Optional[float] = None
+        self.samples: Counter = Counter()
+        self.task = task
+        self.thread_id = thread_id
+        self._start = time.perf_counter()
+        self.deadline = self._start + MAX_DURATION_SECONDS
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+        self.task = None
+
+    def summary(self) -> Dict[str, Any]:
+        total = sum(self.samples.values())
+        awaiting = sum(count for stack, count in self.samples.items() if stack and stack[-1] == AWAIT_FRAME)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": total,
+            "awaiting_ratio": round(awaiting / total, 3) if total else None,
+        }
+
+
+class Sampler:
+    """
+    Profiler estatístico: uma thread acorda a cada `INTERVAL_MS` enquanto
+    houver requisições sendo perfiladas e registra, para cada uma, onde a
+    sua task está.
+
+    - Se a task é a que está rodando no event loop, a amostra é a pilha da
+      thread do loop a partir do frame da própria task.
+    - Se não, a task está suspensa: a amostra é a cadeia de corrotinas até
+      o `await` pendente (ex.: uma consulta no Motor), terminando em
+      `(await)`. Assim o perfil mostra o tempo de parede, não só a CPU.
+
+    Nada é instrumentado, então o custo para requisições não perfiladas é
+    nulo e, para as perfiladas, é o de uma leitura de pilha por intervalo.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: Profile) -> bool:
+        with self._lock:
+            if len(self._active) >= MAX_CONCURRENT:
+                return False
+            self._active[profile.id] = profile
+            self._wakeup.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        return True
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._wakeup.clear()
+                    continue
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    self._sample(profile, frames, now)
+                except Exception:
+                    # A task pode ter mudado de estado durante a leitura; a amostra é descartada.
+                    pass
+            time.sleep(self.interval)
+
+    def _sample(self, profile: Profile, frames: Dict[int, Any], now: float) -> None:
+        task = profile.task
+        if task is None or now > profile.deadline:
+            return
+        coro_frame = getattr(task.get_coro(), "cr_frame", None)
+        if asyncio.current_task(task.get_loop()) is task:
+            stack = []
+            frame = frames.get(profile.thread_id)
+            while frame is not None:
+                stack.append(frame)
+                if frame is coro_frame:
+                    break
+                frame = frame.f_back
+            stack.reverse()
+            profile.samples[tuple(_frame_name(frame) for frame in stack)] += 1
+        else:
+            stack = _await_chain(task.get_coro())
+            profile.samples[tuple(_frame_name(frame) for frame in stack) + (AWAIT_FRAME,)] += 1
+
+
+sampler = Sampler(INTERVAL_MS / 1000)
+profiles: Deque[Profile] = deque(maxlen=RING_SIZE)
+_ids = itertools.count(1)
+
+
+def get_profile(profile_id: int) -> Optional[Profile]:
+    for profile in profiles:
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+def merge_samples(selected: Iterable[Profile]) -> Counter:
+    merged: Counter = Counter()
+    for profile in selected:
+        merged.update(profile.samples)
+    return merged
+
+
+def to_collapsed(samples: Counter) -> str:
+    """
+    Formato "collapsed stacks" (flamegraph.pl, speedscope, inferno): uma
+    linha por pilha, frames separados por `;` e a contagem no final.
+    """
+    return "\n".join(f"{';'.join(stack)} {count}" for stack, count in samples.most_common()) + "\n"
+
+
+def to_speedscope(samples: Counter, name: str) -> Dict[str, Any]:
+    """
+    Perfil "sampled" no formato de arquivo do speedscope, com o peso de
+    cada pilha em milissegundos.
+    """
+    frame_index: Dict[str, int] = {}
+    stacks: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in samples.most_common():
+        stacks.append([frame_index.setdefault(frame, len(frame_index)) for frame in stack])
+        weights.append(count * INTERVAL_MS)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": frame} for frame in frame_index]},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stacks,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "blog-api",
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila requisições escolhidas por amostragem
+    (`sample_rate`) ou pelo cabeçalho `X-Profile: 1`. O ID do perfil volta
+    no cabeçalho `X-Profile-Id` e o resultado fica em `/admin/profiles`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PREFIXES):
+            return False
+        if HEADER_TRIGGER:
+            for name, value in scope.get("headers", ()):
+                if name == PROFILE_HEADER.encode() and value in (b"1", b"true"):
+                    return True
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(next(_ids), scope["method"], scope["path"], asyncio.current_task(), threading.get_ident())
+        if not sampler.add(profile):
+            logger.debug(f"Perfil de {scope['path']} ignorado: limite de perfis simultâneos atingido.")
+            await self.app(scope, receive, send)
+            return
+
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [(PROFILE_ID_HEADER, str(profile.id).encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.remove(profile)
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            profile.finish(status)
+            profiles.append(profile)
@@ -0,0 +1,177 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from .monitoring import command_monitor
+from ..logs.logger import config, logger
+
+
+MAX_TRACKED_KEYS = 100_000
+
+
+class TokenBucket:
+    """
+    Token bucket: `burst` requisições de uma vez, repostas a `rate` por segundo.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+
+    def acquire(self, now: float) -> float:
+        """
+        Consome um token. Retorna 0 se a requisição foi admitida ou, caso
+        contrário, quantos segundos faltam para o próximo token.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SlidingWindow:
+    """
+    Janela deslizante aproximada (contador da janela atual + anterior
+    ponderado), com memória constante por chave.
+    """
+
+    __slots__ = ("limit", "window", "window_start", "current", "previous")
+
+    def __init__(self, limit: int, window: float, now: float):
+        self.limit = limit
+        self.window = window
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+
+    def acquire(self, now: float) -> float:
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            windows = int(elapsed // self.window)
+            self.previous = self.current if windows == 1 else 0
+            self.current = 0
+            self.window_start += windows * self.window
+            elapsed = now - self.window_start
+        weight = 1 - elapsed / self.window
+        if self.previous * weight + self.current < self.limit:
+            self.current += 1
+            return 0.0
+        return self.window - elapsed
+
+
+def _new_limiter(budget: Dict[str, Any], now: float):
+    if "limit" in budget:
+        return SlidingWindow(budget["limit"], budget["window"], now)
+    return TokenBucket(budget["rate"], budget["burst"], now)
+
+
+class AdmissionController:
+    """
+    Controle de admissão em processo para as rotas de escrita.
+
+    Cada rota tem orçamentos por usuário e por IP (seção `rate_limits` do
+    `config.yml`); as chaves são mantidas em um LRU limitado. Além disso,
+    quando a latência média dos comandos no MongoDB passa do limite
+    configurado, as rotas controladas respondem 503 para proteger o
+    throughput do restante da API.
+    """
+
+    def __init__(self, budgets: Dict[str, Dict[str, Any]], shedding: Dict[str, Any]):
+        self.budgets = budgets
+        self.shedding = shedding
+        self._limiters: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.rejected = 0
+        self.shed = 0
+
+    def _acquire(self, route: str, scope: str, identity: str, now: float) -> float:
+        budget = self.budgets.get(route, {}).get(scope)
+        if not budget or not identity:
+            return 0.0
+        key = (route, scope, identity)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = _new_limiter(budget, now)
+            if len(self._limiters) > MAX_TRACKED_KEYS:
+                self._limiters.popitem(last=False)
+        else:
+            self._limiters.move_to_end(key)
+        return limiter.acquire(now)
+
+    def overloaded(self) -> bool:
+        threshold = self.shedding.get("latency_threshold_ms")
+        if not threshold:
+            return False
+        stats = command_monitor.snapshot()
+        if stats["samples"] < self.shedding.get("min_samples", 20):
+            return False
+        if stats["seconds_since_last_sample"] > self.shedding.get("stale_after_seconds", 5):
+            return False
+        return stats["ewma_ms"] > threshold
+
+    def check(self, route: str, client_ip: Optional[str], user_id: Optional[str] = None) -> None:
+        if self.overloaded():
+            self.shed += 1
+            retry_after = self.shedding.get("retry_after_seconds", 2)
+            logger.warning(f"Load shedding em {route}: latência do MongoDB acima do limite.")
+            raise HTTPException(
+                status_code=503,
+                detail="Serviço sobrecarregado. Tente novamente em instantes.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        now = time.monotonic()
+        wait = max(
+            self._acquire(route, "per_user", user_id, now),
+            self._acquire(route, "per_ip", client_ip, now),
+        )
+        if wait > 0:
+            self.rejected += 1
+            logger.warning(f"Limite de requisições excedido em {route} (usuário={user_id}, ip={client_ip}).")
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas requisições. Tente novamente mais tarde.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked_keys": len(self._limiters),
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "mongo_latency": command_monitor.snapshot(),
+        }
+
+
+command_monitor.alpha = config.get("load_shedding", {}).get("ewma_alpha", command_monitor.alpha)
+admission_controller = AdmissionController(config.get("rate_limits", {}), config.get("load_shedding", {}))
+
+
+def client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+def enforce_admission(route: str, request: Request, user_id: Optional[str] = None) -> None:
+    """
+    Aplica o controle de admissão de `route` à requisição atual. Use
+    diretamente no handler quando o usuário só é conhecido pelo corpo.
+    """
+    admission_controller.check(route, client_ip(request), user_id)
+
+
+def admission(route: str):
+    """
+    Dependência declarativa de controle de admissão. O usuário é lido do
+    parâmetro de caminho `user_id`, quando a rota tiver um.
+    """
+    async def dependency(request: Request):
+        enforce_admission(route, request, request.path_params.get("user_id"))
+    return Depends(dependency)
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from .db import comment_collection, post_collection
+from .invalidation import publish
+from ..logs.logger import config
+
+
+# Quantidade de comentários mais recentes embutidos em cada post.
+RECENT_COMMENTS_SIZE = config.get("posts", {}).get("recent_comments_size", 5)
+
+PREVIEW_FIELDS = ("_id", "user_id", "content", "creation_date")
+
+
+def comment_preview(comment: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: comment.get(field) for field in PREVIEW_FIELDS}
+
+
+def _post_oid(post_id: str) -> Optional[ObjectId]:
+    return ObjectId(post_id) if ObjectId.is_valid(post_id) else None
+
+
+async def push_recent_comment(post_id: str, comment: Dict[str, Any]) -> bool:
+    """
+    Insere o comentário na prévia do post, mantendo apenas os
+    `RECENT_COMMENTS_SIZE` mais recentes (do mais novo para o mais antigo).
+    Retorna False se o post não existe mais.
+    """
+    result = await post_collection.update_one(
+        {"_id": _post_oid(post_id)},
+        {
+            "$push": {
+                "recent_comments": {
+                    "$each": [comment_preview(comment)],
+                    "$sort": {"creation_date": -1},
+                    "$slice": RECENT_COMMENTS_SIZE,
+                }
+            }
+        },
+    )
+    if result.matched_count:
+        await publish("posts", [post_id])
+    return bool(result.matched_count)
+
+
+async def update_recent_comment(post_id: str, comment_id: ObjectId, content: str) -> None:
+    result = await post_collection.update_one(
+        {"_id": _post_oid(post_id), "recent_comments._id": comment_id},
+        {"$set": {"recent_comments.$.content": content}},
+    )
+    if result.modified_count:
+        await publish("posts", [post_id])
+
+
+async def refresh_recent_comments(post_id: str) -> None:
+    """
+    Recalcula a prévia do post a partir da coleção `comments` (uma leitura
+    no índice `(post_id, creation_date, _id)`). Usado quando um comentário
+    da prévia é removido e é preciso trazer o próximo mais recente.
+    """
+    comments = (
+        await comment_collection.find({"post_id": post_id}, {field: 1 for field in PREVIEW_FIELDS})
+        .sort([("creation_date", -1), ("_id", -1)])
+        .limit(RECENT_COMMENTS_SIZE)
+        .to_list(length=RECENT_COMMENTS_SIZE)
+    )
+    await post_collection.update_one(
+        {"_id": _post_oid(post_id)},
+        {"$set": {"recent_comments": [comment_preview(comment) for comment in comments]}},
+    )
+    await publish("posts", [post_id])
+
+
+async def remove_recent_comment(post_id: str, comment_id: ObjectId) -> None:
+    """
+    Remove o comentário da prévia e, se ele estava nela, completa a prévia
+    com o próximo comentário mais recente.
+    """
+    result = await post_collection.update_one(
+        {"_id": _post_oid(post_id), "recent_comments._id": comment_id},
+        {"$pull": {"recent_comments": {"_id": comment_id}}},
+    )
+    if result.modified_count:
+        await refresh_recent_comments(post_id)
+
+
+async def posts_previewing_user(user_id: str) -> List[str]:
+    """
+    Posts cuja prévia contém comentários do usuário. Os candidatos vêm dos
+    comentários do usuário (índice de `comments.user_id`), então não há
+    varredura de `posts`.
+    """
+    post_ids = await comment_collection.distinct("post_id", {"user_id": user_id})
+    oids = [oid for oid in map(_post_oid, post_ids) if oid is not None]
+    if not oids:
+        return []
+    posts = await post_collection.find(
+        {"_id": {"$in": oids}, "recent_comments.user_id": user_id}, {"_id": 1}
+    ).to_list(length=None)
+    return [str(post["_id"]) for post in posts]
@@ -0,0 +1,133 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from .cache import LocalCache
+
+
+_MISSING = object()
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Coalesce chamadas concorrentes e idênticas em uma única execução.
+
+    Enquanto uma leitura para uma chave está em andamento, as demais
+    requisições com a mesma chave aguardam o mesmo resultado em vez de
+    repetir as consultas no MongoDB. A execução roda em uma task própria,
+    então o cancelamento de quem a iniciou (ex.: cliente desconectou) não
+    afeta quem está esperando.
+
+    Com `ttl`, o resultado fica ainda alguns instantes em um `LocalCache`
+    invalidado pelas escritas nas coleções de `depends_on`. Um resultado
+    não é guardado se houve invalidação enquanto ele era calculado.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        depends_on: Iterable[str] = (),
+        key_scoped: bool = False,
+        maxsize: int = 4096,
+    ):
+        if name in _groups:
+            raise ValueError(f"Já existe um grupo single-flight com o nome '{name}'")
+        self.name = name
+        self.cache = (
+            LocalCache(f"singleflight:{name}", depends_on, ttl=ttl, maxsize=maxsize, key_scoped=key_scoped)
+            if ttl else None
+        )
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        _groups[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        if self.cache is not None:
+            cached = self.cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self.cache.invalidations if self.cache is not None else None
+        try:
+            result = await fn()
+        finally:
+            self._inflight.pop(key, None)
+        if self.cache is not None and self.cache.invalidations == generation:
+            self.cache.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache.hits if self.cache is not None else 0,
+            "in_flight": len(self._inflight),
+        }
+
+
+def registered_groups() -> List[SingleFlight]:
+    return list(_groups.values())
+
+
+def _hashable(value: Any) -> Hashable:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def coalesce(
+    name: str,
+    ttl: Optional[float] = None,
+    depends_on: Iterable[str] = (),
+    key_param: Optional[str] = None,
+):
+    """
+    Decorator que aplica single-flight (e, opcionalmente, um micro-cache)
+    a um endpoint de leitura.
+
+    A chave é formada por todos os argumentos do endpoint. Com `key_param`,
+    apenas esse argumento (o ID de um documento de `depends_on`) é usado e
+    as invalidações passam a remover somente a chave do documento alterado.
+    """
+    if key_param is not None and len(tuple(depends_on)) != 1:
+        raise ValueError("key_param exige exatamente uma coleção em depends_on")
+    group = SingleFlight(name, ttl=ttl, depends_on=depends_on, key_scoped=key_param is not None)
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if key_param is not None:
+                key = str(bound.arguments[key_param])
+            else:
+                key = tuple((param, _hashable(value)) for param, value in bound.arguments.items())
+            return await group.do(key, lambda: endpoint(*args, **kwargs))
+
+        wrapper.singleflight = group
+        return wrapper
+
+    return decorator
@@ -0,0 +1,394 @@
+import asyncio
+import hashlib
+import math
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import Binary
+
+from .db import sketch_collection
+from .invalidation import WORKER_ID
+from ..logs.logger import config, logger
+
+
+SKETCH_CONFIG = config.get("sketches", {})
+HLL_PRECISION = SKETCH_CONFIG.get("hll_precision", 12)
+CMS_WIDTH = SKETCH_CONFIG.get("cms_width", 2048)
+CMS_DEPTH = SKETCH_CONFIG.get("cms_depth", 4)
+TOP_K = SKETCH_CONFIG.get("top_k", 50)
+RETENTION_DAYS = SKETCH_CONFIG.get("retention_days", 30)
+PERSIST_INTERVAL_SECONDS = SKETCH_CONFIG.get("persist_interval_seconds", 30)
+
+
+def _hash128(item: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big")
+
+
+class HyperLogLog:
+    """
+    Contagem aproximada de elementos distintos em memória fixa (2^p bytes).
+    Erro padrão relativo de 1,04/sqrt(2^p); a união de dois HLLs é o
+    máximo registrador a registrador.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, item: str) -> None:
+        h, _ = _hash128(item)
+        index = h >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = h & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Correção para cardinalidades pequenas (linear counting).
+            estimate = self.m * math.log(self.m / zeros)
+        return round(estimate)
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": Binary(bytes(self.registers))}
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "HyperLogLog":
+        return cls(document["precision"], document["registers"])
+
+
+class CountMinSketch:
+    """
+    Frequência aproximada por item. A estimativa nunca é menor que o valor
+    real e, com probabilidade 1 - e^-depth, excede-o em no máximo
+    (e / width) * total. Dois sketches de mesmas dimensões se somam.
+    """
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH, counters: Optional[bytes] = None, total: int = 0):
+        self.width = width
+        self.depth = depth
+        self.counters = array("q")
+        if counters:
+            self.counters.frombytes(counters)
+        else:
+            self.counters.extend([0] * (width * depth))
+        self.total = total
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _cells(self, item: str) -> Iterable[int]:
+        h1, h2 = _hash128(item)
+        for row in range(self.depth):
+            yield row * self.width + (h1 + row * h2) % self.width
+
+    def add(self, item: str, count: int = 1) -> None:
+        for cell in self._cells(item):
+            self.counters[cell] += count
+        self.total += count
+
+    def estimate(self, item: str) -> int:
+        return min(self.counters[cell] for cell in self._cells(item))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        for i, value in enumerate(other.counters):
+            self.counters[i] += value
+        self.total += other.total
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"width": self.width, "depth": self.depth, "total": self.total, "counters": Binary(self.counters.tobytes())}
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "CountMinSketch":
+        return cls(document["width"], document["depth"], document["counters"], document["total"])
+
+
+class SpaceSaving:
+    """
+    Top-K aproximado (algoritmo Space-Saving) com `k` contadores. Todo item
+    com frequência acima de total/k está no resumo, e cada contagem excede a
+    real em no máximo o seu `error`.
+    """
+
+    def __init__(self, k: int = TOP_K, counters: Optional[Dict[str, List[int]]] = None):
+        self.k = k
+        self.counters: Dict[str, List[int]] = counters or {}
+
+    def add(self, item: str, count: int = 1) -> None:
+        entry = self.counters.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counters) < self.k:
+            self.counters[item] = [count, 0]
+        else:
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + count, floor]
+
+    def _floor(self) -> int:
+        if len(self.counters) < self.k:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving") -> None:
+        # Um item ausente de um dos resumos pode ter tido até o menor contador
+        # daquele resumo; esse valor entra como contagem e como erro.
+        floor_self, floor_other = self._floor(), other._floor()
+        merged: Dict[str, List[int]] = {}
+        for item in set(self.counters) | set(other.counters):
+            count_a, error_a = self.counters.get(item, (floor_self, floor_self))
+            count_b, error_b = other.counters.get(item, (floor_other, floor_other))
+            merged[item] = [count_a + count_b, error_a + error_b]
+        top = sorted(merged.items(), key=lambda entry: entry[1][0], reverse=True)[:self.k]
+        self.counters = {item: entry for item, entry in top}
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        ranked = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)[:n]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"k": self.k, "counters": [[item, count, error] for item, (count, error) in self.counters.items()]}
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "SpaceSaving":
+        return cls(document["k"], {item: [count, error] for item, count, error in document["counters"]})
+
+
+class HeavyHitters:
+    """
+    Space-Saving para descobrir os itens mais frequentes, com as contagens
+    refinadas por um Count-Min (fica o menor dos dois limites superiores).
+    """
+
+    def __init__(self, summary: Optional[SpaceSaving] = None, sketch: Optional[CountMinSketch] = None):
+        self.summary = summary or SpaceSaving()
+        self.sketch = sketch or CountMinSketch()
+
+    def add(self, item: str, count: int = 1) -> None:
+        self.summary.add(item, count)
+        self.sketch.add(item, count)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.summary.merge(other.summary)
+        self.sketch.merge(other.sketch)
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        result = []
+        for item, count, error in self.summary.top(n):
+            estimate = min(count, self.sketch.estimate(item))
+            result.append({"value": item, "count": estimate, "lower_bound": max(count - error, 0)})
+        result.sort(key=lambda entry: entry["count"], reverse=True)
+        return result
+
+    def bounds(self) -> Dict[str, Any]:
+        total = self.sketch.total
+        return {
+            "events": total,
+            "max_overestimate": min(math.ceil(total / self.summary.k), math.ceil(self.sketch.epsilon * total)),
+            "confidence": round(1 - self.sketch.delta, 4),
+            "guaranteed_above": math.ceil(total / self.summary.k),
+        }
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"summary": self.summary.to_document(), "sketch": self.sketch.to_document()}
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "HeavyHitters":
+        return cls(SpaceSaving.from_document(document["summary"]), CountMinSketch.from_document(document["sketch"]))
+
+
+class DailySketches:
+    """
+    Sketches de um dia: commenters e likers distintos (HLL) e os posts e
+    tags com mais engajamento (comentários + likes).
+    """
+
+    DISTINCT = ("commenters", "likers")
+    HEAVY = ("posts", "tags")
+
+    def __init__(self):
+        self.distinct = {name: HyperLogLog() for name in self.DISTINCT}
+        self.heavy = {name: HeavyHitters() for name in self.HEAVY}
+        self.dirty = False
+
+    def merge(self, other: "DailySketches") -> None:
+        for name in self.DISTINCT:
+            self.distinct[name].merge(other.distinct[name])
+        for name in self.HEAVY:
+            self.heavy[name].merge(other.heavy[name])
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            **{name: hll.to_document() for name, hll in self.distinct.items()},
+            **{name: hitters.to_document() for name, hitters in self.heavy.items()},
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "DailySketches":
+        sketches = cls()
+        sketches.distinct = {name: HyperLogLog.from_document(document[name]) for name in cls.DISTINCT}
+        sketches.heavy = {name: HeavyHitters.from_document(document[name]) for name in cls.HEAVY}
+        return sketches
+
+
+_days: Dict[date, DailySketches] = {}
+_persist_task: Optional[asyncio.Task] = None
+
+
+def _today_sketches(moment: Optional[datetime]) -> Optional[DailySketches]:
+    day = (moment or datetime.now()).date()
+    if day < date.today() - timedelta(days=RETENTION_DAYS):
+        return None
+    sketches = _days.get(day)
+    if sketches is None:
+        sketches = _days[day] = DailySketches()
+    sketches.dirty = True
+    return sketches
+
+
+def record_comment(user_id: str, post_id: str, tag_ids: Iterable[str], moment: Optional[datetime] = None) -> None:
+    """
+    Registra um comentário nos sketches do dia. Só memória; a persistência
+    é feita periodicamente em segundo plano.
+    """
+    sketches = _today_sketches(moment)
+    if sketches is None:
+        return
+    sketches.distinct["commenters"].add(user_id)
+    _record_engagement(sketches, post_id, tag_ids)
+
+
+def record_like(user_id: str, post_id: str, tag_ids: Iterable[str], moment: Optional[datetime] = None) -> None:
+    sketches = _today_sketches(moment)
+    if sketches is None:
+        return
+    sketches.distinct["likers"].add(user_id)
+    _record_engagement(sketches, post_id, tag_ids)
+
+
+def _record_engagement(sketches: DailySketches, post_id: str, tag_ids: Iterable[str]) -> None:
+    sketches.heavy["posts"].add(post_id)
+    for tag_id in tag_ids or ():
+        sketches.heavy["tags"].add(tag_id)
+
+
+def _document_id(day: date) -> str:
+    return f"{WORKER_ID}:{day.isoformat()}"
+
+
+async def persist_sketches() -> None:
+    """
+    Grava os sketches alterados deste worker (um documento por worker e
+    por dia) e descarta da memória os dias fora da retenção.
+    """
+    cutoff = date.today() - timedelta(days=RETENTION_DAYS)
+    for day in [day for day in _days if day < cutoff]:
+        del _days[day]
+    for day, sketches in list(_days.items()):
+        if not sketches.dirty:
+            continue
+        sketches.dirty = False
+        day_start = datetime.combine(day, datetime.min.time())
+        try:
+            await sketch_collection.replace_one(
+                {"_id": _document_id(day)},
+                {
+                    "worker": WORKER_ID,
+                    "day": day_start,
+                    "sketches": sketches.to_document(),
+                    "updated_at": datetime.now(),
+                    "expires_at": day_start + timedelta(days=RETENTION_DAYS + 1),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            sketches.dirty = True
+            logger.exception(f"Erro ao persistir sketches de {day}: {e}")
+
+
+async def _restore_sketches() -> None:
+    """
+    Recarrega o estado persistido por este worker (mesmo host e PID) antes
+    de um restart, somando-o ao que já foi registrado desde a inicialização.
+    """
+    cutoff = datetime.combine(date.today() - timedelta(days=RETENTION_DAYS), datetime.min.time())
+    async for document in sketch_collection.find({"worker": WORKER_ID, "day": {"$gte": cutoff}}):
+        day = document["day"].date()
+        restored = DailySketches.from_document(document["sketches"])
+        if day in _days:
+            restored.merge(_days[day])
+        restored.dirty = day in _days
+        _days[day] = restored
+
+
+async def load_window(days: int) -> Dict[date, DailySketches]:
+    """
+    Sketches dos últimos `days` dias somando todos os workers: os
+    documentos persistidos pelos demais e a memória deste worker, que é
+    mais recente que o seu próprio documento.
+    """
+    first_day = date.today() - timedelta(days=days - 1)
+    start = datetime.combine(first_day, datetime.min.time())
+    merged: Dict[date, DailySketches] = {}
+    async for document in sketch_collection.find({"day": {"$gte": start}, "worker": {"$ne": WORKER_ID}}):
+        day = document["day"].date()
+        sketches = DailySketches.from_document(document["sketches"])
+        if day in merged:
+            merged[day].merge(sketches)
+        else:
+            merged[day] = sketches
+    for day, sketches in _days.items():
+        if day < first_day:
+            continue
+        if day not in merged:
+            merged[day] = DailySketches()
+        merged[day].merge(sketches)
+    return merged
+
+
+async def _persist_loop() -> None:
+    try:
+        await _restore_sketches()
+    except Exception as e:
+        logger.exception(f"Erro ao restaurar sketches: {e}")
+    while True:
+        await asyncio.sleep(PERSIST_INTERVAL_SECONDS)
+        await persist_sketches()
+
+
+def start_sketch_persistence() -> None:
+    global _persist_task
+    if _persist_task is None:
+        _persist_task = asyncio.create_task(_persist_loop())
+
+
+async def stop_sketch_persistence() -> None:
+    global _persist_task
+    if _persist_task is None:
+        return
+    _persist_task.cancel()
+    try:
+        await _persist_task
+    except asyncio.CancelledError:
+        pass
+    _persist_task = None
+    await persist_sketches()
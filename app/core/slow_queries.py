@@ -0,0 +1,321 @@
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.regex import Regex
+
+from .db import get_client
+from .explain import execution_stats, summarize_explain
+from .indexes import INDEXES
+from .monitoring import current_request, slow_command_monitor
+from ..logs.logger import config, logger
+
+
+SLOW_QUERY_CONFIG = config.get("slow_queries", {})
+THRESHOLD_MS = SLOW_QUERY_CONFIG.get("threshold_ms", 100)
+MAX_ENTRIES = SLOW_QUERY_CONFIG.get("max_entries", 200)
+REEXPLAIN_AFTER_SECONDS = SLOW_QUERY_CONFIG.get("reexplain_after_seconds", 600)
+# Pausa entre dois explains: com executionStats a consulta é executada de novo.
+EXPLAIN_PAUSE_SECONDS = 0.2
+EXPLAIN_QUEUE_SIZE = 100
+
+# Campos do comando original que não podem ir dentro de um `explain`.
+_SESSION_FIELDS = frozenset({
+    "lsid", "txnNumber", "autocommit", "startTransaction", "$clusterTime", "$db",
+    "$readPreference", "readConcern", "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors",
+})
+_EQUALITY_OPERATORS = frozenset({"$eq", "$in"})
+_RANGE_OPERATORS = frozenset({"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists"})
+
+
+def _shape(value: Any) -> Any:
+    """
+    Forma de um filtro sem os valores, usada para agrupar consultas iguais.
+    """
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [_shape(item) for item in value]
+    return "?"
+
+
+def _target(command_name: str, command: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, int]]:
+    """
+    (coleção, filtro, ordenação) de um comando capturado.
+    """
+    collection = command.get(command_name)
+    sort: Dict[str, int] = {}
+    if command_name == "find":
+        query = command.get("filter") or {}
+        sort = command.get("sort") or {}
+    elif command_name in ("count", "distinct"):
+        query = command.get("query") or {}
+    elif command_name == "findAndModify":
+        query = command.get("query") or {}
+        sort = command.get("sort") or {}
+    elif command_name == "update":
+        query = (command.get("updates") or [{}])[0].get("q") or {}
+    elif command_name == "delete":
+        query = (command.get("deletes") or [{}])[0].get("q") or {}
+    else:
+        query = {}
+        for stage in command.get("pipeline") or []:
+            if "$match" in stage and not query and not sort:
+                query = stage["$match"]
+            elif "$sort" in stage and not sort:
+                sort = stage["$sort"]
+            else:
+                break
+    return collection, dict(query), dict(sort)
+
+
+def _regex_pattern(condition: Any) -> Optional[Tuple[str, str]]:
+    if isinstance(condition, (Regex, re.Pattern)):
+        flags = "i" if condition.flags & re.IGNORECASE else ""
+        return condition.pattern, flags
+    if isinstance(condition, dict) and "$regex" in condition:
+        pattern = condition["$regex"]
+        if isinstance(pattern, (Regex, re.Pattern)):
+            return _regex_pattern(pattern)
+        return str(pattern), str(condition.get("$options", ""))
+    return None
+
+
+def suggest_index(collection: str, query: Dict[str, Any], sort: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Sugere um índice composto pela regra ESR: campos de igualdade, depois
+    os da ordenação e por último os de intervalo. Filtros que um índice
+    comum não atende (`$or`, `$expr`, regex sem âncora) viram observações.
+    """
+    equality: List[str] = []
+    ranges: List[str] = []
+    notes: List[str] = []
+    conditions = list(query.items())
+    while conditions:
+        field, condition = conditions.pop(0)
+        if field == "$and":
+            conditions.extend(item for clause in condition for item in clause.items())
+            continue
+        if field.startswith("$"):
+            notes.append(f"`{field}` não é atendido por um único índice composto.")
+            continue
+        regex = _regex_pattern(condition)
+        if regex is not None:
+            pattern, flags = regex
+            if pattern.startswith("^") and "i" not in flags:
+                ranges.append(field)
+            else:
+                notes.append(
+                    f"`{field}`: regex sem âncora `^` ou case-insensitive percorre o índice inteiro; "
+                    "considere um índice de texto ou um campo normalizado com busca por prefixo."
+                )
+            continue
+        operators = set(condition) if isinstance(condition, dict) and condition and all(
+            str(key).startswith("$") for key in condition
+        ) else set()
+        if not operators or operators <= _EQUALITY_OPERATORS:
+            equality.append(field)
+        elif operators & _RANGE_OPERATORS:
+            ranges.append(field)
+
+    keys: List[Tuple[str, int]] = [(field, 1) for field in dict.fromkeys(equality)]
+    keys += [(field, direction) for field, direction in sort.items() if field not in equality and direction in (1, -1)]
+    keys += [(field, 1) for field in dict.fromkeys(ranges) if field not in dict(keys)]
+    suggestion: Dict[str, Any] = {"keys": keys, "notes": notes}
+    if keys:
+        spec = ", ".join(f"{json.dumps(field)}: {direction}" for field, direction in keys)
+        suggestion["create_index"] = f"db.{collection}.createIndex({{{spec}}})"
+        declared = [
+            index_keys for index_collection, index_keys, _ in INDEXES
+            if index_collection.name == collection and [tuple(key) for key in index_keys[:len(keys)]] == keys
+        ]
+        if declared:
+            suggestion["notes"].append("Um índice com este prefixo já está em INDEXES; confira /health/ready.")
+    return suggestion
+
+
+class SlowQueryAdvisor:
+    """
+    Agrupa os comandos lentos por forma (comando, coleção, filtro sem os
+    valores e ordenação) e, em segundo plano, roda um `explain` com
+    `executionStats` de um exemplo de cada grupo para apontar COLLSCAN,
+    ordenação em memória e sugerir um índice.
+
+    Todo o estado é alterado no event loop; o listener do pymongo apenas
+    agenda `_record` com `call_soon_threadsafe`.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def capture(self, command_name, command, database, scope, duration_ms) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._record, command_name, command, database, scope, duration_ms)
+
+    def _record(self, command_name, command, database, scope, duration_ms) -> None:
+        collection, query, sort = _target(command_name, command)
+        fingerprint = json.dumps(
+            {"command": command_name, "collection": collection, "filter": _shape(query), "sort": sort},
+            sort_keys=True,
+            default=str,
+        )
+        route = "(sem requisição)"
+        if scope is not None:
+            route = f"{scope.get('method')} {getattr(scope.get('route'), 'path', None) or scope.get('path')}"
+
+        entry = self.entries.pop(fingerprint, None)
+        if entry is None:
+            entry = {
+                "command": command_name,
+                "database": database,
+                "collection": collection,
+                "filter": _shape(query),
+                "sort": sort,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": {},
+                "explain": {"status": "pending"},
+                "suggestion": None,
+            }
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + duration_ms, 3)
+        entry["max_ms"] = max(entry["max_ms"], round(duration_ms, 3))
+        entry["last_ms"] = round(duration_ms, 3)
+        entry["last_seen"] = datetime.now()
+        entry["routes"][route] = entry["routes"].get(route, 0) + 1
+        entry["_sample"] = (command_name, command, query, sort)
+        self.entries[fingerprint] = entry
+        while len(self.entries) > MAX_ENTRIES:
+            self.entries.popitem(last=False)
+
+        explained_at = entry["explain"].get("explained_at_monotonic")
+        if entry["explain"]["status"] == "pending" or (
+            explained_at is not None and time.monotonic() - explained_at > REEXPLAIN_AFTER_SECONDS
+        ):
+            if entry["explain"]["status"] != "queued":
+                try:
+                    self._queue.put_nowait(fingerprint)
+                    entry["explain"]["status"] = "queued"
+                except asyncio.QueueFull:
+                    pass
+
+    async def _explain(self, entry: Dict[str, Any]) -> None:
+        command_name, command, query, sort = entry["_sample"]
+        if command_name == "aggregate" and any("$out" in stage or "$merge" in stage for stage in command.get("pipeline", [])):
+            entry["explain"] = {"status": "skipped", "reason": "Pipelines com $out/$merge não são reexecutados."}
+            return
+        target = {key: value for key, value in command.items() if key not in _SESSION_FIELDS}
+        token = current_request.set(None)
+        try:
+            explain = await get_client()[entry["database"]].command({"explain": target, "verbosity": "executionStats"})
+        finally:
+            current_request.reset(token)
+        summary = summarize_explain(explain)
+        entry["explain"] = {
+            "status": "done",
+            "collscan": summary["collscan"],
+            "in_memory_sort": summary["in_memory_sort"],
+            "indexes": summary["indexes"],
+            **execution_stats(explain),
+            "explained_at": datetime.now(),
+            "explained_at_monotonic": time.monotonic(),
+        }
+        if summary["collscan"] or summary["in_memory_sort"]:
+            entry["suggestion"] = suggest_index(entry["collection"], query, sort)
+        else:
+            entry["suggestion"] = None
+
+    async def _run(self) -> None:
+        while True:
+            fingerprint = await self._queue.get()
+            entry = self.entries.get(fingerprint)
+            if entry is None:
+                continue
+            try:
+                await self._explain(entry)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                entry["explain"] = {"status": "failed", "error": str(e), "explained_at_monotonic": time.monotonic()}
+                logger.warning(f"Não foi possível executar explain de um comando lento em {entry['collection']}: {e}")
+            await asyncio.sleep(EXPLAIN_PAUSE_SECONDS)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+        slow_command_monitor.threshold_ms = THRESHOLD_MS
+        slow_command_monitor.handler = self.capture
+
+    async def stop(self) -> None:
+        slow_command_monitor.handler = None
+        self._loop = None
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def report(self, only_problems: bool = False) -> List[Dict[str, Any]]:
+        """
+        Grupos de comandos lentos, do maior tempo total para o menor.
+        """
+        result = []
+        for entry in self.entries.values():
+            explain = entry["explain"]
+            if only_problems and not (explain.get("collscan") or explain.get("in_memory_sort")):
+                continue
+            public = {key: value for key, value in entry.items() if not key.startswith("_")}
+            public["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            public["explain"] = {key: value for key, value in explain.items() if key != "explained_at_monotonic"}
+            result.append(public)
+        result.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return result
+
+    def reset(self) -> None:
+        self.entries.clear()
+
+
+advisor = SlowQueryAdvisor()
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI que expõe o escopo da requisição em `current_request`,
+    para que os comandos lentos sejam atribuídos à rota de origem.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+
+
+def start_slow_query_advisor() -> None:
+    advisor.start()
+
+
+async def stop_slow_query_advisor() -> None:
+    await advisor.stop()
@@ -0,0 +1,313 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import engagement_stats_collection, trending_collection
+from .invalidation import WORKER_ID, publish_event, register_event_handler
+from ..logs.logger import config, logger
+
+
+TRENDING_CONFIG = config.get("trending", {})
+CAPACITY = TRENDING_CONFIG.get("capacity", 1000)
+WEIGHTS = {
+    "like": TRENDING_CONFIG.get("like_weight", 1.0),
+    "comment": TRENDING_CONFIG.get("comment_weight", 3.0),
+}
+CHECKPOINT_INTERVAL_SECONDS = TRENDING_CONFIG.get("checkpoint_interval_seconds", 30)
+# Por quanto tempo um ranking já ordenado é reaproveitado entre eventos.
+RANKING_TTL_SECONDS = TRENDING_CONFIG.get("ranking_ttl_seconds", 1.0)
+
+# Janela -> vida média (segundos) de um evento no score: um like de uma
+# janela atrás pesa 1/e de um like de agora.
+WINDOWS: Dict[str, float] = {
+    "1h": 3600.0,
+    "6h": 6 * 3600.0,
+    "24h": 24 * 3600.0,
+    "7d": 7 * 24 * 3600.0,
+}
+
+# Eventos mais velhos que isto (em vidas médias) valem menos de 1% e são
+# ignorados na reconstrução a partir de `engagement_stats`.
+REBUILD_LIFETIMES = 5
+REBUILD_MAX_AGE = timedelta(days=31)
+# Documento compartilhado com a reconstrução inicial: todos os workers que
+# a fizerem ao mesmo tempo gravam o mesmo `_id`, sem contar em dobro.
+BOOTSTRAP_ID = "bootstrap"
+# Rebase do landmark antes que exp() chegue perto do limite do float.
+MAX_EXPONENT = 50.0
+CHANNEL = "trending"
+
+
+class DecayedTopK:
+    """
+    Scores com decaimento exponencial para os `capacity` itens mais quentes.
+
+    Usa "forward decay": cada evento soma `weight * exp((t - landmark) / tau)`,
+    então os scores armazenados não precisam ser decaídos a cada instante e
+    a ordem entre eles só muda quando chega um evento. O score atual é o
+    armazenado vezes `exp(-(agora - landmark) / tau)`. Quando a tabela passa
+    de 25% acima da capacidade, os itens mais frios são descartados.
+    """
+
+    def __init__(self, tau: float, capacity: int = CAPACITY, landmark: Optional[float] = None, scores: Optional[Dict[str, float]] = None):
+        self.tau = tau
+        self.capacity = capacity
+        self.landmark = time.time() if landmark is None else landmark
+        self.scores: Dict[str, float] = scores or {}
+
+    def _rebase(self, landmark: float) -> None:
+        factor = math.exp((self.landmark - landmark) / self.tau)
+        self.scores = {item: score * factor for item, score in self.scores.items()}
+        self.landmark = landmark
+
+    def add(self, item: str, weight: float, at: Optional[float] = None) -> None:
+        at = time.time() if at is None else at
+        if (at - self.landmark) / self.tau > MAX_EXPONENT:
+            self._rebase(at)
+        self.scores[item] = self.scores.get(item, 0.0) + weight * math.exp((at - self.landmark) / self.tau)
+        if len(self.scores) > self.capacity * 1.25:
+            self.prune()
+
+    def prune(self) -> None:
+        top = sorted(self.scores.items(), key=lambda entry: entry[1], reverse=True)[:self.capacity]
+        self.scores = dict(top)
+
+    def forget(self, item: str) -> None:
+        self.scores.pop(item, None)
+
+    def merge(self, other: "DecayedTopK") -> None:
+        # Os scores são levados ao landmark mais novo dos dois: o fator fica
+        # <= 1, por mais antigo que seja o outro landmark.
+        if other.landmark > self.landmark:
+            self._rebase(other.landmark)
+        factor = math.exp((other.landmark - self.landmark) / self.tau)
+        for item, score in other.scores.items():
+            self.scores[item] = self.scores.get(item, 0.0) + score * factor
+        if len(self.scores) > self.capacity * 1.25:
+            self.prune()
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"landmark": self.landmark, "scores": [[item, score] for item, score in self.scores.items()]}
+
+    @classmethod
+    def from_document(cls, tau: float, document: Dict[str, Any]) -> "DecayedTopK":
+        return cls(tau, landmark=document["landmark"], scores={item: score for item, score in document["scores"]})
+
+
+_local: Dict[str, DecayedTopK] = {window: DecayedTopK(tau) for window, tau in WINDOWS.items()}
+_remote: Dict[str, DecayedTopK] = {window: DecayedTopK(tau) for window, tau in WINDOWS.items()}
+# Janela -> (versão, instante do cálculo, ranking ordenado, landmark).
+_rankings: Dict[str, Tuple[int, float, List[Tuple[str, float]], float]] = {}
+_version = 0
+_dirty = False
+_checkpoint_task: Optional[asyncio.Task] = None
+
+
+def record_event(post_id: str, kind: str, at: Optional[datetime] = None) -> None:
+    """
+    Soma um like ou comentário aos scores de todas as janelas. Só memória;
+    o checkpoint no MongoDB é feito periodicamente em segundo plano.
+    """
+    global _dirty, _version
+    moment = at.timestamp() if at else time.time()
+    for table in _local.values():
+        table.add(post_id, WEIGHTS[kind], moment)
+    _dirty = True
+    _version += 1
+
+
+def _forget_local(post_id: str) -> None:
+    global _dirty
+    for tables in (_local, _remote):
+        for table in tables.values():
+            table.forget(post_id)
+    _dirty = True
+    _rankings.clear()
+
+
+def _on_remote_event(payload: Dict[str, Any]) -> None:
+    _forget_local(payload["post_id"])
+
+
+register_event_handler(CHANNEL, _on_remote_event)
+
+
+async def forget_post(post_id: str) -> None:
+    """
+    Remove um post apagado do ranking de todos os workers e dos checkpoints
+    gravados, inclusive os de workers que já pararam e o da reconstrução
+    inicial, que de outra forma o trariam de volta no próximo `checkpoint`.
+    """
+    _forget_local(post_id)
+    await publish_event(CHANNEL, {"post_id": post_id})
+    scores = {
+        f"windows.{window}.scores": {
+            "$cond": [
+                {"$isArray": f"$windows.{window}.scores"},
+                {"$filter": {
+                    "input": f"$windows.{window}.scores",
+                    "cond": {"$ne": [{"$arrayElemAt": ["$$this", 0]}, post_id]},
+                }},
+                "$$REMOVE",
+            ]
+        }
+        for window in WINDOWS
+    }
+    try:
+        await trending_collection.update_many({}, [{"$set": scores}])
+    except Exception as e:
+        logger.exception(f"Erro ao remover o post {post_id} dos checkpoints de trending: {e}")
+
+
+def trending(window: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Os `limit` posts mais quentes da janela, somando os eventos deste worker
+    com os checkpoints dos demais. O ranking ordenado fica em memória e só
+    é recalculado depois de novos eventos (no máximo uma vez por
+    `RANKING_TTL_SECONDS`); a ordem não muda com o passar do tempo, apenas
+    a escala dos scores.
+    """
+    now = time.time()
+    cached = _rankings.get(window)
+    if cached is None or (cached[0] != _version and now - cached[1] > RANKING_TTL_SECONDS):
+        combined = DecayedTopK(WINDOWS[window], landmark=_local[window].landmark, scores=dict(_local[window].scores))
+        # O landmark local só anda com eventos locais; um worker ocioso há
+        # semanas não pode servir de base para os checkpoints recentes.
+        combined._rebase(max(now, combined.landmark))
+        combined.merge(_remote[window])
+        ranking = sorted(combined.scores.items(), key=lambda entry: entry[1], reverse=True)[:CAPACITY]
+        cached = _rankings[window] = (_version, now, ranking, combined.landmark)
+    _, _, ranking, landmark = cached
+    factor = math.exp(-(now - landmark) / WINDOWS[window])
+    return [{"post_id": post_id, "score": round(score * factor, 4)} for post_id, score in ranking[:limit] if score > 0]
+
+
+async def checkpoint() -> None:
+    """
+    Grava as tabelas deste worker (quando mudaram) e recarrega as dos
+    demais workers, que passam a compor o ranking.
+    """
+    global _dirty
+    now = datetime.now()
+    if _dirty:
+        _dirty = False
+        try:
+            await trending_collection.replace_one(
+                {"_id": WORKER_ID},
+                {
+                    "windows": {window: table.to_document() for window, table in _local.items()},
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=REBUILD_LIFETIMES * max(WINDOWS.values())),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            _dirty = True
+            logger.exception(f"Erro ao gravar checkpoint de trending: {e}")
+
+    remote = {window: DecayedTopK(tau) for window, tau in WINDOWS.items()}
+    async for document in trending_collection.find({"_id": {"$ne": WORKER_ID}}):
+        for window, tau in WINDOWS.items():
+            if window in document.get("windows", {}):
+                remote[window].merge(DecayedTopK.from_document(tau, document["windows"][window]))
+    _remote.update(remote)
+    _rankings.clear()
+
+
+async def rebuild_from_engagement() -> None:
+    """
+    Reconstrução a frio: calcula os scores a partir dos buckets horários de
+    `engagement_stats`, com o evento no meio do seu bucket. Cada janela é
+    uma agregação que já devolve apenas os `CAPACITY` posts mais quentes.
+    """
+    now = datetime.now()
+    since = now - min(REBUILD_MAX_AGE, timedelta(seconds=REBUILD_LIFETIMES * max(WINDOWS.values())))
+    landmark = now.timestamp()
+    windows = {}
+    for window, tau in WINDOWS.items():
+        age_seconds = {"$divide": [{"$subtract": [now - timedelta(minutes=30), "$bucket_start"]}, 1000]}
+        pipeline = [
+            {"$match": {"granularity": "hour", "bucket_start": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": "$post_id",
+                    "score": {
+                        "$sum": {
+                            "$multiply": [
+                                {"$add": [
+                                    {"$multiply": [{"$ifNull": ["$likes", 0]}, WEIGHTS["like"]]},
+                                    {"$multiply": [{"$ifNull": ["$comments", 0]}, WEIGHTS["comment"]]},
+                                ]},
+                                {"$exp": {"$divide": [{"$multiply": [age_seconds, -1]}, tau]}},
+                            ]
+                        }
+                    },
+                }
+            },
+            {"$match": {"score": {"$gt": 0}}},
+            {"$sort": {"score": -1}},
+            {"$limit": CAPACITY},
+        ]
+        rows = await engagement_stats_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=CAPACITY)
+        windows[window] = DecayedTopK(tau, landmark=landmark, scores={row["_id"]: row["score"] for row in rows}).to_document()
+    await trending_collection.replace_one(
+        {"_id": BOOTSTRAP_ID},
+        {"windows": windows, "updated_at": now, "expires_at": now + timedelta(seconds=REBUILD_LIFETIMES * max(WINDOWS.values()))},
+        upsert=True,
+    )
+    logger.info("Scores de trending reconstruídos a partir de engagement_stats.")
+
+
+async def _restore() -> None:
+    """
+    Recupera o checkpoint deste worker (mesmo host e PID) somando-o aos
+    eventos recebidos desde a inicialização. Se não há checkpoint algum no
+    banco, reconstrói os scores a partir de `engagement_stats`.
+    """
+    global _dirty
+    if await trending_collection.find_one({}, {"_id": 1}) is None:
+        await rebuild_from_engagement()
+        return
+    document = await trending_collection.find_one({"_id": WORKER_ID})
+    if document:
+        for window, tau in WINDOWS.items():
+            if window in document.get("windows", {}):
+                _local[window].merge(DecayedTopK.from_document(tau, document["windows"][window]))
+        _dirty = True
+
+
+async def _checkpoint_loop() -> None:
+    try:
+        await _restore()
+    except Exception as e:
+        logger.exception(f"Erro ao restaurar scores de trending: {e}")
+    while True:
+        try:
+            await checkpoint()
+        except Exception as e:
+            logger.exception(f"Erro no checkpoint de trending: {e}")
+        await asyncio.sleep(CHECKPOINT_INTERVAL_SECONDS)
+
+
+def start_trending_checkpoints() -> None:
+    global _checkpoint_task
+    if _checkpoint_task is None:
+        _checkpoint_task = asyncio.create_task(_checkpoint_loop())
+
+
+async def stop_trending_checkpoints() -> None:
+    global _checkpoint_task
+    if _checkpoint_task is None:
+        return
+    _checkpoint_task.cancel()
+    try:
+        await _checkpoint_task
+    except asyncio.CancelledError:
+        pass
+    _checkpoint_task = None
+    try:
+        await checkpoint()
+    except Exception as e:
+        logger.exception(f"Erro no checkpoint final de trending: {e}")
@@ -0,0 +1,50 @@
+"""
+Move posts antigos (com seus comentários e likes) para as coleções
+`*_archive`, mantendo os índices da camada quente pequenos o bastante para
+caber em memória.
+
+Os posts são processados em lotes, do mais antigo para o mais novo, com
+uma transação por lote quando o servidor é um replica set. O job pode ser
+interrompido e executado de novo a qualquer momento. Os posts arquivados
+continuam acessíveis por `GET /posts/{id}` e pelas listagens com
+`include_archived=true`; likes e comentários novos não são aceitos neles.
+
+Uso:
+    python -m app.jobs.archive_posts [--older-than-days N] [--batch-size N] [--max-batches N] [--pause S]
+"""
+import argparse
+import asyncio
+
+from app.core.archive import BATCH_SIZE, MAX_AGE_DAYS, archive_batch, archive_cutoff
+from app.core.db import close_client, post_collection
+
+
+async def archive_posts(older_than_days: int, batch_size: int, max_batches: int = None, pause: float = 0.1):
+    cutoff = archive_cutoff(older_than_days)
+    pending = await post_collection.count_documents({"publication_date": {"$lt": cutoff}})
+    print(f"{pending} posts publicados antes de {cutoff:%Y-%m-%d} para arquivar.")
+
+    total = 0
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            moved = await archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            print(f"{total}/{pending} posts arquivados...")
+            await asyncio.sleep(pause)
+    finally:
+        close_client()
+    print(f"Arquivamento concluído. {total} posts movidos em {batches} lotes.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva posts antigos nas coleções *_archive.")
+    parser.add_argument("--older-than-days", type=int, default=MAX_AGE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--pause", type=float, default=0.1, help="Pausa entre lotes, em segundos.")
+    args = parser.parse_args()
+    asyncio.run(archive_posts(args.older_than_days, args.batch_size, args.max_batches, args.pause))
@@ -0,0 +1,86 @@
+"""
+Reconstrói a coleção `engagement_stats` a partir dos eventos históricos
+(`post_likes.created_at` e `comments.creation_date`).
+
+Todo o trabalho é feito no servidor: cada combinação de métrica e
+granularidade é um pipeline de agregação que termina em `$merge`, então
+nenhum evento trafega pela aplicação.
+
+Uso:
+    python -m app.jobs.backfill_engagement [--reset]
+"""
+import argparse
+import asyncio
+
+from app.core.db import comment_collection, engagement_stats_collection, post_like_collection
+from app.core.engagement import GRANULARITIES
+
+SOURCES = [
+    ("likes", post_like_collection, "created_at"),
+    ("comments", comment_collection, "creation_date"),
+]
+
+
+def bucket_expression(field: str, granularity: str) -> dict:
+    """
+    Equivalente em agregação de `bucket_start` (compatível com MongoDB 4.4).
+    """
+    parts = {
+        "year": {"$year": f"${field}"},
+        "month": {"$month": f"${field}"},
+        "day": {"$dayOfMonth": f"${field}"},
+    }
+    if granularity == "hour":
+        parts["hour"] = {"$hour": f"${field}"}
+    return {"$dateFromParts": parts}
+
+
+def backfill_pipeline(metric: str, field: str, granularity: str) -> list:
+    return [
+        {"$match": {field: {"$type": "date"}}},
+        {
+            "$group": {
+                "_id": {"post_id": "$post_id", "bucket_start": bucket_expression(field, granularity)},
+                "count": {"$sum": 1},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "post_id": "$_id.post_id",
+                "granularity": {"$literal": granularity},
+                "bucket_start": "$_id.bucket_start",
+                metric: "$count",
+            }
+        },
+        {
+            "$merge": {
+                "into": engagement_stats_collection.name,
+                "on": ["post_id", "granularity", "bucket_start"],
+                "whenMatched": [{"$set": {metric: f"$$new.{metric}"}}],
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
+
+async def backfill_engagement(reset: bool = False):
+    if reset:
+        print("Zerando contadores existentes...")
+        await engagement_stats_collection.update_many({}, {"$set": {"likes": 0, "comments": 0}})
+
+    for metric, collection, field in SOURCES:
+        for granularity in GRANULARITIES:
+            print(f"Agregando {metric} por {granularity}...")
+            pipeline = backfill_pipeline(metric, field, granularity)
+            await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+    total = await engagement_stats_collection.estimated_document_count()
+    print(f"Backfill concluído. {total} buckets em engagement_stats.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill da coleção engagement_stats.")
+    parser.add_argument("--reset", action="store_true", help="Zera os contadores antes de recalcular (use fora do horário de pico).")
+    args = parser.parse_args()
+    asyncio.run(backfill_engagement(reset=args.reset))
@@ -0,0 +1,43 @@
+"""
+Preenche o campo `excerpt` dos posts que ainda não o têm (criados antes do
+modo `view=summary`). Pode ser interrompido e executado de novo: só os
+posts sem `excerpt` são processados.
+
+Uso:
+    python -m app.jobs.backfill_excerpts [--batch-size N] [--all]
+"""
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.core.db import post_collection
+from app.core.excerpt import make_excerpt
+from app.core.invalidation import publish
+
+
+async def backfill_excerpts(batch_size: int = 1000, recompute_all: bool = False):
+    query = {} if recompute_all else {"excerpt": {"$exists": False}}
+    total = 0
+    batch = []
+    async for post in post_collection.find(query, {"content": 1}).batch_size(batch_size):
+        batch.append(UpdateOne({"_id": post["_id"]}, {"$set": {"excerpt": make_excerpt(post.get("content", ""))}}))
+        if len(batch) >= batch_size:
+            await post_collection.bulk_write(batch, ordered=False)
+            total += len(batch)
+            batch = []
+            print(f"{total} posts atualizados...")
+    if batch:
+        await post_collection.bulk_write(batch, ordered=False)
+        total += len(batch)
+    if total:
+        await publish("posts")
+    print(f"Backfill concluído. {total} posts receberam excerpt.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill do campo excerpt dos posts.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--all", action="store_true", help="Recalcula o excerpt de todos os posts.")
+    args = parser.parse_args()
+    asyncio.run(backfill_excerpts(batch_size=args.batch_size, recompute_all=args.all))
@@ -0,0 +1,41 @@
+"""
+Verifica (e opcionalmente corrige) os dados redundantes do blog:
+- posts.likes x post_likes;
+- posts.tags_id x post_tags;
+- posts.category_id x categories.
+
+A execução é feita em blocos e pode ser interrompida e retomada.
+
+Uso:
+    python -m app.jobs.check_consistency [likes post_tags categories] [--repair] [--restart]
+"""
+import argparse
+import asyncio
+
+from app.core.consistency import CHECKS, DEFAULT_CHUNK_SIZE, DEFAULT_PAUSE_SECONDS, run_check
+
+
+async def check_consistency(names, repair, chunk_size, pause, restart):
+    for name in names:
+        print(f"Verificando {name} ({CHECKS[name].description})...")
+        state = await run_check(name, repair=repair, chunk_size=chunk_size, pause=pause, restart=restart)
+        print(
+            f"  {state['status']}: {state['scanned']} posts verificados, "
+            f"{state['discrepancies']} divergências, {state['repaired']} corrigidas."
+        )
+        for discrepancy in state["sample"][:10]:
+            print(f"    {discrepancy}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificação de consistência dos dados desnormalizados.")
+    parser.add_argument("checks", nargs="*", default=list(CHECKS), help=f"Verificações a executar ({', '.join(CHECKS)}).")
+    parser.add_argument("--repair", action="store_true", help="Corrige as divergências encontradas.")
+    parser.add_argument("--restart", action="store_true", help="Ignora o progresso salvo e recomeça do início.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE_SECONDS, help="Pausa entre blocos, em segundos.")
+    args = parser.parse_args()
+    unknown = set(args.checks) - set(CHECKS)
+    if unknown:
+        parser.error(f"verificações desconhecidas: {', '.join(sorted(unknown))}")
+    asyncio.run(check_consistency(args.checks, args.repair, args.chunk_size, args.pause, args.restart))
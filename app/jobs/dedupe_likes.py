@@ -0,0 +1,37 @@
+"""
+Remove likes duplicados (mesmo usuário e mesmo post) de `post_likes` e
+`post_likes_archive`, mantendo o mais antigo, e cria de novo os índices.
+
+Necessário quando o índice único `(post_id, user_id)` não pôde ser criado
+porque a base já tinha duplicatas (ver `index_failures` em
+`/health/ready`). Sem esse índice, nada impede likes repetidos. Depois da
+limpeza, rode `python -m app.jobs.check_consistency likes --repair` para
+acertar os contadores dos posts.
+
+Uso:
+    python -m app.jobs.dedupe_likes
+"""
+import asyncio
+
+from app.core.consistency import remove_duplicate_likes
+from app.core.db import close_client, post_like_archive_collection, post_like_collection
+from app.core.indexes import ensure_indexes, index_failures
+
+
+async def dedupe_likes():
+    try:
+        for collection in (post_like_collection, post_like_archive_collection):
+            removed = await remove_duplicate_likes(collection)
+            print(f"{collection.name}: {removed} likes duplicados removidos.")
+        await ensure_indexes()
+        failures = index_failures()
+        for failure in failures:
+            print(f"Índice {failure['keys']} em {failure['collection']} ainda falhou: {failure['error']}")
+        if not failures:
+            print("Índices criados.")
+    finally:
+        close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(dedupe_likes())
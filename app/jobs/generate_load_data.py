@@ -0,0 +1,345 @@
+"""
+Gera uma massa de dados sintética e volumosa para testes de carga.
+
+Diferente do `seed.py`, nada é montado inteiro em memória: cada coleção é
+produzida em lotes por um gerador e gravada com `insert_many` concorrentes
+(no máximo `--concurrency` lotes em voo), então o uso de memória é
+constante independentemente do volume.
+
+A distribuição imita produção:
+- a popularidade dos posts (e a atividade dos usuários) segue uma lei de
+  Zipf, então poucos posts concentram a maior parte de likes e comentários;
+- comentários e likes chegam em rajadas logo após a publicação do post
+  (atraso exponencial), com uma cauda longa.
+
+A execução é determinística a partir de `--seed`: os `_id`s são derivados
+do índice de cada documento e cada fluxo tem o seu próprio gerador
+aleatório, então duas execuções com os mesmos parâmetros produzem os mesmos
+dados. Documentos já existentes são ignorados (erros de chave duplicada),
+o que permite retomar uma geração interrompida.
+
+Ao final, os dados derivados (contador de likes, `recent_comments`,
+`engagement_stats` e `authors`) são recalculados no servidor.
+
+Uso:
+    python -m app.jobs.generate_load_data --posts 1000000 --users 200000 \\
+        --comments 5000000 --likes 20000000 [--seed 42] [--drop]
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.db import (
+    category_collection,
+    close_client,
+    comment_collection,
+    engagement_stats_collection,
+    post_collection,
+    post_like_collection,
+    post_tag_collection,
+    tag_collection,
+    user_collection,
+)
+from app.core.excerpt import make_excerpt
+from app.core.indexes import ensure_indexes, index_status
+from app.jobs.backfill_engagement import backfill_engagement
+from app.jobs.rebuild_authors import rebuild_authors
+from app.jobs.rebuild_recent_comments import rebuild_recent_comments
+from seed import AUTHORS, CATEGORIES, COMMENT_TEMPLATES, POST_TEMPLATES, TAGS
+
+
+# Instante fixo usado nos ObjectIds e como fim da janela de datas, para que
+# a saída não dependa do relógio nem do fuso horário da máquina.
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+KIND_USER, KIND_CATEGORY, KIND_TAG, KIND_POST, KIND_COMMENT, KIND_POST_TAG = range(1, 7)
+
+MAX_TAGS_PER_POST = 4
+
+DUPLICATE_KEY = 11000
+
+# Atraso médio entre a publicação de um post e o engajamento que ele recebe.
+MEAN_ENGAGEMENT_DELAY_HOURS = 6
+
+
+def make_id(kind: int, index: int) -> ObjectId:
+    """
+    ObjectId determinístico: timestamp fixo + tipo do documento + índice.
+    """
+    return ObjectId(int(BASE_TIME.timestamp()).to_bytes(4, "big") + bytes([kind]) + index.to_bytes(7, "big"))
+
+
+class ZipfSampler:
+    """
+    Amostra índices em [0, n) com P(rank k) ~ 1/k^s, em O(1) por amostra e
+    memória constante.
+
+    Usa a inversa da CDF da aproximação contínua da lei de potência. Os
+    ranks são espalhados pelos índices com uma permutação afim
+    (`rank * a + b mod n`), para que os itens populares não sejam sempre
+    os primeiros inseridos.
+    """
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.n = n
+        self.s = s
+        self.rng = rng
+        self.total = self._cdf(n + 1)
+        self.a = rng.randrange(1, n) | 1 if n > 1 else 1
+        while math.gcd(self.a, n) != 1:
+            self.a += 2
+        self.b = rng.randrange(n)
+
+    def _cdf(self, x: float) -> float:
+        if self.s == 1:
+            return math.log(x)
+        return (x ** (1 - self.s) - 1) / (1 - self.s)
+
+    def _inverse_cdf(self, y: float) -> float:
+        if self.s == 1:
+            return math.exp(y)
+        return (y * (1 - self.s) + 1) ** (1 / (1 - self.s))
+
+    def sample(self) -> int:
+        rank = min(int(self._inverse_cdf(self.rng.random() * self.total)) - 1, self.n - 1)
+        return (max(rank, 0) * self.a + self.b) % self.n
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.span = timedelta(days=args.days).total_seconds()
+
+    def rng(self, stream: str) -> random.Random:
+        return random.Random(f"{self.args.seed}:{stream}")
+
+    def publication_date(self, post: int) -> datetime:
+        # Espalhamento determinístico (hash multiplicativo) sem guardar as datas.
+        fraction = (post * 2654435761 % 2 ** 32) / 2 ** 32
+        return BASE_TIME - timedelta(seconds=self.span * fraction)
+
+    def engagement_date(self, post: int, rng: random.Random) -> datetime:
+        delay = rng.expovariate(1 / (MEAN_ENGAGEMENT_DELAY_HOURS * 3600))
+        return min(self.publication_date(post) + timedelta(seconds=delay), BASE_TIME)
+
+    def batches(self, total: int, build) -> Iterator[List[Dict[str, Any]]]:
+        size = self.args.batch_size
+        for start in range(0, total, size):
+            yield [build(i) for i in range(start, min(start + size, total))]
+
+    def users(self) -> Iterator[List[Dict[str, Any]]]:
+        def build(i):
+            return {
+                "_id": make_id(KIND_USER, i),
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "password": "password123",
+                "creation_date": BASE_TIME - timedelta(seconds=self.span * ((i * 40503 % 65536) / 65536)),
+            }
+        return self.batches(self.args.users, build)
+
+    def posts(self) -> Iterator[List[Dict[str, Any]]]:
+        rng = self.rng("posts")
+        category_ids = {c["name"]: str(make_id(KIND_CATEGORY, i)) for i, c in enumerate(CATEGORIES)}
+        tag_ids = [str(make_id(KIND_TAG, i)) for i in range(len(TAGS))]
+
+        def build(i):
+            template = rng.choice(POST_TEMPLATES)
+            return {
+                "_id": make_id(KIND_POST, i),
+                "title": f"{template['title']} #{i}",
+                "content": template["content"],
+                "excerpt": make_excerpt(template["content"]),
+                "author": rng.choice(AUTHORS),
+                "publication_date": self.publication_date(i),
+                "category_id": category_ids[template["category"]],
+                "tags_id": rng.sample(tag_ids, k=rng.randint(1, MAX_TAGS_PER_POST)),
+                "likes": 0,
+            }
+        return self.batches(self.args.posts, build)
+
+    def comments(self) -> Iterator[List[Dict[str, Any]]]:
+        rng = self.rng("comments")
+        posts = ZipfSampler(self.args.posts, self.args.zipf, self.rng("comments:posts"))
+        users = ZipfSampler(self.args.users, self.args.user_zipf, self.rng("comments:users"))
+
+        def build(i):
+            post = posts.sample()
+            return {
+                "_id": make_id(KIND_COMMENT, i),
+                "post_id": str(make_id(KIND_POST, post)),
+                "user_id": str(make_id(KIND_USER, users.sample())),
+                "content": rng.choice(COMMENT_TEMPLATES),
+                "creation_date": self.engagement_date(post, rng),
+            }
+        return self.batches(self.args.comments, build)
+
+    def likes(self) -> Iterator[List[Dict[str, Any]]]:
+        # Pares (post, usuário) repetidos são descartados pelo índice único,
+        # então o total final fica um pouco abaixo de --likes nos posts mais
+        # populares; é o mesmo comportamento da rota de like.
+        rng = self.rng("likes")
+        posts = ZipfSampler(self.args.posts, self.args.zipf, self.rng("likes:posts"))
+        users = ZipfSampler(self.args.users, self.args.user_zipf, self.rng("likes:users"))
+
+        def build(_):
+            post = posts.sample()
+            return {
+                "post_id": str(make_id(KIND_POST, post)),
+                "user_id": str(make_id(KIND_USER, users.sample())),
+                "created_at": self.engagement_date(post, rng),
+            }
+        return self.batches(self.args.likes, build)
+
+
+class BatchWriter:
+    """
+    Grava lotes com `insert_many` não ordenado, com no máximo `concurrency`
+    lotes em voo. `submit` só retorna quando há vaga, o que limita a memória.
+    """
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.pending = set()
+        self.inserted = 0
+        self.error = None
+
+    async def submit(self, collection, documents: List[Dict[str, Any]]) -> None:
+        await self.semaphore.acquire()
+        if self.error is not None:
+            self.semaphore.release()
+            raise self.error
+        task = asyncio.ensure_future(self._write(collection, documents))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _write(self, collection, documents: List[Dict[str, Any]]) -> None:
+        try:
+            result = await collection.insert_many(documents, ordered=False)
+            self.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            if any(error["code"] != DUPLICATE_KEY for error in details.get("writeErrors", [])):
+                self.error = e
+                raise
+            self.inserted += details.get("nInserted", 0)
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.semaphore.release()
+
+    async def drain(self) -> int:
+        await asyncio.gather(*list(self.pending))
+        inserted, self.inserted = self.inserted, 0
+        return inserted
+
+
+async def load(writer: BatchWriter, name: str, collection, batches: Iterator[List[Dict[str, Any]]]) -> None:
+    started = time.perf_counter()
+    for batch in batches:
+        await writer.submit(collection, batch)
+    inserted = await writer.drain()
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {inserted} documentos inseridos em {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):.0f}/s).")
+
+
+def post_tags(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+    for batch in batches:
+        yield [
+            {
+                "_id": make_id(KIND_POST_TAG, int.from_bytes(post["_id"].binary[5:], "big") * MAX_TAGS_PER_POST + slot),
+                "post_id": str(post["_id"]),
+                "tag_id": tag_id,
+            }
+            for post in batch
+            for slot, tag_id in enumerate(post["tags_id"])
+        ]
+
+
+async def update_like_counters() -> None:
+    await post_like_collection.aggregate(
+        [
+            {"$group": {"_id": "$post_id", "likes": {"$sum": 1}}},
+            {"$project": {"_id": {"$convert": {"input": "$_id", "to": "objectId", "onError": None}}, "likes": 1}},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$merge": {"into": post_collection.name, "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+        ],
+        allowDiskUse=True,
+    ).to_list(length=None)
+
+
+async def generate(args: argparse.Namespace) -> None:
+    if args.drop:
+        print("Removendo coleções existentes...")
+        await asyncio.gather(*(
+            collection.drop()
+            for collection in (
+                category_collection, tag_collection, post_collection, comment_collection,
+                post_tag_collection, user_collection, post_like_collection, engagement_stats_collection,
+            )
+        ))
+
+    # Os índices (em especial o único de post_likes) precisam existir antes da carga.
+    await ensure_indexes()
+    if index_status() != "ready":
+        raise SystemExit("Falha ao criar os índices; abortando a geração.")
+
+    generator = Generator(args)
+    writer = BatchWriter(args.concurrency)
+    await load(writer, "categories", category_collection,
+               iter([[dict(c, _id=make_id(KIND_CATEGORY, i)) for i, c in enumerate(CATEGORIES)]]))
+    await load(writer, "tags", tag_collection, iter([[dict(t, _id=make_id(KIND_TAG, i)) for i, t in enumerate(TAGS)]]))
+    await load(writer, "users", user_collection, generator.users())
+    await load(writer, "posts", post_collection, generator.posts())
+    await load(writer, "post_tags", post_tag_collection, post_tags(generator.posts()))
+    await load(writer, "comments", comment_collection, generator.comments())
+    await load(writer, "post_likes", post_like_collection, generator.likes())
+
+    if args.skip_derived:
+        return
+    print("Atualizando contadores de likes...")
+    await update_like_counters()
+    await rebuild_recent_comments()
+    await backfill_engagement()
+    await rebuild_authors()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de massa de dados para testes de carga.")
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--comments", type=int, default=500_000)
+    parser.add_argument("--likes", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=365, help="Janela de datas de publicação.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Expoente de Zipf da popularidade dos posts.")
+    parser.add_argument("--user-zipf", type=float, default=0.8, help="Expoente de Zipf da atividade dos usuários.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Lotes gravados em paralelo.")
+    parser.add_argument("--drop", action="store_true", help="Remove as coleções antes de gerar.")
+    parser.add_argument("--skip-derived", action="store_true", help="Não recalcula contadores e coleções derivadas.")
+    args = parser.parse_args()
+    if min(args.posts, args.users) < 1:
+        parser.error("--posts e --users devem ser positivos")
+
+    async def run():
+        try:
+            await generate(args)
+        finally:
+            close_client()
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    print(f"Geração concluída em {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Reconstrói a coleção materializada `authors` a partir de todos os posts
+(camada quente e arquivo).
+
+O resultado é gravado com `$out`, que substitui a coleção de uma vez: as
+leituras continuam vendo a versão anterior até o fim do job. Os índices de
+`authors` são preservados pelo `$out`.
+
+Uso:
+    python -m app.jobs.rebuild_authors
+"""
+import asyncio
+
+from app.core.authors import author_stats_pipeline
+from app.core.db import author_collection, close_client, post_collection
+
+
+async def rebuild_authors():
+    print("Agrupando posts por autor...")
+    pipeline = author_stats_pipeline({"author.name": {"$type": "string"}}) + [{"$out": author_collection.name}]
+    await post_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    total = await author_collection.estimated_document_count()
+    print(f"Rebuild concluído. {total} autores em authors.")
+
+
+async def main():
+    try:
+        await rebuild_authors()
+    finally:
+        close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
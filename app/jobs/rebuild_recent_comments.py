@@ -0,0 +1,65 @@
+"""
+Reconstrói o campo `recent_comments` dos posts a partir da coleção
+`comments`.
+
+Os comentários são agrupados por post no servidor e gravados com `$merge`,
+então nada trafega pela aplicação. Posts sem comentários recebem uma
+prévia vazia; com `--reset`, as prévias existentes são zeradas antes (útil
+se houver prévias de posts cujos comentários foram todos removidos).
+
+Uso:
+    python -m app.jobs.rebuild_recent_comments [--reset]
+"""
+import argparse
+import asyncio
+
+from app.core.db import comment_collection, post_collection
+from app.core.recent_comments import PREVIEW_FIELDS, RECENT_COMMENTS_SIZE
+
+
+def rebuild_pipeline(size: int) -> list:
+    return [
+        {"$sort": {"post_id": 1, "creation_date": -1, "_id": -1}},
+        {
+            "$group": {
+                "_id": "$post_id",
+                "comments": {"$push": {field: f"${field}" for field in PREVIEW_FIELDS}},
+            }
+        },
+        {
+            "$project": {
+                "_id": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}},
+                "recent_comments": {"$slice": ["$comments", size]},
+            }
+        },
+        {"$match": {"_id": {"$ne": None}}},
+        {
+            "$merge": {
+                "into": post_collection.name,
+                "on": "_id",
+                "whenMatched": [{"$set": {"recent_comments": "$$new.recent_comments"}}],
+                "whenNotMatched": "discard",
+            }
+        },
+    ]
+
+
+async def rebuild_recent_comments(reset: bool = False):
+    if reset:
+        print("Zerando prévias existentes...")
+        await post_collection.update_many({}, {"$set": {"recent_comments": []}})
+
+    print(f"Reconstruindo prévias com os {RECENT_COMMENTS_SIZE} comentários mais recentes...")
+    await comment_collection.aggregate(rebuild_pipeline(RECENT_COMMENTS_SIZE), allowDiskUse=True).to_list(length=None)
+
+    result = await post_collection.update_many(
+        {"recent_comments": {"$exists": False}}, {"$set": {"recent_comments": []}}
+    )
+    print(f"Rebuild concluído. {result.modified_count} posts sem comentários receberam prévia vazia.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild do campo recent_comments dos posts.")
+    parser.add_argument("--reset", action="store_true", help="Zera as prévias antes de recalcular.")
+    args = parser.parse_args()
+    asyncio.run(rebuild_recent_comments(reset=args.reset))
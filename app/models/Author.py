@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import AliasChoices, BaseModel, Field
+
+from app.models.Post import PostPartialOut
+
+
+class AuthorOut(BaseModel):
+    """
+    Estatísticas de um autor, mantidas na coleção materializada `authors`.
+    """
+    name: str = Field(validation_alias=AliasChoices("_id", "name"))
+    bio: Optional[str] = None
+    post_count: int = 0
+    total_likes: int = 0
+    latest_publication_date: Optional[datetime] = None
+
+    model_config = {
+        "populate_by_name": True,
+        "from_attributes": True
+    }
+
+
+class PaginatedAuthorResponse(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    data: List[AuthorOut]
+
+
+class AuthorPostPage(BaseModel):
+    limit: int
+    next_cursor: Optional[str] = None
+    data: List[PostPartialOut]
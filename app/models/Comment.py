@@ -6,6 +6,7 @@ from bson import ObjectId
 from pydantic import BaseModel, Field
 
 from app.models.PyObjectId import PyObjectId
+from app.models.User import UserOut
 
 
 class CommentBase(BaseModel):
@@ -32,8 +33,37 @@ class CommentOut(CommentBase):
     }
 
 
+class CommentWithUserOut(CommentOut):
+    """
+    Comentário das listagens; `user` só aparece quando pedido em `expand=user`.
+    """
+    user: Optional[UserOut] = None
+
+
+class CommentPreview(BaseModel):
+    """
+    Resumo de um comentário embutido no documento do post (`recent_comments`).
+    """
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    user_id: str
+    content: str
+    creation_date: datetime
+
+    model_config = {
+        "json_encoders": {ObjectId: str},
+        "populate_by_name": True,
+        "from_attributes": True
+    }
+
+
 class PaginatedCommentResponse(BaseModel):
     total: int
     skip: int
     limit: int
-    data: List[CommentOut]
\ No newline at end of file
+    data: List[CommentWithUserOut]
+
+class CommentCursorPage(BaseModel):
+    limit: int
+    order: str
+    next_cursor: Optional[str] = None
+    data: List[CommentWithUserOut]
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel
+
+
+class EngagementBucketOut(BaseModel):
+    bucket_start: datetime
+    likes: int = 0
+    comments: int = 0
+
+
+class EngagementResponse(BaseModel):
+    post_id: str
+    granularity: str
+    start: datetime
+    end: datetime
+    total_likes: int
+    total_comments: int
+    data: List[EngagementBucketOut]
@@ -1,10 +1,13 @@
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from pydantic import BaseModel
 from app.models.PyObjectId import PyObjectId
+from app.models.Category import CategoryOut
+from app.models.Comment import CommentPreview
+from app.models.Tag import TagOut
 
 
 class AuthorProfile(BaseModel):
@@ -38,6 +41,9 @@ class PostCreate(PostBase):
 
 class PostOut(PostBase):
     id: Optional[PyObjectId] = Field(None, alias="_id")
+    excerpt: Optional[str] = None
+    recent_comments: List[CommentPreview] = []
+    archived: bool = False
 
     model_config = {
         "json_encoders": {ObjectId: str},
@@ -52,6 +58,69 @@ class PaginatedPostResponse(BaseModel):
     limit: int
     data: List[PostOut]
 
+class PostPartialOut(BaseModel):
+    """
+    Post com apenas parte dos campos (parâmetros `fields` e `view=summary`).
+    As rotas que o usam omitem da resposta os campos não projetados;
+    `category` e `tags` só aparecem quando pedidos em `expand`.
+    """
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    title: Optional[str] = None
+    content: Optional[str] = None
+    excerpt: Optional[str] = None
+    author: Optional[AuthorProfile] = None
+    publication_date: Optional[datetime] = None
+    category_id: Optional[str] = None
+    tags_id: Optional[List[str]] = None
+    likes: Optional[int] = None
+    recent_comments: Optional[List[CommentPreview]] = None
+    archived: Optional[bool] = None
+    category: Optional[CategoryOut] = None
+    tags: Optional[List[TagOut]] = None
+
+    model_config = {
+        "json_encoders": {ObjectId: str},
+        "populate_by_name": True,
+        "from_attributes": True
+    }
+
+
+class PaginatedPostPartialResponse(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    data: List[PostPartialOut]
+    explain: Optional[Dict[str, Any]] = None
+
+class FacetBucket(BaseModel):
+    value: Optional[str] = None
+    name: Optional[str] = None
+    count: int
+
+
+class PostFacetsResponse(BaseModel):
+    """
+    Contagens por categoria, tag, autor e mês para os posts que atendem aos filtros.
+    """
+    total: int
+    categories: List[FacetBucket]
+    tags: List[FacetBucket]
+    authors: List[FacetBucket]
+    months: List[FacetBucket]
+
+class TrendingPostOut(BaseModel):
+    post_id: str
+    score: float
+
+
+class TrendingResponse(BaseModel):
+    """
+    Posts em alta: engajamento (likes e comentários) com decaimento exponencial.
+    """
+    window: str
+    generated_at: datetime
+    data: List[TrendingPostOut]
+
 class PopularPostOut(PostOut):
     """
     Modelo de saída para posts populares, incluindo campos calculados.
@@ -1,5 +1,5 @@
 
-from typing import Optional, List
+from typing import Literal, Optional, List
 from bson import ObjectId
 from pydantic import BaseModel, Field
 
@@ -29,4 +29,24 @@ class PaginatedPostTagResponse(BaseModel):
     total: int
     skip: int
     limit: int
-    data: List[PostTagOut]
\ No newline at end of file
+    data: List[PostTagOut]
+
+class PostTagBulkRequest(BaseModel):
+    """
+    Associações a criar (`add`) ou remover (`remove`) em uma única chamada.
+    """
+    action: Literal["add", "remove"] = "add"
+    associations: List[PostTagBase] = Field(..., min_length=1, max_length=1000)
+
+
+class PostTagBulkRejected(PostTagBase):
+    reason: str
+
+
+class PostTagBulkResult(BaseModel):
+    action: str
+    requested: int
+    applied: int
+    associations_changed: int
+    posts_updated: int
+    rejected: List[PostTagBulkRejected]
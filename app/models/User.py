@@ -1,6 +1,6 @@
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from .PyObjectId import PyObjectId
@@ -31,5 +31,23 @@ class UserOut(UserBase):
     }
 
 class PaginatedUserResponse(BaseModel):
-    total: int
-    data: List[UserOut]
\ No newline at end of file
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    data: List[UserOut]
+
+
+class UserActivityItem(BaseModel):
+    """
+    Um evento da linha do tempo de um usuário: um comentário ou um like.
+    """
+    type: Literal["comment", "like"]
+    at: datetime
+    post_id: str
+    comment_id: Optional[str] = None
+    content: Optional[str] = None
+
+
+class UserActivityPage(BaseModel):
+    limit: int
+    next_cursor: Optional[str] = None
+    data: List[UserActivityItem]
\ No newline at end of file
@@ -1,18 +1,22 @@
 
 from .Category import CategoryBase, CategoryCreate, CategoryOut, PaginatedCategoryResponse
-from .Post import PostBase, PostCreate, PostOut, PaginatedPostResponse, AuthorProfile, PopularPostOut, PaginatedPopularPostResponse
+from .Post import PostBase, PostCreate, PostOut, PaginatedPostResponse, AuthorProfile, PopularPostOut, PaginatedPopularPostResponse, PostPartialOut, PaginatedPostPartialResponse, FacetBucket, PostFacetsResponse, TrendingPostOut, TrendingResponse
 from .Tag import TagBase, TagCreate, TagOut, PaginatedTagResponse
-from .Comment import CommentBase, CommentCreate, CommentOut, PaginatedCommentResponse, CommentUpdate
-from .PostTag import PostTagBase, PostTagCreate, PostTagOut, PaginatedPostTagResponse
-from .User import UserBase, UserCreate, UserOut, PaginatedUserResponse ,UserUpdate
+from .Comment import CommentBase, CommentCreate, CommentOut, PaginatedCommentResponse, CommentUpdate, CommentCursorPage, CommentPreview, CommentWithUserOut
+from .PostTag import PostTagBase, PostTagCreate, PostTagOut, PaginatedPostTagResponse, PostTagBulkRequest, PostTagBulkRejected, PostTagBulkResult
+from .User import UserBase, UserCreate, UserOut, PaginatedUserResponse ,UserUpdate, UserActivityItem, UserActivityPage
 from .PostLike import PostLikeBase, PostLikeCreate, PostLikeOut
+from .Engagement import EngagementBucketOut, EngagementResponse
+from .Author import AuthorOut, PaginatedAuthorResponse, AuthorPostPage
 
 __all__ = [
     "CategoryBase", "CategoryCreate", "CategoryOut", "PaginatedCategoryResponse",
-    "PostBase", "PostCreate", "PostOut", "PaginatedPostResponse", "AuthorProfile", "PopularPostOut", "PaginatedPopularPostResponse",
+    "PostBase", "PostCreate", "PostOut", "PaginatedPostResponse", "AuthorProfile", "PopularPostOut", "PaginatedPopularPostResponse", "PostPartialOut", "PaginatedPostPartialResponse", "FacetBucket", "PostFacetsResponse", "TrendingPostOut", "TrendingResponse",
     "TagBase", "TagCreate", "TagOut", "PaginatedTagResponse",
-    "CommentBase", "CommentCreate", "CommentOut", "PaginatedCommentResponse", "CommentUpdate",
-    "PostTagBase", "PostTagCreate", "PostTagOut", "PaginatedPostTagResponse",
-    "UserBase", "UserCreate", "UserOut", "PaginatedUserResponse", "UserUpdate",
-    "PostLikeBase", "PostLikeCreate", "PostLikeOut"
+    "CommentBase", "CommentCreate", "CommentOut", "PaginatedCommentResponse", "CommentUpdate", "CommentCursorPage", "CommentPreview", "CommentWithUserOut",
+    "PostTagBase", "PostTagCreate", "PostTagOut", "PaginatedPostTagResponse", "PostTagBulkRequest", "PostTagBulkRejected", "PostTagBulkResult",
+    "UserBase", "UserCreate", "UserOut", "PaginatedUserResponse", "UserUpdate", "UserActivityItem", "UserActivityPage",
+    "PostLikeBase", "PostLikeCreate", "PostLikeOut",
+    "EngagementBucketOut", "EngagementResponse",
+    "AuthorOut", "PaginatedAuthorResponse", "AuthorPostPage"
 ]
\ No newline at end of file
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict, List, Optional
+
+from ..core.cache import registered_caches
+from ..core.consistency import CHECKS, DEFAULT_CHUNK_SIZE, list_runs, start_check
+from ..core.invalidation import mode as invalidation_mode
+from ..core.live import hub as live_hub
+from ..core.profiling import get_profile, merge_samples, profiles, to_collapsed, to_speedscope
+from ..core.ratelimit import admission_controller
+from ..core.singleflight import registered_groups
+from ..core.slow_queries import THRESHOLD_MS, advisor
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/cache-stats", response_model=Dict[str, Any], summary="Estatísticas de Cache e Coalescência")
+async def get_cache_stats():
+    """
+    Retorna os contadores deste worker: acertos e invalidações dos caches
+    locais, requisições coalescidas pelo single-flight e rejeições do
+    controle de admissão, além das conexões SSE ao vivo.
+    """
+    return {
+        "cache_invalidation": invalidation_mode(),
+        "caches": [cache.stats() for cache in registered_caches()],
+        "singleflight": [group.stats() for group in registered_groups()],
+        "admission": admission_controller.stats(),
+        "live": live_hub.stats(),
+    }
+
+
+@router.get("/consistency", response_model=List[Dict[str, Any]], summary="Relatórios de Consistência")
+async def get_consistency_reports():
+    """
+    Retorna o estado da última execução de cada verificação de consistência,
+    incluindo uma amostra das divergências encontradas.
+    """
+    runs = await list_runs()
+    for run in runs:
+        if run.get("last_id") is not None:
+            run["last_id"] = str(run["last_id"])
+    return runs
+
+
+@router.post("/consistency/{check}", status_code=status.HTTP_202_ACCEPTED, response_model=Dict[str, Any], summary="Executar Verificação de Consistência")
+async def start_consistency_check(
+    check: str,
+    repair: bool = Query(False, description="Corrige as divergências encontradas"),
+    restart: bool = Query(False, description="Ignora o progresso salvo e recomeça do início"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=10, le=5000),
+):
+    """
+    Inicia, em segundo plano neste worker, uma verificação de consistência
+    (`likes`, `post_tags` ou `categories`). O andamento pode ser acompanhado
+    em `GET /admin/consistency`.
+    """
+    if check not in CHECKS:
+        raise HTTPException(status_code=404, detail=f"Verificação desconhecida. Opções: {', '.join(CHECKS)}")
+    if not start_check(check, repair=repair, chunk_size=chunk_size, restart=restart):
+        raise HTTPException(status_code=409, detail="Esta verificação já está em execução.")
+    return {"check": check, "repair": repair, "status": "started"}
+
+
+def _render_profile(samples, name: str, format: str):
+    if format == "collapsed":
+        return PlainTextResponse(to_collapsed(samples))
+    return to_speedscope(samples, name)
+
+
+@router.get("/profiles", response_model=List[Dict[str, Any]], summary="Perfis de Requisições")
+async def list_profiles(route: Optional[str] = Query(None, description="Filtra pelo template da rota, ex.: /posts/{post_id}")):
+    """
+    Lista os perfis guardados neste worker (os mais recentes primeiro). Uma
+    requisição é perfilada quando enviada com `X-Profile: 1` ou quando cai
+    na amostragem configurada em `profiling.sample_rate`.
+    """
+    return [profile.summary() for profile in reversed(profiles) if route is None or profile.route == route]
+
+
+@router.get("/profiles/aggregate", summary="Perfil Agregado por Rota")
+async def aggregate_profiles(
+    route: str = Query(..., description="Template da rota, ex.: /posts/{post_id}"),
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$"),
+):
+    """
+    Soma as amostras de todos os perfis guardados de uma rota, para ver
+    onde o tempo vai em várias requisições de uma vez.
+    """
+    selected = [profile for profile in profiles if profile.route == route]
+    if not selected:
+        raise HTTPException(status_code=404, detail="Nenhum perfil guardado para esta rota")
+    return _render_profile(merge_samples(selected), f"{route} ({len(selected)} requisições)", format)
+
+
+@router.get("/profiles/{profile_id}", summary="Baixar um Perfil")
+async def get_profile_detail(profile_id: int, format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    """
+    Retorna um perfil no formato do speedscope (JSON, abra em
+    https://www.speedscope.app) ou em "collapsed stacks" (texto, para
+    flamegraph.pl). Frames `(await)` são o tempo suspenso em I/O.
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado (pode ter saído do buffer)")
+    return _render_profile(profile.samples, f"{profile.method} {profile.path}", format)
+
+
+@router.get("/slow-queries", response_model=Dict[str, Any], summary="Consultas Lentas e Sugestões de Índice")
+async def get_slow_queries(only_problems: bool = Query(False, description="Apenas grupos com COLLSCAN ou ordenação em memória")):
+    """
+    Comandos deste worker que passaram de `slow_queries.threshold_ms`,
+    agrupados por forma (comando, coleção, filtro sem valores e ordenação),
+    com as rotas que os originaram.
+
+    Para cada grupo um `explain("executionStats")` é executado em segundo
+    plano; quando ele mostra COLLSCAN ou SORT em memória, `suggestion` traz
+    um índice seguindo a regra ESR (igualdade, ordenação, intervalo).
+    """
+    return {"threshold_ms": THRESHOLD_MS, "entries": advisor.report(only_problems)}
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT, summary="Limpar Consultas Lentas")
+async def reset_slow_queries():
+    advisor.reset()
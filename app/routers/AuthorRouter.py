@@ -0,0 +1,96 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Optional
+
+from app.models import AuthorOut, PaginatedAuthorResponse, AuthorPostPage
+from ..core.db import author_collection, post_collection
+from ..logs.logger import logger
+from .utils import decode_cursor, encode_cursor, keyset_filter, post_projection
+
+router = APIRouter(prefix="/authors", tags=["Authors"])
+
+AUTHOR_SORT_FIELDS = {
+    "post_count": -1,
+    "total_likes": -1,
+    "latest_publication_date": -1,
+    "name": 1,
+}
+
+@router.get("/", response_model=PaginatedAuthorResponse, summary="Listar Autores")
+async def list_authors(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: str = Query("post_count", pattern="^(post_count|total_likes|latest_publication_date|name)$", description="Ranking do diretório"),
+):
+    """
+    Retorna o diretório de autores com quantidade de posts, total de likes e
+    data da publicação mais recente.
+
+    Os dados vêm da coleção materializada `authors`, atualizada a cada
+    escrita em posts, então a listagem não agrupa a coleção `posts`.
+    """
+    logger.debug(f"Listando autores com skip={skip}, limit={limit}, sort_by={sort_by}")
+    try:
+        field = "_id" if sort_by == "name" else sort_by
+        total = await author_collection.count_documents({})
+        authors = (
+            await author_collection.find()
+            .sort([(field, AUTHOR_SORT_FIELDS[sort_by]), ("_id", 1)])
+            .skip(skip)
+            .limit(limit)
+            .to_list(length=limit)
+        )
+        return {"total": total, "skip": skip, "limit": limit, "data": authors}
+    except Exception as e:
+        logger.exception(f"Erro ao listar autores: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao listar autores")
+
+@router.get("/{name}", response_model=AuthorOut, summary="Buscar Estatísticas de um Autor")
+async def get_author(name: str):
+    """
+    Retorna as estatísticas de um autor pelo nome exato.
+    """
+    author = await author_collection.find_one({"_id": name})
+    if not author:
+        logger.warning(f"Autor '{name}' não encontrado.")
+        raise HTTPException(status_code=404, detail="Autor não encontrado")
+    return author
+
+@router.get("/{name}/posts", response_model=AuthorPostPage, response_model_exclude_unset=True, summary="Listar Posts de um Autor")
+async def get_author_posts(
+    name: str,
+    limit: int = Query(20, ge=1, le=100, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` retornado pela página anterior"),
+    projection: Optional[Dict[str, int]] = Depends(post_projection),
+):
+    """
+    Retorna os posts de um autor, do mais recente para o mais antigo.
+
+    A paginação é por keyset sobre `(publication_date, _id)`, apoiada no
+    índice `(author.name, publication_date, _id)`. Aceita `fields` e
+    `view=summary` para retornar apenas parte dos campos.
+    """
+    logger.debug(f"Buscando posts do autor '{name}' (limit={limit})")
+    query = {"author.name": name}
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        query.update(keyset_filter("publication_date", last_date, last_id, -1))
+    if projection:
+        projection = {**projection, "publication_date": 1}
+    try:
+        posts = (
+            await post_collection.find(query, projection)
+            .sort([("publication_date", -1), ("_id", -1)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = encode_cursor(posts[-1]["publication_date"], posts[-1]["_id"])
+        for post in posts:
+            post["_id"] = str(post["_id"])
+        return {"limit": limit, "next_cursor": next_cursor, "data": posts}
+    except Exception as e:
+        logger.exception(f"Erro ao buscar posts do autor '{name}': {e}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar posts do autor")
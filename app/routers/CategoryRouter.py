@@ -1,15 +1,21 @@
 
-from fastapi import APIRouter, HTTPException, Query, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, List, Optional, Set
 from bson import ObjectId
 
-from app.models import CategoryOut, CategoryCreate, PaginatedCategoryResponse, PostOut
-from app.core.db import category_collection, post_collection
+from app.models import CategoryOut, CategoryCreate, PaginatedCategoryResponse, PostPartialOut
+from app.core.db import category_collection, post_archive_collection, post_collection
+from ..core.archive import find_posts
+from ..core.cache import LocalCache
+from ..core.invalidation import POST_TAXONOMY, publish
+from ..core.loader import RequestLoaders, expand_posts, request_loaders, with_references
 from ..logs.logger import logger
-from .utils import object_id
+from .utils import expand_param, object_id, post_projection
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
+category_cache = LocalCache("categories", depends_on=("categories",))
+
 @router.post("/", response_model=CategoryOut, status_code=status.HTTP_201_CREATED, summary="Criar uma Nova Categoria")
 async def create_category(category: CategoryCreate):
     """
@@ -22,6 +28,7 @@ async def create_category(category: CategoryCreate):
     try:
         category_dict = category.model_dump()
         result = await category_collection.insert_one(category_dict)
+        await publish("categories", [result.inserted_id])
         created = await category_collection.find_one({"_id": result.inserted_id})
         
         created["_id"] = str(created["_id"])
@@ -37,6 +44,9 @@ async def list_categories(skip: int = Query(0, ge=0), limit: int = Query(10, ge=
     Retorna uma lista paginada de todas as categorias cadastradas no sistema.
     """
     logger.debug(f"Listando categorias com skip={skip}, limit={limit}")
+    cached = category_cache.get(("list", skip, limit))
+    if cached is not None:
+        return cached
     try:
         total = await category_collection.count_documents({})
         categories = await category_collection.find().skip(skip).limit(limit).to_list(length=limit)
@@ -45,12 +55,14 @@ async def list_categories(skip: int = Query(0, ge=0), limit: int = Query(10, ge=
             cat["_id"] = str(cat["_id"])
             
         logger.info(f"{len(categories)} categorias encontradas")
-        return {
+        page = {
             "total": total,
             "skip": skip,
             "limit": limit,
             "data": categories
         }
+        category_cache.set(("list", skip, limit), page)
+        return page
     except Exception as e:
         logger.exception("Erro ao listar categorias: " + str(e))
         raise HTTPException(status_code=500, detail="Erro interno ao listar categorias")
@@ -60,8 +72,12 @@ async def count_categories():
     """
     Retorna a quantidade total de categorias cadastradas.
     """
+    cached = category_cache.get("count")
+    if cached is not None:
+        return {"total": cached}
     try:
         count = await category_collection.count_documents({})
+        category_cache.set("count", count)
         logger.info(f"Total de categorias: {count}")
         return {"total": count}
     except Exception as e:
@@ -80,7 +96,11 @@ async def get_category(identifier: str):
     A busca por nome não diferencia maiúsculas de minúsculas.
     """
     logger.debug(f"Buscando categoria com o identificador: {identifier}")
-    
+    cache_key = ("get", identifier.lower())
+    cached = category_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     if ObjectId.is_valid(identifier):
         query = {"_id": ObjectId(identifier)}
     else:
@@ -91,6 +111,7 @@ async def get_category(identifier: str):
     if category:
         logger.info(f"Categoria encontrada com o identificador '{identifier}'.")
         category["_id"] = str(category["_id"])
+        category_cache.set(cache_key, category)
         return category
         
     logger.warning(f"Categoria com o identificador '{identifier}' não encontrada.")
@@ -110,6 +131,7 @@ async def update_category(category_id: str, update_data: CategoryCreate):
         if result.matched_count == 0:
             logger.warning(f"Categoria ID {category_id} não encontrada para atualização")
             raise HTTPException(status_code=404, detail="Categoria não encontrada")
+        await publish("categories", [category_id])
             
         updated = await category_collection.find_one({"_id": oid})
         updated["_id"] = str(updated["_id"])
@@ -136,12 +158,17 @@ async def delete_category(category_id: str):
             {"category_id": category_id},
             {"$set": {"category_id": None}}
         )
+        await post_archive_collection.update_many({"category_id": category_id}, {"$set": {"category_id": None}})
         logger.info(f"{result_update.modified_count} posts tiveram o campo category_id removido")
+        if result_update.modified_count:
+            await publish("posts")
+            await publish(POST_TAXONOMY)
 
         result_delete = await category_collection.delete_one({"_id": oid})
         if result_delete.deleted_count == 0:
             logger.warning(f"Categoria ID {category_id} não encontrada para deleção")
             raise HTTPException(status_code=404, detail="Categoria não encontrada")
+        await publish("categories", [category_id])
 
         logger.info(f"Categoria ID {category_id} deletada com sucesso")
         return
@@ -152,23 +179,34 @@ async def delete_category(category_id: str):
         logger.exception(f"Erro ao deletar categoria ID {category_id}: " + str(e))
         raise HTTPException(status_code=500, detail="Erro interno ao deletar categoria")
 
-@router.get("/{category_id}/posts", response_model=List[PostOut], summary="Listar Posts de uma Categoria")
-async def get_posts_by_category(category_id: str):
+@router.get("/{category_id}/posts", response_model=List[PostPartialOut], response_model_exclude_unset=True, summary="Listar Posts de uma Categoria")
+async def get_posts_by_category(
+    category_id: str,
+    projection: Optional[Dict[str, int]] = Depends(post_projection),
+    include_archived: bool = Query(False, description="Inclui posts arquivados (mais lento)"),
+    expand: Set[str] = Depends(expand_param("category", "tags")),
+    loaders: RequestLoaders = Depends(request_loaders),
+):
     """
     Retorna uma lista de todos os posts que pertencem a uma categoria específica,
-    identificada pelo seu ID.
+    identificada pelo seu ID. Aceita `fields` e `view=summary` para retornar
+    apenas parte dos campos e `expand=category,tags` para incluir os
+    documentos referenciados.
     """
     logger.debug(f"Buscando posts na categoria {category_id}")
+    projection = with_references(projection, expand)
     try:
         oid = object_id(category_id)
         category = await category_collection.find_one({"_id": oid})
         if not category:
             raise HTTPException(status_code=404, detail="Categoria não encontrada")
+        loaders["categories"].prime(category)
 
-        posts = await post_collection.find({"category_id": category_id}).to_list(length=None)
+        posts = await find_posts({"category_id": category_id}, projection, include_archived=include_archived)
 
         for post in posts:
             post["_id"] = str(post["_id"])
+        await expand_posts(posts, expand, loaders)
 
         logger.info(f"{len(posts)} posts encontrados na categoria {category_id}")
         return posts
@@ -1,25 +1,36 @@
 
-from fastapi import APIRouter, HTTPException, Query, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional, Set
 from bson import ObjectId
 
 
-from app.models import CommentOut, CommentCreate, CommentUpdate, PaginatedCommentResponse
+from app.models import CommentOut, CommentCreate, CommentUpdate, PaginatedCommentResponse, CommentCursorPage
 from ..core.db import comment_collection, post_collection, user_collection
+from ..core.engagement import record_engagement
+from ..core.invalidation import publish
+from ..core.live import publish_comments
+from ..core.loader import RequestLoaders, expand_comments, request_loaders
+from ..core.ratelimit import enforce_admission
+from ..core.recent_comments import comment_preview, push_recent_comment, remove_recent_comment, update_recent_comment
+from ..core.sketches import record_comment
+from ..core.trending import record_event
 from ..logs.logger import logger
-from .utils import object_id
+from .utils import decode_cursor, encode_cursor, expand_param, keyset_filter, object_id
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
 @router.post("/", response_model=CommentOut, status_code=status.HTTP_201_CREATED, summary="Criar um Novo Comentário")
-async def create_comment(comment: CommentCreate):
+async def create_comment(comment: CommentCreate, request: Request):
     """
     Cria um novo comentário e o associa a um post e a um usuário existente.
 
     - **post_id**: O ID do post que está sendo comentado.
     - **user_id**: O ID do usuário que está fazendo o comentário.
     - **content**: O texto do comentário.
+
+    O comentário também entra na prévia `recent_comments` do post.
     """
+    enforce_admission("create_comment", request, comment.user_id)
     logger.debug("Criando um novo comentário")
     try:
         
@@ -35,9 +46,18 @@ async def create_comment(comment: CommentCreate):
 
         new_comment_dict = comment.model_dump()
         result = await comment_collection.insert_one(new_comment_dict)
-        created = await comment_collection.find_one({"_id": result.inserted_id})
+        new_comment_dict["_id"] = result.inserted_id
+        if not await push_recent_comment(comment.post_id, new_comment_dict):
+            # O post foi removido entre a validação e a inserção.
+            await comment_collection.delete_one({"_id": result.inserted_id})
+            raise HTTPException(status_code=404, detail="Post não encontrado para associar o comentário.")
+        await publish("comments", [result.inserted_id])
+        await record_engagement(comment.post_id, "comments", 1, comment.creation_date)
+        record_comment(comment.user_id, comment.post_id, post.get("tags_id") or [])
+        record_event(comment.post_id, "comment")
+        await publish_comments(comment.post_id, {"delta": 1, "comment": dict(comment_preview(new_comment_dict), _id=str(result.inserted_id))})
 
-        created["_id"] = str(created["_id"])
+        created = dict(new_comment_dict, _id=str(result.inserted_id))
         logger.info(f"Comentário criado com sucesso por usuário {comment.user_id}")
         return created
 
@@ -47,10 +67,16 @@ async def create_comment(comment: CommentCreate):
         logger.exception(f"Erro ao criar comentário: {e}")
         raise HTTPException(status_code=500, detail="Erro interno ao criar comentário")
 
-@router.get("/", response_model=PaginatedCommentResponse, summary="Listar Todos os Comentários")
-async def list_comments(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)):
+@router.get("/", response_model=PaginatedCommentResponse, response_model_exclude_unset=True, summary="Listar Todos os Comentários")
+async def list_comments(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+    expand: Set[str] = Depends(expand_param("user")),
+    loaders: RequestLoaders = Depends(request_loaders),
+):
     """
     Retorna uma lista paginada de todos os comentários do sistema.
+    `expand=user` inclui o autor de cada comentário (uma consulta para a página).
     """
     logger.debug(f"Listando todos os comentários com skip={skip}, limit={limit}")
     try:
@@ -59,6 +85,7 @@ async def list_comments(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)
 
         for comment in comments:
             comment["_id"] = str(comment["_id"])
+        await expand_comments(comments, expand, loaders)
 
         return {
             "total": total,
@@ -70,19 +97,47 @@ async def list_comments(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)
         logger.exception(f"Erro ao listar comentários: {e}")
         raise HTTPException(status_code=500, detail="Erro ao listar comentários")
 
-@router.get("/by_post/{post_id}", response_model=List[CommentOut], summary="Listar Comentários de um Post")
-async def get_comments_by_post(post_id: str):
+@router.get("/by_post/{post_id}", response_model=CommentCursorPage, response_model_exclude_unset=True, summary="Listar Comentários de um Post")
+async def get_comments_by_post(
+    post_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` retornado pela página anterior"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Ordem cronológica (asc) ou reversa (desc)"),
+    expand: Set[str] = Depends(expand_param("user")),
+    loaders: RequestLoaders = Depends(request_loaders),
+):
     """
-    Retorna uma lista de todos os comentários associados a um post específico.
+    Retorna os comentários de um post em páginas, em ordem cronológica.
+
+    A paginação é por keyset sobre `(creation_date, _id)`, apoiada no índice
+    composto `(post_id, creation_date, _id)`: cada página custa o mesmo,
+    independentemente da profundidade. Para a próxima página, envie o
+    `next_cursor` recebido; ele é nulo na última página. `expand=user`
+    inclui o autor de cada comentário.
     """
-    logger.debug(f"Buscando todos os comentários para o post ID {post_id}")
+    logger.debug(f"Buscando comentários do post ID {post_id} (limit={limit}, order={order})")
+    direction = 1 if order == "asc" else -1
+    query = {"post_id": post_id}
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        query.update(keyset_filter("creation_date", last_date, last_id, direction))
     try:
-        comments = await comment_collection.find({"post_id": post_id}).to_list(length=None)
+        comments = (
+            await comment_collection.find(query)
+            .sort([("creation_date", direction), ("_id", direction)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor(comments[-1]["creation_date"], comments[-1]["_id"])
         for comment in comments:
             comment["_id"] = str(comment["_id"])
-        
-        logger.info(f"{len(comments)} comentários encontrados para o post {post_id}.")
-        return comments
+        await expand_comments(comments, expand, loaders)
+
+        logger.info(f"{len(comments)} comentários retornados para o post {post_id}.")
+        return {"limit": limit, "order": order, "next_cursor": next_cursor, "data": comments}
     except Exception as e:
         logger.exception(f"Erro ao buscar comentários para o post {post_id}: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar comentários do post")
@@ -126,6 +181,9 @@ async def update_comment(comment_id: str, comment_update: CommentUpdate):
 
     if not updated_comment:
         raise HTTPException(status_code=404, detail="Comentário não encontrado")
+    await publish("comments", [comment_id])
+    if "content" in update_data:
+        await update_recent_comment(updated_comment["post_id"], updated_comment["_id"], update_data["content"])
 
     logger.info(f"Comentário ID {comment_id} atualizado com sucesso.")
     return updated_comment
@@ -137,11 +195,17 @@ async def delete_comment(comment_id: str):
     """
     logger.debug(f"Deletando comentário com o ID {comment_id}")
     try:
-        result = await comment_collection.delete_one({"_id": object_id(comment_id)})
+        deleted = await comment_collection.find_one_and_delete({"_id": object_id(comment_id)})
 
-        if result.deleted_count == 0:
+        if not deleted:
             logger.warning(f"Comentário com ID {comment_id} não encontrado para deleção")
             raise HTTPException(status_code=404, detail="Comentário não encontrado")
+        await publish("comments", [comment_id])
+        await remove_recent_comment(deleted["post_id"], deleted["_id"])
+
+        if deleted.get("creation_date"):
+            await record_engagement(deleted["post_id"], "comments", -1, deleted["creation_date"])
+        await publish_comments(deleted["post_id"], {"delta": -1, "comment_id": comment_id})
 
         logger.info(f"Comentário com ID {comment_id} deletado com sucesso")
         return
@@ -1,13 +1,18 @@
 
-from fastapi import APIRouter, HTTPException
+from bson import ObjectId
+from datetime import date, timedelta
+from fastapi import APIRouter, HTTPException, Query
 from typing import Any, Dict
 
-from ..core.db import post_collection, comment_collection, category_collection
+from ..core.db import post_collection, comment_collection, category_collection, tag_collection
+from ..core.singleflight import coalesce
+from ..core.sketches import DailySketches, load_window
 from ..logs.logger import logger
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/stats", response_model=Dict[str, Any], summary="Obter Estatísticas Gerais do Blog")
+@coalesce("dashboard_stats", ttl=5.0, depends_on=("posts", "comments", "categories"))
 async def get_dashboard_stats():
     """
     **Consulta Complexa 2 (Agregação):** Retorna uma visão geral com estatísticas
@@ -61,4 +66,70 @@ async def get_dashboard_stats():
 
     except Exception as e:
         logger.exception(f"Erro ao gerar estatísticas do dashboard: {e}")
-        raise HTTPException(status_code=500, detail="Erro interno ao gerar estatísticas")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar estatísticas")
+
+
+async def _with_names(collection, items, field):
+    """
+    Acrescenta o `field` (título do post, nome da tag) a cada item do top-K.
+    """
+    oids = [ObjectId(item["value"]) for item in items if ObjectId.is_valid(item["value"])]
+    names = {
+        str(doc["_id"]): doc.get(field)
+        async for doc in collection.find({"_id": {"$in": oids}}, {field: 1})
+    }
+    return [dict(item, name=names.get(item["value"])) for item in items]
+
+
+@router.get("/approx", response_model=Dict[str, Any], summary="Analytics Aproximados de Engajamento")
+@coalesce("dashboard_approx", ttl=5.0)
+async def get_approx_stats(days: int = Query(7, ge=1, le=30), top: int = Query(10, ge=1, le=50)):
+    """
+    Estatísticas de engajamento calculadas com sketches em memória, sem
+    varrer `comments` ou `post_likes`:
+
+    - **daily**: usuários distintos que comentaram e que curtiram, por dia (HyperLogLog).
+    - **distinct**: os mesmos distintos na janela inteira (união dos HLLs diários).
+    - **top_posts** / **top_tags**: os mais engajados (comentários + likes) na
+      janela, via Space-Saving com as contagens refinadas por um Count-Min.
+
+    Cada worker atualiza os sketches nos caminhos de escrita e os persiste
+    periodicamente na coleção `sketches`; a resposta soma todos os workers.
+    Os valores são estimativas com os limites de erro descritos em `error_bounds`.
+    """
+    logger.debug(f"Calculando analytics aproximados dos últimos {days} dias")
+    try:
+        window = await load_window(days)
+        total = DailySketches()
+        for sketches in window.values():
+            total.merge(sketches)
+
+        daily = [
+            {
+                "day": day.isoformat(),
+                "active_commenters": sketches.distinct["commenters"].count(),
+                "likers": sketches.distinct["likers"].count(),
+            }
+            for day, sketches in sorted(window.items())
+        ]
+        posts = total.heavy["posts"]
+        tags = total.heavy["tags"]
+        return {
+            "days": days,
+            "since": (date.today() - timedelta(days=days - 1)).isoformat(),
+            "daily": daily,
+            "distinct": {
+                "active_commenters": total.distinct["commenters"].count(),
+                "likers": total.distinct["likers"].count(),
+            },
+            "top_posts": await _with_names(post_collection, posts.top(top), "title"),
+            "top_tags": await _with_names(tag_collection, tags.top(top), "name"),
+            "error_bounds": {
+                "distinct_relative_standard_error": round(total.distinct["commenters"].relative_error, 4),
+                "top_posts": posts.bounds(),
+                "top_tags": tags.bounds(),
+            },
+        }
+    except Exception as e:
+        logger.exception(f"Erro ao gerar analytics aproximados: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar analytics aproximados")
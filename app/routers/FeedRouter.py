@@ -0,0 +1,132 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..core.feeds import BASE_URL, MAX_AGE_SECONDS, SITEMAP_INDEX, category_feed, feed_cache, main_feed, sitemap_index, stream_sitemap_chunk, with_base_url
+from ..logs.logger import logger
+from .utils import object_id
+
+router = APIRouter(tags=["Feeds"])
+
+RSS_MEDIA_TYPE = "application/rss+xml; charset=utf-8"
+XML_MEDIA_TYPE = "application/xml; charset=utf-8"
+
+
+def _base_url(request: Request) -> str:
+    return BASE_URL.rstrip("/") if BASE_URL else str(request.base_url).rstrip("/")
+
+
+def _not_modified(request: Request, etag: Optional[str], last_modified: float) -> bool:
+    """
+    Avalia os cabeçalhos condicionais: `If-None-Match` tem precedência
+    sobre `If-Modified-Since`, como manda a RFC 9110.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag in [value.strip() for value in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _cache_headers(etag: Optional[str], last_modified: float) -> Dict[str, str]:
+    headers = {
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={MAX_AGE_SECONDS}",
+    }
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def _etag_for(etag: str, base_url: str) -> str:
+    digest = hashlib.sha1((etag + base_url).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _file_response(request: Request, entry: Dict[str, Any], media_type: str) -> Response:
+    """
+    Resposta com o arquivo do cache preenchido com a URL base desta
+    requisição. O `ETag` também depende dela, já que o corpo muda junto.
+    """
+    base_url = _base_url(request)
+    etag = entry["etag"] if BASE_URL else _etag_for(entry["etag"], base_url)
+    headers = _cache_headers(etag, entry["last_modified"])
+    if _not_modified(request, etag, entry["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    return Response(with_base_url(entry["body"], base_url), media_type=media_type, headers=headers)
+
+
+@router.get("/feed.xml", summary="Feed RSS dos Posts Recentes", response_class=Response)
+async def get_feed(request: Request):
+    """
+    Feed RSS 2.0 com os posts mais recentes. O XML fica pronto no cache e
+    só é regenerado depois de uma escrita em posts; `ETag` e
+    `Last-Modified` permitem que leitores recebam 304 quando nada mudou.
+    """
+    try:
+        entry = await main_feed()
+    except Exception as e:
+        logger.exception(f"Erro ao gerar o feed: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar o feed")
+    return _file_response(request, entry, RSS_MEDIA_TYPE)
+
+
+@router.get("/categories/{category_id}/feed.xml", summary="Feed RSS de uma Categoria", response_class=Response)
+async def get_category_feed(category_id: str, request: Request):
+    """
+    Feed RSS 2.0 com os posts mais recentes de uma categoria. Uma escrita
+    em um post regenera apenas o feed da sua categoria (e o geral).
+    """
+    object_id(category_id)
+    try:
+        entry = await category_feed(category_id)
+    except Exception as e:
+        logger.exception(f"Erro ao gerar o feed da categoria {category_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar o feed")
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Categoria não encontrada")
+    return _file_response(request, entry, RSS_MEDIA_TYPE)
+
+
+@router.get("/sitemap.xml", summary="Índice do Sitemap", response_class=Response)
+async def get_sitemap(request: Request):
+    """
+    Índice do sitemap, apontando para as partes em `/sitemaps/{n}.xml`
+    (até `sitemap_chunk_size` URLs cada).
+    """
+    try:
+        entry = await sitemap_index()
+    except Exception as e:
+        logger.exception(f"Erro ao gerar o sitemap: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar o sitemap")
+    return _file_response(request, entry, XML_MEDIA_TYPE)
+
+
+@router.get("/sitemaps/{number}.xml", summary="Parte do Sitemap", response_class=Response)
+async def get_sitemap_chunk(number: int, request: Request):
+    """
+    Uma parte do sitemap, gerada em stream direto do cursor do MongoDB.
+    Usa o mesmo `Last-Modified` do índice: enquanto nenhum post for criado,
+    alterado ou removido, crawlers recebem 304.
+    """
+    try:
+        index = await sitemap_index()
+    except Exception as e:
+        logger.exception(f"Erro ao gerar o sitemap: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao gerar o sitemap")
+    if not 0 <= number < len(index["chunks"]):
+        raise HTTPException(status_code=404, detail="Parte do sitemap não encontrada")
+    last_modified = feed_cache.last_modified(SITEMAP_INDEX)
+    headers = _cache_headers(None, last_modified)
+    if _not_modified(request, None, last_modified):
+        return Response(status_code=304, headers=headers)
+    source, start, end = index["chunks"][number]
+    return StreamingResponse(stream_sitemap_chunk(source, start, end, _base_url(request)), media_type=XML_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..core.db import get_client
+from ..core.indexes import index_failures, index_status
+from ..core.invalidation import mode as invalidation_mode
+from ..core.monitoring import pool_status
+from ..logs.logger import logger
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+READINESS_PING_TIMEOUT_SECONDS = 2
+
+_started_at = time.monotonic()
+
+
+@router.get("/live", response_model=Dict[str, Any], summary="Liveness Probe")
+async def liveness():
+    """
+    Indica que o processo está de pé e o event loop responde.
+    Não acessa o MongoDB, para que uma lentidão do banco não reinicie o pod.
+    """
+    return {"status": "ok", "uptime_seconds": round(time.monotonic() - _started_at, 3)}
+
+
+@router.get("/ready", response_model=Dict[str, Any], summary="Readiness Probe")
+async def readiness():
+    """
+    Indica se o worker pode receber tráfego.
+
+    Executa um `ping` no MongoDB e reporta a latência, o estado do pool de
+    conexões, a criação de índices (com os que falharam, se houver) e o
+    modo do barramento de invalidação.
+    Responde 503 se o banco não responder dentro do tempo limite.
+    """
+    client = get_client()
+    report: Dict[str, Any] = {
+        "indexes": index_status(),
+        "cache_invalidation": invalidation_mode(),
+        "pool": pool_status(client),
+    }
+    if index_failures():
+        # Um índice único ausente deixa de impedir likes duplicados.
+        report["index_failures"] = index_failures()
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout=READINESS_PING_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"Readiness: ping no MongoDB falhou: {e!r}")
+        report.update(status="unavailable", mongo={"ok": False, "error": repr(e)})
+        return JSONResponse(status_code=503, content=report)
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    report.update(status="ok", mongo={"ok": True, "ping_ms": round(latency_ms, 2)})
+    return report
@@ -1,12 +1,27 @@
 
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query, status
-from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pymongo.errors import DuplicateKeyError
+from typing import Any, Dict, List, Optional, Set
 
-from app.models import PostCreate, PostOut, PaginatedPostResponse, PopularPostOut, PaginatedPopularPostResponse
-from ..core.db import post_collection, tag_collection, category_collection, comment_collection, post_tag_collection, post_like_collection, user_collection
+from app.models import PostCreate, PostOut, PostPartialOut, PaginatedPostPartialResponse, PopularPostOut, PaginatedPopularPostResponse, EngagementResponse, PostFacetsResponse, TrendingResponse
+from ..core.archive import count_posts, explain_posts, find_post, find_posts
+from ..core.authors import record_likes, record_new_post, refresh_author
+from ..core.db import post_collection, tag_collection, category_collection, comment_collection, post_tag_collection, post_like_collection, user_collection, engagement_stats_collection, post_archive_collection, comment_archive_collection, post_like_archive_collection, run_in_transaction
+from ..core.engagement import BUCKET_SIZES, MAX_BUCKETS, read_engagement, record_engagement
+from ..core.excerpt import make_excerpt
+from ..core.explain import summarize_explain
+from ..core.feeds import invalidate_feeds
+from ..core.invalidation import POST_TAXONOMY, publish
+from ..core.live import LiveResponse, hub, publish_live
+from ..core.loader import RequestLoaders, expand_posts, request_loaders, with_references
+from ..core.ratelimit import admission
+from ..core.singleflight import coalesce
+from ..core.sketches import record_like
+from ..core.trending import WINDOWS, forget_post, record_event, trending
 from ..logs.logger import logger
-from .utils import object_id
+from .utils import expand_param, object_id, post_filters, post_projection
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
@@ -31,7 +46,12 @@ async def create_post(post: PostCreate):
             raise HTTPException(status_code=404, detail=f"Tag {tag_id} não encontrada")
 
     new_post_dict = post.model_dump()
+    new_post_dict["excerpt"] = make_excerpt(post.content)
     result = await post_collection.insert_one(new_post_dict)
+    await publish("posts", [result.inserted_id])
+    await publish(POST_TAXONOMY)
+    await invalidate_feeds([post.category_id])
+    await record_new_post(new_post_dict)
     
     created = await post_collection.find_one({"_id": result.inserted_id})
     created["_id"] = str(created["_id"])
@@ -46,7 +66,8 @@ async def update_post(post_id: str, post_update: PostCreate):
     Apenas os campos fornecidos no corpo da requisição serão atualizados.
     """
     oid = object_id(post_id)
-    if not await post_collection.find_one({"_id": oid}):
+    current = await post_collection.find_one({"_id": oid}, {"author.name": 1, "category_id": 1})
+    if not current:
         raise HTTPException(status_code=404, detail="Post não encontrado")
 
     if post_update.category_id and not await category_collection.find_one({"_id": object_id(post_update.category_id)}):
@@ -56,7 +77,14 @@ async def update_post(post_id: str, post_update: PostCreate):
             raise HTTPException(status_code=404, detail=f"Tag {tag_id} não encontrada")
 
     update_data = post_update.model_dump(exclude_unset=True)
+    if "content" in update_data:
+        update_data["excerpt"] = make_excerpt(update_data["content"])
     await post_collection.update_one({"_id": oid}, {"$set": update_data})
+    await publish("posts", [post_id])
+    await publish(POST_TAXONOMY)
+    await invalidate_feeds([current.get("category_id"), post_update.category_id])
+    for author_name in {current.get("author", {}).get("name"), post_update.author.name}:
+        await refresh_author(author_name)
     
     updated = await post_collection.find_one({"_id": oid})
     updated["_id"] = str(updated["_id"])
@@ -64,114 +92,322 @@ async def update_post(post_id: str, post_update: PostCreate):
     return updated
 
 
-@router.post("/{post_id}/like/{user_id}", response_model=PostOut, summary="Curtir um Post")
+@router.post("/{post_id}/like/{user_id}", response_model=PostOut, summary="Curtir um Post", dependencies=[admission("like_post")])
 async def like_post(post_id: str, user_id: str):
     """
     Registra um like de um usuário específico em um post.
     
+    - Cria o registro em `post_likes` com um upsert condicional; o índice
+      único `{post_id, user_id}` impede likes duplicados mesmo com cliques
+      simultâneos.
     - Incrementa o contador `likes` no documento do post.
-    - Cria um registro na coleção `post_likes` para impedir likes duplicados.
+    - As duas escritas rodam em uma transação quando o MongoDB é um replica set.
     - Retorna o post com a contagem de likes atualizada.
     """
     logger.debug(f"Usuário {user_id} tentando curtir o post {post_id}")
     oid_post = object_id(post_id)
     oid_user = object_id(user_id)
 
-    if not await post_collection.find_one({"_id": oid_post}):
-        raise HTTPException(status_code=404, detail="Post não encontrado")
-    if not await user_collection.find_one({"_id": oid_user}):
+    if not await user_collection.find_one({"_id": oid_user}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    existing_like = await post_like_collection.find_one({"post_id": post_id, "user_id": user_id})
-    if existing_like:
+    created_at = datetime.now()
+
+    async def apply_like(session):
+        result = await post_like_collection.update_one(
+            {"post_id": post_id, "user_id": user_id},
+            {"$setOnInsert": {"created_at": created_at}},
+            upsert=True,
+            session=session,
+        )
+        if result.upserted_id is None:
+            raise HTTPException(status_code=409, detail="Você já curtiu este post.")
+        updated = await post_collection.find_one_and_update(
+            {"_id": oid_post},
+            {"$inc": {"likes": 1}},
+            return_document=True,
+            session=session,
+        )
+        if not updated:
+            if session is None:
+                await post_like_collection.delete_one({"_id": result.upserted_id})
+            raise HTTPException(status_code=404, detail="Post não encontrado")
+        return updated
+
+    try:
+        updated_post = await run_in_transaction(apply_like)
+    except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="Você já curtiu este post.")
 
-    like_document = {"post_id": post_id, "user_id": user_id, "created_at": datetime.now()}
-    await post_like_collection.insert_one(like_document)
-    
-    updated_post = await post_collection.find_one_and_update(
-        {"_id": oid_post},
-        {"$inc": {"likes": 1}},
-        return_document=True
-    )
+    await publish("posts", [post_id])
+    await record_engagement(post_id, "likes", 1, created_at)
+    await record_likes(updated_post["author"]["name"], 1)
+    record_like(user_id, post_id, updated_post.get("tags_id") or [], created_at)
+    record_event(post_id, "like", created_at)
+    await publish_live(post_id, "likes", {"likes": updated_post["likes"], "delta": 1})
     
     logger.info(f"Like do usuário {user_id} registrado com sucesso no post {post_id}.")
     return updated_post
 
-@router.delete("/{post_id}/like/{user_id}", response_model=PostOut, summary="Remover Curtida (Dislike)")
+@router.delete("/{post_id}/like/{user_id}", response_model=PostOut, summary="Remover Curtida (Dislike)", dependencies=[admission("dislike_post")])
 async def dislike_post(post_id: str, user_id: str):
     """
     Remove um like de um usuário específico de um post.
     
-    - Decrementa o contador `likes` no documento do post.
     - Remove o registro da coleção `post_likes`.
+    - Decrementa o contador `likes` no documento do post, sem deixá-lo negativo.
+    - As duas escritas rodam em uma transação quando o MongoDB é um replica set.
     """
     logger.debug(f"Usuário {user_id} tentando descurtir o post {post_id}")
     oid_post = object_id(post_id)
 
-    delete_result = await post_like_collection.delete_one({"post_id": post_id, "user_id": user_id})
+    async def apply_dislike(session):
+        deleted = await post_like_collection.find_one_and_delete(
+            {"post_id": post_id, "user_id": user_id}, session=session
+        )
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Você não curtiu este post para poder descurtir.")
+        updated = await post_collection.find_one_and_update(
+            {"_id": oid_post},
+            [{"$set": {"likes": {"$max": [0, {"$subtract": ["$likes", 1]}]}}}],
+            return_document=True,
+            session=session,
+        )
+        if not updated:
+            raise HTTPException(status_code=404, detail="Post não encontrado")
+        return deleted, updated
 
-    if delete_result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Você não curtiu este post para poder descurtir.")
+    deleted_like, updated_post = await run_in_transaction(apply_dislike)
 
-    updated_post = await post_collection.find_one_and_update(
-        {"_id": oid_post},
-        {"$inc": {"likes": -1}},
-        return_document=True
-    )
+    await publish("posts", [post_id])
+    await record_engagement(post_id, "likes", -1, deleted_like.get("created_at") or datetime.now())
+    await record_likes(updated_post["author"]["name"], -1)
+    await publish_live(post_id, "likes", {"likes": updated_post["likes"], "delta": -1})
 
     logger.info(f"Like do usuário {user_id} removido com sucesso do post {post_id}.")
     return updated_post
 
-@router.get("/", response_model=PaginatedPostResponse, summary="Listar Todos os Posts")
+@router.get("/{post_id}/live", summary="Contadores ao Vivo de um Post (SSE)", response_class=StreamingResponse)
+async def get_post_live(post_id: str):
+    """
+    Stream Server-Sent Events com os contadores de um post, no lugar de
+    consultar `GET /posts/{post_id}` periodicamente.
+
+    - `snapshot`: `{post_id, likes, comments}`, enviado ao conectar e sempre
+      que o cliente ficou para trás e perdeu eventos.
+    - `likes`: `{post_id, likes, delta}` a cada like ou dislike.
+    - `comments`: `{post_id, comments, delta, comment?}` a cada comentário
+      criado ou removido.
+
+    Heartbeats (comentários SSE) mantêm a conexão viva, e ela é encerrada
+    periodicamente para o cliente reconectar. O estado do post é lido do
+    banco só quando ele ganha o primeiro espectador neste worker.
+    """
+    oid = object_id(post_id)
+    if not hub.has_capacity():
+        raise HTTPException(status_code=503, detail="Limite de conexões ao vivo atingido", headers={"Retry-After": "5"})
+
+    async def load_snapshot():
+        post = await find_post(oid)
+        if post is None:
+            return None
+        comments = comment_archive_collection if post.get("archived") else comment_collection
+        return {"post_id": post_id, "likes": post.get("likes", 0), "comments": await comments.count_documents({"post_id": post_id})}
+
+    subscription = await hub.subscribe(post_id, load_snapshot)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Post não encontrado")
+    return LiveResponse(subscription, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/{post_id}/engagement", response_model=EngagementResponse, summary="Engajamento de um Post ao Longo do Tempo")
+async def get_post_engagement(
+    post_id: str,
+    start: Optional[datetime] = Query(None, alias="from", description="Início do intervalo (padrão: 30 buckets antes de `to`)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Fim do intervalo (padrão: agora)"),
+    granularity: str = Query("day", pattern="^(hour|day)$", description="Tamanho do bucket: `hour` ou `day`"),
+):
+    """
+    Retorna likes e comentários de um post agrupados por hora ou por dia.
+
+    Os valores vêm da coleção `engagement_stats` (bucket pattern), mantida
+    com `$inc` pelos endpoints de like e de comentários. A consulta lê apenas
+    os documentos de bucket do intervalo, sem varrer `post_likes` ou
+    `comments`. Buckets sem atividade não são retornados.
+    """
+    object_id(post_id)
+    end = end or datetime.now()
+    start = start or end - BUCKET_SIZES[granularity] * 30
+    if start > end:
+        raise HTTPException(status_code=400, detail="O parâmetro `from` deve ser anterior a `to`.")
+    if (end - start) / BUCKET_SIZES[granularity] > MAX_BUCKETS[granularity]:
+        raise HTTPException(status_code=400, detail=f"Intervalo muito grande para a granularidade '{granularity}'.")
+
+    logger.debug(f"Buscando engajamento do post {post_id} ({granularity}) entre {start} e {end}")
+    try:
+        buckets = await read_engagement(post_id, granularity, start, end)
+        return {
+            "post_id": post_id,
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "total_likes": sum(b.get("likes", 0) for b in buckets),
+            "total_comments": sum(b.get("comments", 0) for b in buckets),
+            "data": buckets,
+        }
+    except Exception as e:
+        logger.exception(f"Erro ao buscar engajamento do post {post_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao buscar engajamento do post")
+
+@router.get("/", response_model=PaginatedPostPartialResponse, response_model_exclude_unset=True, summary="Listar Todos os Posts")
 async def list_posts(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1),
-    publication_date: str = Query(None, description="Filtrar por data de publicação (formato: AAAA-MM-DD)"),
-    sort_by: str = Query("likes", description="Campo para ordenação (ex: likes, publication_date)"),
-    order: str = Query("desc", regex="^(asc|desc)$", description="Ordem ascendente (asc) ou descendente (desc)")
+    sort_by: str = Query("likes", pattern="^(likes|publication_date)$", description="Campo para ordenação: likes ou publication_date"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Ordem ascendente (asc) ou descendente (desc)"),
+    query: Dict[str, Any] = Depends(post_filters),
+    projection: Optional[Dict[str, int]] = Depends(post_projection),
+    include_archived: bool = Query(False, description="Inclui posts arquivados (mais lento)"),
+    explain: bool = Query(False, description="Inclui o plano de execução da consulta (diagnóstico)"),
+    expand: Set[str] = Depends(expand_param("category", "tags")),
+    loaders: RequestLoaders = Depends(request_loaders),
 ):
     """
     Retorna uma lista paginada de todos os posts. Permite filtros e ordenação.
 
+    - **category_id**, **tags** (`tags_mode` any/all), **author**,
+      **date_from**/**date_to**, **min_likes**: Filtros combináveis.
     - **publication_date**: Filtra posts de um dia específico.
     - **sort_by**: Campo para ordenar os resultados (padrão: `likes`).
     - **order**: Direção da ordenação, `asc` ou `desc` (padrão: `desc`).
+    - **fields** / **view**: Retornam apenas parte dos campos (ex.: `view=summary`).
+    - **include_archived**: Inclui os posts movidos para o arquivo.
+    - **explain**: Retorna também o plano vencedor e se houve COLLSCAN.
+    - **expand**: `category` e/ou `tags` incluem os documentos referenciados,
+      com uma consulta por coleção para a página inteira.
     """
-    logger.debug(f"Listando posts com skip={skip}, limit={limit}")
+    logger.debug(f"Listando posts com skip={skip}, limit={limit}, filtros={query}")
+    projection = with_references(projection, expand)
     try:
-        query = {}
-        if publication_date:
-            try:
-                start_date = datetime.strptime(publication_date, "%Y-%m-%d")
-                end_date = start_date.replace(hour=23, minute=59, second=59)
-                query["publication_date"] = {"$gte": start_date, "$lte": end_date}
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Formato de data inválido. Use AAAA-MM-DD.")
-        total = await post_collection.count_documents(query)
-        sort_direction = 1 if order == "asc" else -1
-        posts = (
-            await post_collection.find(query)
-            .sort(sort_by, sort_direction)
-            .skip(skip)
-            .limit(limit)
-            .to_list(length=limit)
+        sort = [(sort_by, 1 if order == "asc" else -1)]
+        total = await count_posts(query, include_archived)
+        posts = await find_posts(
+            query, projection, sort=sort, skip=skip, limit=limit, include_archived=include_archived,
         )
         for post in posts:
             post["_id"] = str(post["_id"])
+        await expand_posts(posts, expand, loaders)
         logger.info(f"{len(posts)} posts encontrados")
-        return { "total": total, "skip": skip, "limit": limit, "data": posts }
+        response = { "total": total, "skip": skip, "limit": limit, "data": posts }
+        if explain:
+            plan = await explain_posts(query, projection, sort, skip, limit, include_archived)
+            response["explain"] = {"query": str(query), "sort": sort, **summarize_explain(plan)}
+        return response
     except Exception as e:
         logger.exception(f"Erro ao listar posts: {e}")
         raise HTTPException(status_code=500, detail="Erro interno ao listar posts")
 
+def _named_facet(group_key: str, lookup_from: str, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": group_key, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+        {
+            "$lookup": {
+                "from": lookup_from,
+                "let": {"oid": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [{"$match": {"$expr": {"$eq": ["$_id", "$$oid"]}}}, {"$project": {"name": 1}}],
+                "as": "ref",
+            }
+        },
+        {"$project": {"_id": 0, "value": "$_id", "name": {"$first": "$ref.name"}, "count": 1}},
+    ]
+
+
+@router.get("/facets", response_model=PostFacetsResponse, summary="Contagens para Navegação Facetada")
+@coalesce("post_facets", ttl=60.0, depends_on=(POST_TAXONOMY, "categories", "tags"))
+async def get_post_facets(
+    query: Dict[str, Any] = Depends(post_filters),
+    facet_limit: int = Query(20, ge=1, le=100, description="Máximo de valores por faceta"),
+):
+    """
+    Retorna, para os posts que atendem aos mesmos filtros de `GET /posts`,
+    as contagens por categoria, tag, autor e mês de publicação.
+
+    Todas as facetas saem de uma única agregação `$facet`. O resultado fica
+    em cache por combinação de filtros e é invalidado quando a categoria,
+    as tags, o autor ou a data de algum post mudam, e por escritas em
+    categorias e tags. Likes não invalidam o cache: com `min_likes`, as
+    contagens podem ficar até o TTL (60 s) atrasadas.
+    """
+    logger.debug(f"Calculando facetas para filtros={query}")
+    pipeline = [
+        {"$match": query},
+        {
+            "$facet": {
+                "total": [{"$count": "count"}],
+                "categories": _named_facet("$category_id", category_collection.name, facet_limit),
+                "tags": [{"$unwind": "$tags_id"}, *_named_facet("$tags_id", tag_collection.name, facet_limit)],
+                "authors": [
+                    {"$group": {"_id": "$author.name", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": facet_limit},
+                    {"$project": {"_id": 0, "value": "$_id", "count": 1}},
+                ],
+                "months": [
+                    {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$publication_date"}}, "count": {"$sum": 1}}},
+                    {"$sort": {"_id": -1}},
+                    {"$limit": facet_limit},
+                    {"$project": {"_id": 0, "value": "$_id", "count": 1}},
+                ],
+            }
+        },
+    ]
+    try:
+        result = await post_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        facets = result[0] if result else {}
+        total = facets.get("total") or [{"count": 0}]
+        return {
+            "total": total[0]["count"],
+            "categories": facets.get("categories", []),
+            "tags": facets.get("tags", []),
+            "authors": facets.get("authors", []),
+            "months": facets.get("months", []),
+        }
+    except Exception as e:
+        logger.exception(f"Erro ao calcular facetas: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao calcular facetas")
+
+
+@router.get("/trending", response_model=TrendingResponse, summary="Posts em Alta")
+async def get_trending_posts(
+    window: str = Query("24h", pattern="^(" + "|".join(WINDOWS) + ")$"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Retorna os posts com mais engajamento recente, sem consultar o banco.
+
+    - **window**: vida média de um evento no score (`1h`, `6h`, `24h` ou `7d`);
+      um like de uma janela atrás vale 1/e de um like de agora.
+    - Comentários pesam mais que likes (veja `trending` no config.yml).
+
+    Os scores são mantidos em memória por cada worker a partir dos likes e
+    comentários que ele recebe, e somados aos checkpoints dos demais workers
+    (atualizados a cada `checkpoint_interval_seconds`).
+    """
+    return {"window": window, "generated_at": datetime.now(), "data": trending(window, limit)}
+
 @router.get("/{post_id}", response_model=PostOut, summary="Buscar um Post por ID")
+@coalesce("get_post", ttl=1.0, depends_on=("posts",), key_param="post_id")
 async def get_post(post_id: str):
     """
     Busca e retorna um único post pelo seu ID.
+
+    O post já traz em `recent_comments` os comentários mais recentes, sem
+    consulta à coleção `comments`. Posts arquivados são buscados no arquivo
+    e retornados com `archived: true`.
     """
     try:
-        post = await post_collection.find_one({"_id": object_id(post_id)})
+        post = await find_post(object_id(post_id))
         if not post:
             logger.warning(f"Post com ID {post_id} não encontrado.")
             raise HTTPException(status_code=404, detail="Post não encontrado")
@@ -186,27 +422,47 @@ async def get_post(post_id: str):
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Deletar um Post")
 async def delete_post(post_id: str):
     """
-    Deleta um post e todos os seus dados associados (comentários e tags).
+    Deleta um post e todos os seus dados associados (comentários e tags),
+    esteja ele na camada quente ou no arquivo.
     """
     oid = object_id(post_id)
-    if not await post_collection.find_one({"_id": oid}):
-        raise HTTPException(status_code=404, detail="Post não encontrado")
-    await comment_collection.delete_many({"post_id": post_id})
+    post = await post_collection.find_one({"_id": oid}, {"author.name": 1, "category_id": 1})
+    posts, comments = post_collection, comment_collection
+    if not post:
+        post = await post_archive_collection.find_one({"_id": oid}, {"author.name": 1, "category_id": 1})
+        if not post:
+            raise HTTPException(status_code=404, detail="Post não encontrado")
+        posts, comments = post_archive_collection, comment_archive_collection
+        await post_like_archive_collection.delete_many({"post_id": post_id})
+    await comments.delete_many({"post_id": post_id})
     await post_tag_collection.delete_many({"post_id": post_id})
-    await post_collection.delete_one({"_id": oid})
+    await engagement_stats_collection.delete_many({"post_id": post_id})
+    await posts.delete_one({"_id": oid})
+    await refresh_author(post.get("author", {}).get("name"))
+    await forget_post(post_id)
+    await publish("posts", [post_id])
+    await publish(POST_TAXONOMY)
+    await invalidate_feeds([post.get("category_id")])
+    await publish("comments")
+    await publish("post_tags")
     logger.info(f"Post ID {post_id} e seus dados associados foram deletados.")
     return
 
-@router.get("/search/by_title", response_model=List[PostOut], summary="Buscar Posts por Título")
-async def get_posts_by_title(title: str = Query(..., min_length=3)):
+@router.get("/search/by_title", response_model=List[PostPartialOut], response_model_exclude_unset=True, summary="Buscar Posts por Título")
+async def get_posts_by_title(
+    title: str = Query(..., min_length=3),
+    projection: Optional[Dict[str, int]] = Depends(post_projection),
+    include_archived: bool = Query(False, description="Inclui posts arquivados (mais lento)"),
+):
     """
     Busca posts por texto parcial no título (case-insensitive).
+    Aceita `fields` e `view=summary` para retornar apenas parte dos campos.
     """
     logger.debug(f"Buscando posts com título contendo '{title}'")
     try:
-        posts = await post_collection.find(
-            {"title": {"$regex": title, "$options": "i"}}
-        ).to_list(length=None)
+        posts = await find_posts(
+            {"title": {"$regex": title, "$options": "i"}}, projection, include_archived=include_archived
+        )
         for post in posts:
             post["_id"] = str(post["_id"])
         return posts
@@ -214,18 +470,30 @@ async def get_posts_by_title(title: str = Query(..., min_length=3)):
         logger.exception(f"Erro ao buscar posts por título: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar posts por título")
 
-@router.get("/filter/by_tag/{tag_id}", response_model=List[PostOut], summary="Filtrar Posts por Tag")
-async def get_posts_by_tag(tag_id: str):
+@router.get("/filter/by_tag/{tag_id}", response_model=List[PostPartialOut], response_model_exclude_unset=True, summary="Filtrar Posts por Tag")
+async def get_posts_by_tag(
+    tag_id: str,
+    projection: Optional[Dict[str, int]] = Depends(post_projection),
+    include_archived: bool = Query(False, description="Inclui posts arquivados (mais lento)"),
+    expand: Set[str] = Depends(expand_param("category", "tags")),
+    loaders: RequestLoaders = Depends(request_loaders),
+):
     """
     Retorna uma lista de todos os posts que foram associados a uma tag específica.
+    Aceita `fields` e `view=summary` para retornar apenas parte dos campos e
+    `expand=category,tags` para incluir os documentos referenciados.
     """
     logger.debug(f"Buscando posts com a tag {tag_id}")
+    projection = with_references(projection, expand)
     try:
-        if not await tag_collection.find_one({"_id": object_id(tag_id)}):
+        tag = await tag_collection.find_one({"_id": object_id(tag_id)})
+        if not tag:
             raise HTTPException(status_code=404, detail="Tag não encontrada")
-        posts = await post_collection.find({"tags_id": tag_id}).to_list(length=None)
+        loaders["tags"].prime(tag)
+        posts = await find_posts({"tags_id": tag_id}, projection, include_archived=include_archived)
         for post in posts:
             post["_id"] = str(post["_id"])
+        await expand_posts(posts, expand, loaders)
         return posts
     except HTTPException:
         raise
@@ -234,6 +502,7 @@ async def get_posts_by_tag(tag_id: str):
         raise HTTPException(status_code=500, detail="Erro ao buscar posts por tag")
         
 @router.get("/{post_id}/full_details", response_model=Dict[str, Any], summary="Buscar Detalhes Completos de um Post")
+@coalesce("get_post_full_details", ttl=1.0, depends_on=("posts", "categories", "tags", "comments"))
 async def get_post_full_details(post_id: str):
     """
     **Consulta Complexa 1:** Busca um post e agrega todas as informações
@@ -1,11 +1,15 @@
 
+from bson import ObjectId
 from fastapi import APIRouter, HTTPException, status, Query
-from typing import List
+from pymongo import DeleteMany, UpdateOne
+from typing import Any, Dict, List
 from datetime import datetime
 
 
-from app.models import PostTagCreate, PostTagOut, PaginatedPostTagResponse
-from app.core.db import post_collection, tag_collection, post_tag_collection
+from app.models import PostTagCreate, PostTagOut, PaginatedPostTagResponse, PostTagBulkRequest, PostTagBulkResult
+from app.core.db import post_collection, tag_collection, post_tag_collection, run_in_transaction
+from ..core.consistency import DEFAULT_CHUNK_SIZE, start_check
+from ..core.invalidation import POST_TAXONOMY, publish
 from ..logs.logger import logger
 from .utils import object_id
 
@@ -37,6 +41,9 @@ async def create_post_tag_association(association: PostTagCreate):
             {"_id": object_id(association.post_id)},
             {"$addToSet": {"tags_id": association.tag_id}} # $addToSet evita duplicatas
         )
+        await publish("post_tags", [result.inserted_id])
+        await publish("posts", [association.post_id])
+        await publish(POST_TAXONOMY)
 
         created = await post_tag_collection.find_one({"_id": result.inserted_id})
         created["_id"] = str(created["_id"])
@@ -49,6 +56,115 @@ async def create_post_tag_association(association: PostTagCreate):
         logger.exception(f"Erro ao criar associação Post-Tag: {e}")
         raise HTTPException(status_code=500, detail="Erro interno ao criar associação")
 
+@router.post("/bulk", response_model=PostTagBulkResult, summary="Associar ou Desassociar Tags em Lote")
+async def bulk_post_tag_associations(request: PostTagBulkRequest):
+    """
+    Cria (`add`) ou remove (`remove`) várias associações post-tag de uma vez.
+
+    - Os posts e as tags são validados com uma consulta `$in` para cada
+      coleção; pares com IDs inexistentes ou inválidos voltam em `rejected`
+      e os demais são aplicados.
+    - `post_tags` e `posts.tags_id` são atualizados com um `bulk_write`
+      cada, em uma transação quando o MongoDB é um replica set.
+    - `add` é idempotente: associações já existentes não são duplicadas.
+    """
+    logger.debug(f"Aplicando {len(request.associations)} associações post-tag ({request.action})")
+    pairs = list(dict.fromkeys((a.post_id, a.tag_id) for a in request.associations))
+    rejected = []
+    valid_pairs = []
+    for post_id, tag_id in pairs:
+        if not ObjectId.is_valid(post_id) or not ObjectId.is_valid(tag_id):
+            rejected.append({"post_id": post_id, "tag_id": tag_id, "reason": "ID inválido"})
+        else:
+            valid_pairs.append((post_id, tag_id))
+
+    post_oids = list({ObjectId(post_id) for post_id, _ in valid_pairs})
+    tag_oids = list({ObjectId(tag_id) for _, tag_id in valid_pairs})
+    existing_posts = {str(doc["_id"]) async for doc in post_collection.find({"_id": {"$in": post_oids}}, {"_id": 1})}
+    existing_tags = {str(doc["_id"]) async for doc in tag_collection.find({"_id": {"$in": tag_oids}}, {"_id": 1})}
+
+    tags_by_post: Dict[str, List[str]] = {}
+    for post_id, tag_id in valid_pairs:
+        if post_id not in existing_posts:
+            rejected.append({"post_id": post_id, "tag_id": tag_id, "reason": "Post não encontrado"})
+        elif tag_id not in existing_tags:
+            rejected.append({"post_id": post_id, "tag_id": tag_id, "reason": "Tag não encontrada"})
+        else:
+            tags_by_post.setdefault(post_id, []).append(tag_id)
+
+    result: Dict[str, Any] = {
+        "action": request.action,
+        "requested": len(request.associations),
+        "applied": sum(len(tags) for tags in tags_by_post.values()),
+        "associations_changed": 0,
+        "posts_updated": 0,
+        "rejected": rejected,
+    }
+    if not tags_by_post:
+        return result
+
+    if request.action == "add":
+        association_ops = [
+            UpdateOne({"post_id": post_id, "tag_id": tag_id}, {"$setOnInsert": {"post_id": post_id, "tag_id": tag_id}}, upsert=True)
+            for post_id, tags in tags_by_post.items()
+            for tag_id in tags
+        ]
+        post_ops = [
+            UpdateOne({"_id": ObjectId(post_id)}, {"$addToSet": {"tags_id": {"$each": tags}}})
+            for post_id, tags in tags_by_post.items()
+        ]
+    else:
+        association_ops = [
+            DeleteMany({"post_id": post_id, "tag_id": {"$in": tags}})
+            for post_id, tags in tags_by_post.items()
+        ]
+        post_ops = [
+            UpdateOne({"_id": ObjectId(post_id)}, {"$pull": {"tags_id": {"$in": tags}}})
+            for post_id, tags in tags_by_post.items()
+        ]
+
+    async def apply(session):
+        associations = await post_tag_collection.bulk_write(association_ops, ordered=False, session=session)
+        posts = await post_collection.bulk_write(post_ops, ordered=False, session=session)
+        return associations, posts
+
+    try:
+        associations, posts = await run_in_transaction(apply)
+    except Exception as e:
+        logger.exception(f"Erro ao aplicar associações post-tag em lote: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno ao aplicar associações em lote")
+
+    result["associations_changed"] = associations.upserted_count if request.action == "add" else associations.deleted_count
+    result["posts_updated"] = posts.modified_count
+    await publish("post_tags")
+    await publish("posts", list(tags_by_post))
+    await publish(POST_TAXONOMY)
+    logger.info(
+        f"Associações post-tag em lote ({request.action}): {result['applied']} aplicadas, "
+        f"{len(rejected)} rejeitadas."
+    )
+    return result
+
+@router.post("/rebuild", status_code=status.HTTP_202_ACCEPTED, response_model=Dict[str, Any], summary="Reconstruir post_tags a partir dos Posts")
+async def rebuild_post_tag_associations(
+    restart: bool = Query(True, description="Recomeça do início em vez de retomar a última execução"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=10, le=5000),
+):
+    """
+    Regenera `post_tags` a partir de `posts.tags_id`, que é a fonte da verdade.
+
+    Roda em segundo plano neste worker como a verificação de consistência
+    `post_tags` com correção: os posts são percorridos em blocos por `_id`,
+    cada bloco é corrigido com um `bulk_write` e o progresso fica salvo
+    (acompanhe em `GET /admin/consistency`). As divergências lidas do
+    secundário são conferidas no primário antes da correção, e associações
+    recém-criadas nunca são removidas, então a reconstrução pode rodar com
+    escritas em andamento.
+    """
+    if not start_check("post_tags", repair=True, chunk_size=chunk_size, restart=restart):
+        raise HTTPException(status_code=409, detail="A reconstrução de post_tags já está em execução.")
+    return {"check": "post_tags", "repair": True, "status": "started"}
+
 @router.get("/", response_model=PaginatedPostTagResponse, summary="Listar Todas as Associações")
 async def list_post_tag_associations(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)):
     """
@@ -95,6 +211,9 @@ async def delete_post_tag_association(association_id: str):
         )
 
         await post_tag_collection.delete_one({"_id": oid})
+        await publish("post_tags", [association_id])
+        await publish("posts", [post_id])
+        await publish(POST_TAXONOMY)
         
         logger.info(f"Associação ID {association_id} (Post: {post_id}, Tag: {tag_id}) deletada.")
         return
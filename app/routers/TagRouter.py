@@ -6,12 +6,16 @@ from bson import ObjectId
 
 from app.models import TagOut, TagCreate, PaginatedTagResponse
 
-from app.core.db import tag_collection, post_collection, post_tag_collection
+from app.core.db import tag_collection, post_collection, post_archive_collection, post_tag_collection
+from ..core.cache import LocalCache
+from ..core.invalidation import POST_TAXONOMY, publish
 from ..logs.logger import logger
 from .utils import object_id
 
 router = APIRouter(prefix="/tags", tags=["Tags"])
 
+tag_cache = LocalCache("tags", depends_on=("tags",))
+
 @router.post("/", response_model=TagOut, status_code=status.HTTP_201_CREATED, summary="Criar uma Nova Tag")
 async def create_tag(tag: TagCreate):
     """
@@ -26,6 +30,7 @@ async def create_tag(tag: TagCreate):
 
         tag_dict = tag.model_dump()
         result = await tag_collection.insert_one(tag_dict)
+        await publish("tags", [result.inserted_id])
         created = await tag_collection.find_one({"_id": result.inserted_id})
         
         created["_id"] = str(created["_id"])
@@ -43,6 +48,9 @@ async def list_tags(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)):
     """
     Retorna uma lista paginada de todas as tags cadastradas no sistema.
     """
+    cached = tag_cache.get(("list", skip, limit))
+    if cached is not None:
+        return cached
     try:
         logger.debug(f"Listando tags com skip={skip}, limit={limit}")
         total = await tag_collection.count_documents({})
@@ -52,12 +60,14 @@ async def list_tags(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)):
             tag["_id"] = str(tag["_id"])
             
         logger.info(f"{len(tags)} tags listadas com sucesso.")
-        return {
+        page = {
             "total": total,
             "skip": skip,
             "limit": limit,
             "data": tags
         }
+        tag_cache.set(("list", skip, limit), page)
+        return page
     except Exception as e:
         logger.exception(f"Erro ao listar tags: {e}")
         raise HTTPException(status_code=500, detail="Erro ao listar tags")
@@ -67,8 +77,12 @@ async def count_tags():
     """
     Retorna a quantidade total de tags cadastradas.
     """
+    cached = tag_cache.get("count")
+    if cached is not None:
+        return {"total": cached}
     try:
         count = await tag_collection.count_documents({})
+        tag_cache.set("count", count)
         logger.info(f"Total de tags: {count}")
         return {"total": count}
     except Exception as e:
@@ -85,7 +99,11 @@ async def get_tag(identifier: str):
     - Pelo **nome exato** da tag (não diferencia maiúsculas de minúsculas).
     """
     logger.debug(f"Buscando tag com o identificador: {identifier}")
-    
+    cache_key = ("get", identifier.lower())
+    cached = tag_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     if ObjectId.is_valid(identifier):
         query = {"_id": ObjectId(identifier)}
     else:
@@ -98,6 +116,7 @@ async def get_tag(identifier: str):
         raise HTTPException(status_code=404, detail="Tag não encontrada")
 
     tag["_id"] = str(tag["_id"])
+    tag_cache.set(cache_key, tag)
     logger.info(f"Tag recuperada com sucesso: {tag}")
     return tag
 
@@ -121,8 +140,15 @@ async def delete_tag(tag_id: str):
             {"tags_id": tag_id},
             {"$pull": {"tags_id": tag_id}}
         )
+        await post_archive_collection.update_many({"tags_id": tag_id}, {"$pull": {"tags_id": tag_id}})
         
         assoc_delete_result = await post_tag_collection.delete_many({"tag_id": tag_id})
+        await publish("tags", [tag_id])
+        if update_result.modified_count:
+            await publish("posts")
+            await publish(POST_TAXONOMY)
+        if assoc_delete_result.deleted_count:
+            await publish("post_tags")
 
         logger.info(f"Tag ID {tag_id} deletada. {update_result.modified_count} posts atualizados. {assoc_delete_result.deleted_count} associações removidas.")
         return
@@ -1,18 +1,27 @@
 
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List
+import asyncio
+import heapq
+from itertools import islice
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional, Set
 from bson import ObjectId
 
-from ..core.db import user_collection, comment_collection
+from ..core.db import user_collection, comment_collection, post_like_collection
+from ..core.invalidation import publish
+from ..core.live import publish_comments
+from ..core.loader import RequestLoaders, expand_comments, request_loaders
+from ..core.ratelimit import admission
+from ..core.recent_comments import posts_previewing_user, refresh_recent_comments
 from ..logs.logger import logger
 
-from ..models import UserCreate, UserOut, PaginatedUserResponse, UserUpdate
-from .utils import object_id
+from ..models import UserCreate, UserOut, PaginatedUserResponse, UserUpdate, UserActivityPage, CommentCursorPage
+from .utils import decode_cursor, encode_cursor, expand_param, keyset_filter, object_id
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-@router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED, dependencies=[admission("create_user")])
 async def create_user(user: UserCreate):
     """
     Cria um novo usuário no sistema.
@@ -28,6 +37,7 @@ async def create_user(user: UserCreate):
         raise HTTPException(status_code=409, detail="Email ou nome de usuário já cadastrado.")
 
     result = await user_collection.insert_one(user_dict)
+    await publish("users", [result.inserted_id])
     created = await user_collection.find_one({"_id": result.inserted_id})
     
     logger.info(f"Usuário criado com sucesso: {created['email']}")
@@ -35,19 +45,111 @@ async def create_user(user: UserCreate):
 
 
 @router.get("/", response_model=PaginatedUserResponse)
-async def list_users(skip: int = Query(0, ge=0), limit: int = Query(10, ge=1)):
+async def list_users(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` retornado pela página anterior"),
+    skip: int = Query(0, ge=0, description="Mantido por compatibilidade; prefira `cursor`"),
+    include_total: bool = Query(False, description="Inclui a contagem total (uma consulta extra)"),
+):
     """
-    Lista os usuários cadastrados.
+    Lista os usuários cadastrados em ordem de criação.
+
+    A paginação é por keyset sobre `_id`: envie o `next_cursor` recebido
+    para a próxima página. A contagem total só é calculada com
+    `include_total=true`.
     """
-    total = await user_collection.count_documents({})
-    users = await user_collection.find().skip(skip).limit(limit).to_list(length=limit)
-    
-    return {
-        "total": total,
-        "data": users
-    }
+    query = {}
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query["_id"] = {"$gt": last_id}
+    users = await user_collection.find(query).sort("_id", 1).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1]["_id"])
+
+    response = {"next_cursor": next_cursor, "data": users}
+    if include_total:
+        response["total"] = await user_collection.count_documents({})
+    return response
+
+
+async def _ensure_user(user_id: str) -> None:
+    if not await user_collection.find_one({"_id": object_id(user_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+
+async def _recent(collection, user_id: str, time_field: str, cursor_values, limit: int, projection=None):
+    query = {"user_id": user_id}
+    if cursor_values:
+        query.update(keyset_filter(time_field, cursor_values[0], cursor_values[1], -1))
+    return (
+        await collection.find(query, projection)
+        .sort([(time_field, -1), ("_id", -1)])
+        .limit(limit)
+        .to_list(length=limit)
+    )
 
 
+@router.get("/{user_id}/comments", response_model=CommentCursorPage, response_model_exclude_unset=True)
+async def get_user_comments(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` retornado pela página anterior"),
+    expand: Set[str] = Depends(expand_param("user")),
+    loaders: RequestLoaders = Depends(request_loaders),
+):
+    """
+    Lista os comentários de um usuário, do mais recente para o mais antigo,
+    paginados por cursor sobre o índice `(user_id, creation_date, _id)`.
+    """
+    await _ensure_user(user_id)
+    cursor_values = decode_cursor(cursor, 2) if cursor else None
+    comments = await _recent(comment_collection, user_id, "creation_date", cursor_values, limit + 1)
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = encode_cursor(comments[-1]["creation_date"], comments[-1]["_id"])
+    for comment in comments:
+        comment["_id"] = str(comment["_id"])
+    await expand_comments(comments, expand, loaders)
+    return {"limit": limit, "order": "desc", "next_cursor": next_cursor, "data": comments}
+
+
+@router.get("/{user_id}/activity", response_model=UserActivityPage)
+async def get_user_activity(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` retornado pela página anterior"),
+):
+    """
+    Linha do tempo do usuário: comentários e likes intercalados do mais
+    recente para o mais antigo.
+
+    Cada fonte é lida já ordenada pelo seu índice `(user_id, data, _id)`,
+    no máximo `limit + 1` documentos de cada, e as duas sequências são
+    intercaladas com um merge k-way; nada é ordenado em memória além da página.
+    """
+    await _ensure_user(user_id)
+    cursor_values = decode_cursor(cursor, 2) if cursor else None
+    comments, likes = await asyncio.gather(
+        _recent(comment_collection, user_id, "creation_date", cursor_values, limit + 1,
+                {"post_id": 1, "content": 1, "creation_date": 1}),
+        _recent(post_like_collection, user_id, "created_at", cursor_values, limit + 1,
+                {"post_id": 1, "created_at": 1}),
+    )
+    streams = [
+        ({"type": "comment", "at": c["creation_date"], "_id": c["_id"], "post_id": c["post_id"],
+          "comment_id": str(c["_id"]), "content": c.get("content")} for c in comments),
+        ({"type": "like", "at": like["created_at"], "_id": like["_id"], "post_id": like["post_id"]} for like in likes),
+    ]
+    events = list(islice(heapq.merge(*streams, key=lambda event: (event["at"], event["_id"]), reverse=True), limit + 1))
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1]["at"], events[-1]["_id"])
+    return {"limit": limit, "next_cursor": next_cursor, "data": events}
+
 
 @router.get("/{identifier}", response_model=UserOut)
 async def get_user(identifier: str):
@@ -94,6 +196,7 @@ async def update_user(user_id: str, user_update: UserUpdate):
     )
 
     if updated_user:
+        await publish("users", [user_id])
         logger.info(f"Usuário ID {user_id} atualizado com sucesso.")
         return updated_user
     
@@ -111,7 +214,19 @@ async def delete_user(user_id: str):
     if delete_result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
+    previewed_posts = await posts_previewing_user(user_id)
+    commented_posts = await comment_collection.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": "$post_id", "count": {"$sum": 1}}},
+    ]).to_list(length=None)
     comments_deleted = await comment_collection.delete_many({"user_id": user_id})
+    await publish("users", [user_id])
+    if comments_deleted.deleted_count:
+        await publish("comments")
+    for post_id in previewed_posts:
+        await refresh_recent_comments(post_id)
+    for post in commented_posts:
+        await publish_comments(post["_id"], {"delta": -post["count"]})
     
     logger.info(f"Usuário ID {user_id} e {comments_deleted.deleted_count} comentários associados foram deletados.")
     return
\ No newline at end of file
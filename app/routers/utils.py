@@ -1,7 +1,11 @@
 
-from bson import ObjectId
+import base64
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional, Set, Union
+
+from bson import ObjectId, json_util
 from bson.errors import InvalidId
-from fastapi import HTTPException
+from fastapi import HTTPException, Query
 from ..logs.logger import logger
 
 def object_id(id_str: str) -> ObjectId:
@@ -13,4 +17,150 @@ def object_id(id_str: str) -> ObjectId:
         return ObjectId(id_str)
     except InvalidId:
         logger.warning(f"ID inválido fornecido: {id_str}")
-        raise HTTPException(status_code=400, detail="ID inválido")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="ID inválido")
+
+def encode_cursor(*values) -> str:
+    """
+    Serializa os valores da última linha de uma página em um cursor opaco
+    (base64 de Extended JSON, preservando datas e ObjectIds).
+    """
+    return base64.urlsafe_b64encode(json_util.dumps(list(values)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Operação inversa de `encode_cursor`. Levanta HTTPException 400 se o
+    cursor estiver malformado ou não tiver `size` valores.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        logger.warning(f"Cursor inválido fornecido: {cursor}")
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def keyset_filter(field: str, value, last_id, direction: int) -> dict:
+    """
+    Filtro de paginação por keyset sobre a ordenação `(field, _id)`: retorna
+    os documentos que vêm depois de `(value, last_id)` na direção informada.
+    """
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$or": [{field: {op: value}}, {field: value, "_id": {op: last_id}}]}
+
+
+# Campos de post que podem ser pedidos em `fields=`.
+POST_FIELDS = (
+    "title", "content", "excerpt", "author", "publication_date",
+    "category_id", "tags_id", "likes", "recent_comments",
+)
+# Campos retornados em `view=summary`: tudo o que um card de listagem exibe.
+POST_SUMMARY_FIELDS = ("title", "excerpt", "author", "publication_date", "category_id", "tags_id", "likes")
+
+
+def post_projection(
+    fields: Optional[str] = Query(
+        None, description=f"Campos a retornar, separados por vírgula ({', '.join(POST_FIELDS)})"
+    ),
+    view: str = Query("full", pattern="^(full|summary)$", description="`summary` retorna título, autor e excerpt"),
+) -> Optional[Dict[str, int]]:
+    """
+    Dependência que converte `fields`/`view` em uma projeção do MongoDB,
+    para que os campos não pedidos nem sejam lidos do banco. `fields` tem
+    precedência sobre `view`. Retorna None para o documento completo.
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(requested) - set(POST_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(unknown)}")
+        return {field: 1 for field in requested}
+    if view == "summary":
+        return {field: 1 for field in POST_SUMMARY_FIELDS}
+    return None
+
+
+def expand_param(*allowed: str):
+    """
+    Cria a dependência do parâmetro `expand`: nomes separados por vírgula,
+    limitados a `allowed`. Retorna o conjunto pedido (vazio se ausente).
+    """
+    def dependency(
+        expand: Optional[str] = Query(
+            None, description=f"Referências a incluir na resposta, separadas por vírgula ({', '.join(allowed)})"
+        ),
+    ) -> Set[str]:
+        if not expand:
+            return set()
+        requested = {name.strip() for name in expand.split(",") if name.strip()}
+        unknown = sorted(requested - set(allowed))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Expansões inválidas: {', '.join(unknown)}")
+        return requested
+    return dependency
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    As datas são gravadas sem fuso; um filtro com fuso é convertido para UTC
+    e perde o `tzinfo`, para poder ser comparado com elas.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def post_filters(
+    category_id: Optional[str] = Query(None, description="Posts de uma categoria"),
+    tags: Optional[str] = Query(None, description="IDs de tags separados por vírgula"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="`any`: alguma das tags; `all`: todas"),
+    author: Optional[str] = Query(None, description="Nome exato do autor"),
+    date_from: Optional[Union[date, datetime]] = Query(None, description="Publicados a partir desta data (inclusive)"),
+    date_to: Optional[Union[date, datetime]] = Query(
+        None, description="Publicados até esta data (inclusive); uma data sem horário inclui o dia inteiro"
+    ),
+    min_likes: Optional[int] = Query(None, ge=0, description="Mínimo de likes"),
+    publication_date: Optional[str] = Query(
+        None, description="Filtrar por data de publicação (formato: AAAA-MM-DD); não combina com date_from/date_to"
+    ),
+) -> Dict[str, Any]:
+    """
+    Dependência que combina os filtros de listagem de posts em uma única
+    consulta do MongoDB. Todos os filtros são opcionais e cumulativos.
+    """
+    query: Dict[str, Any] = {}
+    if category_id:
+        query["category_id"] = category_id
+    if tags:
+        tag_ids = [tag.strip() for tag in tags.split(",") if tag.strip()]
+        if tag_ids:
+            query["tags_id"] = {"$all" if tags_mode == "all" else "$in": tag_ids}
+    if author:
+        query["author.name"] = author
+    if publication_date:
+        if date_from or date_to:
+            raise HTTPException(status_code=400, detail="Use publication_date ou date_from/date_to, não ambos.")
+        try:
+            date_from = date_to = datetime.strptime(publication_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de data inválido. Use AAAA-MM-DD.")
+    # Datas sem horário valem pelo dia inteiro: `date_to` vira um `$lt` no
+    # início do dia seguinte, sem perder posts publicados no próprio dia.
+    start = datetime.combine(date_from, time.min) if date_from and not isinstance(date_from, datetime) else date_from
+    end_operator, end = "$lte", date_to
+    if date_to and not isinstance(date_to, datetime):
+        end_operator, end = "$lt", datetime.combine(date_to + timedelta(days=1), time.min)
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start or end:
+        if start and end and start > end:
+            raise HTTPException(status_code=400, detail="date_from deve ser anterior a date_to.")
+        query["publication_date"] = {
+            **({"$gte": start} if start else {}),
+            **({end_operator: end} if end else {}),
+        }
+    if min_likes:
+        query["likes"] = {"$gte": min_likes}
+    return query
@@ -0,0 +1,86 @@
+"""
+Benchmark de cold start da API.
+
+Cada rodada sobe um interpretador Python novo e mede:
+- import_ms: tempo de `import main`;
+- startup_ms: execução do lifespan (até o app aceitar requisições);
+- first_request_ms: primeira requisição a `/health/live`;
+- ready_ms: tempo desde o início do processo até `/health/ready` responder 200.
+
+Uso:
+    python benchmarks/startup_bench.py [--runs 10] [--output bench_output.txt]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    client.get("/health/live")
+    t3 = time.perf_counter()
+    ready = None
+    deadline = t3 + READY_TIMEOUT
+    while time.perf_counter() < deadline:
+        if client.get("/health/ready").status_code == 200:
+            ready = time.perf_counter()
+            break
+        time.sleep(0.05)
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "ready_ms": (ready - t0) * 1000 if ready else None,
+}))
+"""
+
+
+def run_once(ready_timeout: float) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.replace("READY_TIMEOUT", str(ready_timeout))],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list) -> dict:
+    values = sorted(v for v in samples if v is not None)
+    if not values:
+        return {"median": None, "p95": None, "max": None}
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return {"median": round(statistics.median(values), 2), "p95": round(p95, 2), "max": round(values[-1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de cold start da API.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--ready-timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_output.txt"))
+    args = parser.parse_args()
+
+    runs = [run_once(args.ready_timeout) for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        **{metric: summarize([run[metric] for run in runs]) for metric in runs[0]},
+    }
+    print(json.dumps(report, indent=2))
+    with open(args.output, "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 
-import uvicorn
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from pymongo import ASCENDING, DESCENDING
-from app.core.db import (
-    post_collection,
-    category_collection,
-    tag_collection,
-    comment_collection,
-)
+from app.core.db import close_client, get_client
+from app.core.indexes import start_index_creation, stop_index_creation
+from app.core.invalidation import start_invalidation_consumer, stop_invalidation_consumer
+from app.core.profiling import ProfilingMiddleware
+from app.core.slow_queries import RequestContextMiddleware, start_slow_query_advisor, stop_slow_query_advisor
+from app.core.sketches import start_sketch_persistence, stop_sketch_persistence
+from app.core.trending import start_trending_checkpoints, stop_trending_checkpoints
 from app.routers.CategoryRouter import router as CategoryRouter
 from app.routers.PostRouter import router as PostRouter
 from app.routers.TagRouter import router as TagRouter
@@ -15,32 +16,70 @@ from app.routers.CommentRouter import router as CommentRouter
 from app.routers.PostTagRouter import router as PostTagRouter
 from app.routers.DashboardRouter import router as DashboardRouter
 from app.routers.UserRouter import router as UserRouter
+from app.routers.HealthRouter import router as HealthRouter
+from app.routers.AdminRouter import router as AdminRouter
+from app.routers.AuthorRouter import router as AuthorRouter
+from app.routers.FeedRouter import router as FeedRouter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de cada worker: o cliente do MongoDB é criado aqui, já
+    dentro do processo do worker, e fechado quando o servidor termina de
+    drenar as requisições em andamento.
+
+    Nada aqui espera pelo banco: a criação de índices e o consumidor de
+    invalidação rodam em segundo plano, e `/health/ready` informa quando o
+    worker está de fato pronto.
+    """
+    get_client()
+    start_index_creation()
+    # Mantém os caches locais deste worker sincronizados com as escritas feitas pelos demais.
+    await start_invalidation_consumer()
+    # Grava periodicamente os sketches de analytics; o último flush acontece no desligamento.
+    start_sketch_persistence()
+    # Scores de trending: restaura o checkpoint (ou reconstrói a frio) e grava periodicamente.
+    start_trending_checkpoints()
+    # Captura comandos lentos e roda explain deles em segundo plano (/admin/slow-queries).
+    start_slow_query_advisor()
+    try:
+        yield
+    finally:
+        await stop_slow_query_advisor()
+        await stop_trending_checkpoints()
+        await stop_sketch_persistence()
+        await stop_invalidation_consumer()
+        await stop_index_creation()
+        close_client()
 
 
 app = FastAPI(
     title="Blog API",
     description="API para um sistema de gerenciamento de conteúdo de um blog.",
-    version="1.3.0"
+    version="1.3.0",
+    lifespan=lifespan,
 )
-@app.on_event("startup")
-async def create_indexes():
-    """
-    Esta função é executada na inicialização do app e garante
-    que os índices essenciais existam no MongoDB.
-    """
-    await comment_collection.create_index([("post_id", ASCENDING)])
-    await post_collection.create_index([("category_id", ASCENDING)])
-    await post_collection.create_index([("tags_id", ASCENDING)]) 
-    await post_collection.create_index([("publication_date", DESCENDING)])
+
+# Perfila, sob demanda (`X-Profile: 1`) ou por amostragem, requisições individuais.
+app.add_middleware(ProfilingMiddleware)
+# Atribui cada comando enviado ao MongoDB à rota que o originou.
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(UserRouter)
 app.include_router(CategoryRouter)
 app.include_router(PostRouter)
+app.include_router(AuthorRouter)
+app.include_router(FeedRouter)
 app.include_router(TagRouter)
 app.include_router(CommentRouter)
 app.include_router(PostTagRouter)
 app.include_router(DashboardRouter)
+app.include_router(HealthRouter)
+app.include_router(AdminRouter)
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -15,6 +15,7 @@ from app.core.db import (
     user_collection,
     post_like_collection
 )
+from app.core.excerpt import make_excerpt
 
 fake = Faker('pt_BR')
 
@@ -163,6 +164,7 @@ async def seed_database():
     for template in all_templates:
         posts_data.append({
             "title": template["title"], "content": template["content"],
+            "excerpt": make_excerpt(template["content"]),
             "author": random.choice(AUTHORS), "publication_date": fake.date_time_this_year(),
             "category_id": categories_map[template["category"]],
             "tags_id": [str(id) for id in random.sample(list(tags_map.values()), k=random.randint(1, 4))],
@@ -0,0 +1,68 @@
+"""
+Ponto de entrada de produção da API.
+
+Sobe o uvicorn com vários workers (um por núcleo por padrão), usando uvloop
+e httptools quando disponíveis. Cada worker cria o seu próprio cliente do
+MongoDB no lifespan do app (veja `main.lifespan`), então nenhum cliente é
+herdado entre processos.
+
+No SIGTERM o uvicorn para de aceitar conexões, aguarda as requisições em
+andamento por até `graceful_timeout` segundos e só então executa o
+shutdown do lifespan, que fecha o cliente do MongoDB.
+
+Uso:
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+import yaml
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "logs", "config.yml")
+
+
+def load_server_config() -> dict:
+    with open(CONFIG_PATH, "r") as f:
+        return yaml.safe_load(f).get("server", {})
+
+
+def resolve_workers(workers: int) -> int:
+    if workers and workers > 0:
+        return workers
+    return os.cpu_count() or 1
+
+
+def main():
+    config = load_server_config()
+
+    parser = argparse.ArgumentParser(description="Servidor de produção da Blog API.")
+    parser.add_argument("--host", default=config.get("host", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=config.get("port", 8000))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", config.get("workers", 0))),
+        help="Número de processos (0 = um por núcleo de CPU).",
+    )
+    parser.add_argument("--graceful-timeout", type=int, default=config.get("graceful_timeout", 30))
+    parser.add_argument("--keep-alive", type=int, default=config.get("keep_alive", 5))
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=resolve_workers(args.workers),
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keep_alive,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()